@@ -1,24 +1,87 @@
+import os
+import logging
 from fastapi import APIRouter, HTTPException
-from typing import List
-from pydantic import BaseModel
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
 from datetime import datetime
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
 
-from models.order import Order, Sentiment
+from models.order import Order, OrderListView, OrderStatus, PaymentStatus, Sentiment
 from models.alert import Alert
 from services.whatsapp_service import whatsapp_service
+from services.message_log_writer import message_log_writer
 from services.ai_service import ai_service
-from models.message_log import MessageType, MessageLog
+from models.message_log import MessageType, MessageLog, MessageLogListView
 from models.user import User
+from database import admin_collection
+from phone import InvalidPhoneNumber, normalize_phone
+from services.order_transitions import ALLOWED_FROM, STATUS_NOTIFICATIONS, bulk_transition
+from services.notification_queue import notification_queue
+from api.fast_json import (
+    FAST_JSON_ENABLED,
+    FastJSONResponse,
+    ORDER_SUMMARY_PROJECTION,
+    USER_SUMMARY_PROJECTION,
+    MESSAGE_LOG_PROJECTION,
+    ALERT_PROJECTION,
+    parse_fields,
+    projection_for,
+    select_fields,
+    ref_id,
+    order_summary_rows,
+    message_log_rows,
+    alert_rows,
+)
 
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
+
+BULK_TRANSITION_MAX_ORDERS = int(os.getenv("BULK_TRANSITION_MAX_ORDERS", "10000"))
+
+
+# Request Models
+class BulkTransitionFilter(BaseModel):
+    status: Optional[List[OrderStatus]] = None
+    payment_status: Optional[PaymentStatus] = None
+    carrier: Optional[str] = None
+    has_tracking_id: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    
+    def to_query(self) -> dict:
+        query = {}
+        if self.status:
+            query["status"] = {"$in": [OrderStatus(status).value for status in self.status]}
+        if self.payment_status:
+            query["payment_status"] = PaymentStatus(self.payment_status).value
+        if self.carrier:
+            query["carrier"] = self.carrier
+        if self.has_tracking_id is not None:
+            query["tracking_id"] = {"$ne": None} if self.has_tracking_id else None
+        if self.created_after or self.created_before:
+            query["created_at"] = {}
+            if self.created_after:
+                query["created_at"]["$gte"] = self.created_after
+            if self.created_before:
+                query["created_at"]["$lt"] = self.created_before
+        return query
+
+
+class BulkTransitionRequest(BaseModel):
+    target_status: OrderStatus
+    order_ids: Optional[List[str]] = Field(None, description="Orders to move (or use filter)")
+    filter: Optional[BulkTransitionFilter] = Field(None, description="Select orders by attributes instead of IDs")
+    notify: bool = Field(True, description="Queue the customer notification for each moved order")
 
 
 # Response Models
 class OrderSummary(BaseModel):
     id: str
-    user_name: str
-    whatsapp_number: str
+    # None when the order's user no longer exists
+    user_name: Optional[str] = None
+    whatsapp_number: Optional[str] = None
     status: str
     payment_status: str
     sentiment: str
@@ -50,18 +113,36 @@ class AlertResponse(BaseModel):
 
 
 @router.get("/orders", response_model=List[OrderSummary])
-async def get_all_orders(skip: int = 0, limit: int = 50):
-    """Get all orders for admin dashboard"""
+async def get_all_orders(skip: int = 0, limit: int = 50, fields: str | None = None):
+    """
+    Get all orders for admin dashboard.
+    `fields` is an optional comma-separated subset of OrderSummary fields;
+    only those are read from MongoDB and returned.
+    """
     try:
-        orders = await Order.find_all().sort(-Order.created_at).skip(skip).limit(limit).to_list()
+        selected = parse_fields(fields, OrderSummary.model_fields)
+        if selected or FAST_JSON_ENABLED:
+            return await _get_all_orders_raw(skip, limit, selected)
+        
+        cursor = admin_collection(Order).find({}, OrderListView.Settings.projection)
+        docs = await cursor.sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+        orders = [OrderListView.model_validate(doc) for doc in docs]
+        
+        # One batched lookup instead of fetching the user link per order
+        user_ids = list({order.user_id.id for order in orders})
+        users = await admin_collection(User).find(
+            {"_id": {"$in": user_ids}}, USER_SUMMARY_PROJECTION
+        ).to_list(length=len(user_ids))
+        users_by_id = {user["_id"]: user for user in users}
         
         result = []
         for order in orders:
-            user = await order.user_id.fetch()
+            # An orphaned order (user deleted) shows without a customer instead of failing the list
+            user = users_by_id.get(order.user_id.id, {})
             result.append(OrderSummary(
                 id=str(order.id),
-                user_name=user.name,
-                whatsapp_number=user.whatsapp_number,
+                user_name=user.get("name"),
+                whatsapp_number=user.get("whatsapp_number"),
                 status=order.status,
                 payment_status=order.payment_status,
                 sentiment=order.sentiment,
@@ -75,25 +156,59 @@ async def get_all_orders(skip: int = 0, limit: int = 50):
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _get_all_orders_raw(skip: int, limit: int, fields: List[str] | None = None) -> FastJSONResponse:
+    """
+    Fast path for the orders list: projected raw documents, one batched
+    user lookup instead of a fetch per order, serialized with orjson.
+    """
+    projection = projection_for(fields, ORDER_SUMMARY_PROJECTION)
+    cursor = admin_collection(Order).find({}, projection)
+    orders = await cursor.sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+    
+    users_by_id = {}
+    if "user_id" in projection:
+        user_ids = list({ref_id(doc.get("user_id")) for doc in orders})
+        users = await admin_collection(User).find(
+            {"_id": {"$in": user_ids}}, USER_SUMMARY_PROJECTION
+        ).to_list(length=len(user_ids))
+        users_by_id = {user["_id"]: user for user in users}
+    
+    return FastJSONResponse(select_fields(order_summary_rows(orders, users_by_id), fields))
+
+
 @router.get("/messages", response_model=List[MessageLogResponse])
-async def get_message_logs(order_id: str | None = None, skip: int = 0, limit: int = 100):
-    """Get message logs, optionally filtered by order_id"""
+async def get_message_logs(order_id: str | None = None, skip: int = 0, limit: int = 100, fields: str | None = None):
+    """
+    Get message logs, optionally filtered by order_id.
+    `fields` is an optional comma-separated subset of MessageLogResponse fields.
+    """
     try:
-        if order_id:
-            messages = await MessageLog.find(
-                MessageLog.order_id.ref.id == order_id
-            ).sort(-MessageLog.sent_at).skip(skip).limit(limit).to_list()
-        else:
-            messages = await MessageLog.find_all().sort(-MessageLog.sent_at).skip(skip).limit(limit).to_list()
+        selected = parse_fields(fields, MessageLogResponse.model_fields)
+        try:
+            query = {"order_id.$id": PydanticObjectId(order_id)} if order_id else {}
+        except (InvalidId, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid order_id")
+        
+        if selected or FAST_JSON_ENABLED:
+            projection = projection_for(selected, MESSAGE_LOG_PROJECTION)
+            cursor = admin_collection(MessageLog).find(query, projection)
+            messages = await cursor.sort("sent_at", -1).skip(skip).limit(limit).to_list(length=limit)
+            return FastJSONResponse(select_fields(message_log_rows(messages), selected))
+        
+        cursor = admin_collection(MessageLog).find(query, MessageLogListView.Settings.projection)
+        docs = await cursor.sort("sent_at", -1).skip(skip).limit(limit).to_list(length=limit)
+        messages = [MessageLogListView.model_validate(doc) for doc in docs]
         
         return [
             MessageLogResponse(
                 id=str(msg.id),
-                order_id=str(msg.order_id.ref.id),
+                order_id=str(msg.order_id.id),
                 message_type=msg.message_type,
                 message_content=msg.message_content,
                 sent_at=msg.sent_at,
@@ -103,6 +218,8 @@ async def get_message_logs(order_id: str | None = None, skip: int = 0, limit: in
             for msg in messages
         ]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -111,6 +228,12 @@ async def get_message_logs(order_id: str | None = None, skip: int = 0, limit: in
 async def get_alerts(resolved: bool | None = None, skip: int = 0, limit: int = 50):
     """Get alerts, optionally filtered by resolved status"""
     try:
+        if FAST_JSON_ENABLED:
+            query = {"resolved": resolved} if resolved is not None else {}
+            cursor = admin_collection(Alert).find(query, ALERT_PROJECTION)
+            alerts = await cursor.sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+            return FastJSONResponse(alert_rows(alerts))
+        
         if resolved is not None:
             alerts = await Alert.find(
                 Alert.resolved == resolved
@@ -187,13 +310,13 @@ async def admin_cancel_order(order_id: str):
         )
         
         if msg_sid:
-            await MessageLog(
+            await message_log_writer.write(MessageLog(
                 order_id=order,
                 message_type=MessageType.ORDER_CONFIRMATION,
                 message_content="✅ Your order has been successfully cancelled.",
                 whatsapp_message_id=msg_sid,
                 is_incoming=False
-            ).insert()
+            ))
         
         # 3. Auto-resolve related cancellation alerts
         cancel_alerts = await Alert.find(
@@ -219,6 +342,89 @@ async def admin_cancel_order(order_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/orders/bulk-transition")
+async def bulk_transition_orders(request: BulkTransitionRequest):
+    """
+    Move many orders to a status at once, e.g. ship a day's dispatch.
+    
+    Orders are selected by `order_ids` or `filter` (exactly one). A single
+    update_many moves those in an allowed from-status; customer notifications
+    are queued, not sent inline. With `order_ids`, every ID gets an outcome:
+    "transitioned", "not_found", "invalid_id" or "skipped:<current status>";
+    with `filter` only the counts are returned. Either way at most
+    BULK_TRANSITION_MAX_ORDERS orders move per request.
+    """
+    try:
+        target = OrderStatus(request.target_status)
+        if target not in STATUS_NOTIFICATIONS:
+            allowed = ", ".join(status.value for status in STATUS_NOTIFICATIONS)
+            raise HTTPException(status_code=400, detail=f"Bulk transitions support target_status in: {allowed}")
+        if (request.order_ids is None) == (request.filter is None):
+            raise HTTPException(status_code=400, detail="Provide exactly one of order_ids or filter")
+        if request.order_ids is not None and len(request.order_ids) > BULK_TRANSITION_MAX_ORDERS:
+            raise HTTPException(status_code=413, detail=f"At most {BULK_TRANSITION_MAX_ORDERS} orders per request")
+        
+        outcomes: Dict[str, str] = {}
+        if request.order_ids is not None:
+            object_ids = []
+            for order_id in request.order_ids:
+                try:
+                    object_ids.append(PydanticObjectId(order_id))
+                except (InvalidId, TypeError):
+                    outcomes[order_id] = "invalid_id"
+            query = {"_id": {"$in": object_ids}}
+        else:
+            query = request.filter.to_query()
+            if not query:
+                raise HTTPException(status_code=400, detail="filter must set at least one condition")
+            # Pin the (capped) selection to IDs, so orders matching the filter later can't slip past the cap
+            cursor = Order.get_motor_collection().find(
+                {"$and": [query, {"status": {"$in": [status.value for status in ALLOWED_FROM[target]]}}]},
+                {"_id": 1}
+            )
+            docs = await cursor.limit(BULK_TRANSITION_MAX_ORDERS + 1).to_list(None)
+            if len(docs) > BULK_TRANSITION_MAX_ORDERS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"filter matches more than {BULK_TRANSITION_MAX_ORDERS} orders; narrow it down"
+                )
+            query = {"_id": {"$in": [doc["_id"] for doc in docs]}}
+        
+        moved = await bulk_transition(query, target, ALLOWED_FROM[target])
+        
+        if request.order_ids is not None:
+            for order_id in moved:
+                outcomes[str(order_id)] = "transitioned"
+            
+            # Explain every requested order that didn't move, in one read
+            moved_ids = set(moved)
+            rest = [order_id for order_id in object_ids if order_id not in moved_ids]
+            current = {}
+            if rest:
+                cursor = Order.get_motor_collection().find({"_id": {"$in": rest}}, {"status": 1})
+                current = {doc["_id"]: doc["status"] async for doc in cursor}
+            for order_id in rest:
+                outcomes[str(order_id)] = f"skipped:{current[order_id]}" if order_id in current else "not_found"
+        
+        if request.notify and moved:
+            await notification_queue.enqueue_many(STATUS_NOTIFICATIONS[target], moved)
+        
+        logger.info("Bulk transition to %s: %d orders moved", target.value, len(moved))
+        result = {
+            "target_status": target.value,
+            "transitioned": len(moved),
+            "notifications_queued": len(moved) if request.notify else 0,
+        }
+        if request.order_ids is not None:
+            result["outcomes"] = outcomes
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/sync-messages")
 async def sync_messages_from_twilio():
     """
@@ -247,8 +453,10 @@ async def sync_messages_from_twilio():
             # inbound: From is customer
             # outbound: To is customer
             target_phone = msg.get("from") if is_incoming else msg.get("to")
-            if target_phone:
-                target_phone = target_phone.replace("whatsapp:", "")
+            try:
+                target_phone = normalize_phone(target_phone)
+            except InvalidPhoneNumber:
+                continue
             
             # Find user and order
             user = await User.find_one(User.whatsapp_number == target_phone)
@@ -275,7 +483,7 @@ async def sync_messages_from_twilio():
             
             sentiment = None
             if is_incoming:
-                sentiment = ai_service.classify_sentiment(body)
+                sentiment = await ai_service.classify_sentiment(body)
             
             # Create log entry
             date_sent_str = msg.get("date_sent")
@@ -295,14 +503,14 @@ async def sync_messages_from_twilio():
                         if parsed:
                             sent_at = datetime(*parsed[:6])
                 except Exception as parse_err:
-                    print(f"Date parsing failed for {date_sent_str}: {parse_err}")
+                    logger.warning("Date parsing failed for %s: %s", date_sent_str, parse_err)
                     # sent_at stays as utcnow()
 
             # Ensure body is not None
             if not body:
                 body = "[No content]"
 
-            await MessageLog(
+            await message_log_writer.write(MessageLog(
                 order_id=order,
                 message_type=msg_type,
                 message_content=body,
@@ -310,12 +518,12 @@ async def sync_messages_from_twilio():
                 is_incoming=is_incoming,
                 sent_at=sent_at,
                 sentiment=sentiment
-            ).insert()
+            ))
             
             synced_count += 1
             
         return {"message": f"Successfully synced {synced_count} messages from Twilio", "count": synced_count}
         
     except Exception as e:
-        print(f"Error in sync-messages: {str(e)}")
+        logger.exception("Error in sync-messages: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,157 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import orjson
+from bson import DBRef, ObjectId
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+from models.order import OrderListView
+from models.message_log import MessageLogListView
+
+
+# Opt-in: set FAST_JSON_RESPONSES=true to serve admin list endpoints straight
+# from projected Mongo documents instead of hydrated Beanie documents.
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+
+# Projections matching the fields exposed by the admin response models
+ORDER_SUMMARY_PROJECTION = OrderListView.Settings.projection
+
+USER_SUMMARY_PROJECTION = {"name": 1, "whatsapp_number": 1}
+
+MESSAGE_LOG_PROJECTION = MessageLogListView.Settings.projection
+
+ALERT_PROJECTION = {
+    "_id": 1,
+    "order_id": 1,
+    "reason": 1,
+    "description": 1,
+    "created_at": 1,
+    "resolved": 1,
+}
+
+
+# Response fields served from a joined user document rather than the order
+USER_DERIVED_FIELDS = {"user_name", "whatsapp_number"}
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated `fields=` query parameter.
+    Returns None when no subset was requested.
+    """
+    if not fields:
+        return None
+    
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return requested
+
+
+def projection_for(fields: Optional[List[str]], base_projection: Dict[str, int]) -> Dict[str, int]:
+    """Narrow a list projection to the requested response fields"""
+    if fields is None:
+        return base_projection
+    
+    projection = {"_id": 1}
+    for field in fields:
+        if field in base_projection:
+            projection[field] = 1
+        elif field in USER_DERIVED_FIELDS:
+            projection["user_id"] = 1
+    return projection
+
+
+def select_fields(rows: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Drop everything but the requested fields from shaped rows"""
+    if fields is None:
+        return rows
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def _default(obj: Any) -> Any:
+    """Serialize BSON types orjson doesn't know about"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, DBRef):
+        return str(obj.id)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """ORJSON response that also understands ObjectId and DBRef (Beanie links)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def ref_id(value: Any) -> Any:
+    """Return the referenced id of a stored Beanie Link (DBRef)"""
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, dict):
+        return value.get("$id", value.get("_id"))
+    return value
+
+
+def order_summary_rows(orders: Iterable[Dict], users_by_id: Dict[ObjectId, Dict]) -> List[Dict]:
+    """Shape raw order documents like OrderSummary"""
+    rows = []
+    for doc in orders:
+        user = users_by_id.get(ref_id(doc.get("user_id")), {})
+        rows.append({
+            "id": doc["_id"],
+            "user_name": user.get("name"),
+            "whatsapp_number": user.get("whatsapp_number"),
+            "status": doc.get("status"),
+            "payment_status": doc.get("payment_status"),
+            "sentiment": doc.get("sentiment"),
+            "automation_enabled": doc.get("automation_enabled"),
+            "product_name": doc.get("product_name"),
+            "amount": doc.get("amount"),
+            "created_at": doc.get("created_at"),
+            "feedback_rating": doc.get("feedback_rating"),
+            "feedback_text": doc.get("feedback_text"),
+        })
+    return rows
+
+
+def message_log_rows(messages: Iterable[Dict]) -> List[Dict]:
+    """Shape raw message log documents like MessageLogResponse"""
+    return [
+        {
+            "id": doc["_id"],
+            "order_id": ref_id(doc.get("order_id")),
+            "message_type": doc.get("message_type"),
+            "message_content": doc.get("message_content"),
+            "sent_at": doc.get("sent_at"),
+            "is_incoming": doc.get("is_incoming", False),
+            "sentiment": doc.get("sentiment"),
+        }
+        for doc in messages
+    ]
+
+
+def alert_rows(alerts: Iterable[Dict]) -> List[Dict]:
+    """Shape raw alert documents like AlertResponse"""
+    return [
+        {
+            "id": doc["_id"],
+            "order_id": ref_id(doc.get("order_id")),
+            "reason": doc.get("reason"),
+            "description": doc.get("description"),
+            "created_at": doc.get("created_at"),
+            "resolved": doc.get("resolved", False),
+        }
+        for doc in alerts
+    ]
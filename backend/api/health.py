@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from database import ensure_db
+from models.user import User
+from scheduler.reminder_scheduler import reminder_scheduler
+from metrics import queue_depths, last_success_age
+from services.circuit_breaker import circuit_states
+from services.llm_cache import llm_cache
+
+
+router = APIRouter(tags=["health"])
+
+MONGO_PING_TIMEOUT = float(os.getenv("HEALTH_MONGO_TIMEOUT_SECONDS", "1.0"))
+READINESS_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "2.0"))
+# How long a probe waits for a lazy (serverless) database init before reporting "not initialized"
+DB_INIT_TIMEOUT = float(os.getenv("HEALTH_DB_INIT_TIMEOUT_SECONDS", "3.0"))
+
+# Last readiness report, shared by all probes within the cache window
+_cached_report: dict | None = None
+_cached_at = 0.0
+_lock = asyncio.Lock()
+# Database init started by a probe; kept running past the probe's timeout
+_init_task: asyncio.Task | None = None
+
+
+async def _ensure_db() -> None:
+    """ensure_db() bounded by DB_INIT_TIMEOUT, without abandoning an init half-way"""
+    global _init_task
+    if _init_task is None or _init_task.done():
+        _init_task = asyncio.ensure_future(ensure_db())
+        # Failures are reported by the probe that waits on them; don't log them as unretrieved
+        _init_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    await asyncio.wait_for(asyncio.shield(_init_task), timeout=DB_INIT_TIMEOUT)
+
+
+async def _check_mongo() -> dict:
+    try:
+        await _ensure_db()
+    except asyncio.TimeoutError:
+        return {"ok": False, "initialized": False, "error": "database initialization in progress"}
+    except Exception as e:
+        return {"ok": False, "initialized": False, "error": str(e) or type(e).__name__}
+
+    start = time.perf_counter()
+    try:
+        database = User.get_motor_collection().database
+        await asyncio.wait_for(database.command("ping"), timeout=MONGO_PING_TIMEOUT)
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__}
+
+
+def _check_scheduler() -> dict:
+    if not reminder_scheduler.started:
+        # Not run in this process (serverless mode), nothing to be unhealthy about
+        return {"ok": True, "running": False, "enabled": False, "jobs": []}
+
+    scheduler = reminder_scheduler.scheduler
+    jobs = [
+        {
+            "id": job.id,
+            "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None,
+            "paused": job.next_run_time is None,
+        }
+        for job in scheduler.get_jobs()
+    ] if scheduler.running else []
+    return {"ok": scheduler.running, "running": scheduler.running, "enabled": True, "jobs": jobs}
+
+
+async def _build_report() -> dict:
+    mongo = await _check_mongo()
+    scheduler = _check_scheduler()
+    return {
+        "status": "ready" if mongo["ok"] and scheduler["ok"] else "not_ready",
+        "database": mongo,
+        "scheduler": scheduler,
+        "queues": queue_depths(),
+        "circuits": circuit_states(),
+        "llm_cache": llm_cache.stats(),
+        "last_success_age_seconds": {
+            "twilio": last_success_age("twilio"),
+            "llm": last_success_age("llm"),
+        },
+    }
+
+
+@router.api_route("/health", methods=["GET", "HEAD"])
+async def liveness():
+    """Liveness probe: the process is up and serving requests. Touches no dependencies."""
+    return {"status": "healthy"}
+
+
+@router.api_route("/ready", methods=["GET", "HEAD"])
+async def readiness():
+    """
+    Readiness probe: MongoDB answers a ping and the scheduler is running.
+    The report is cached for HEALTH_CACHE_SECONDS so frequent probes stay cheap;
+    concurrent probes share one check.
+    """
+    global _cached_report, _cached_at
+
+    async with _lock:
+        if _cached_report is None or time.monotonic() - _cached_at > READINESS_CACHE_SECONDS:
+            _cached_report = await _build_report()
+            _cached_at = time.monotonic()
+        report = _cached_report
+
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
@@ -7,6 +7,9 @@ import os
 backend_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(backend_dir)
 
+# Serverless: skip the in-process scheduler and defer database init to the first request
+os.environ.setdefault("SERVERLESS", "true")
+
 # Import the FastAPI app from main.py
 from main import app
 
@@ -1,14 +1,20 @@
+import logging
 from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from datetime import datetime
 
+from pymongo import ReturnDocument
+
 from models.user import User
 from models.order import Order, OrderStatus, PaymentStatus
 from services.message_policy import message_policy
+from services.notification_queue import notification_queue
+from phone import normalize_phone
 
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
+logger = logging.getLogger(__name__)
 
 
 # Request/Response Models
@@ -17,6 +23,12 @@ class CreateOrderRequest(BaseModel):
     whatsapp_number: str = Field(..., description="WhatsApp number with country code, e.g., +1234567890")
     product_name: Optional[str] = None
     amount: Optional[float] = None
+    
+    @field_validator("whatsapp_number")
+    @classmethod
+    def _normalize_whatsapp_number(cls, value: str) -> str:
+        # InvalidPhoneNumber is a ValueError: a 422 for the caller
+        return normalize_phone(value)
 
 
 class OrderResponse(BaseModel):
@@ -39,23 +51,30 @@ async def create_order(request: CreateOrderRequest):
     """
     Create a new order and send confirmation message.
     This is the main customer-facing endpoint.
+    
+    Two round-trips: the customer is created or renamed in one upsert, then
+    the order is inserted. The AI-personalized confirmation goes through the
+    notification queue, so the response doesn't wait on the LLM or Twilio.
     """
-    print(f"Received order creation request for: {request.name} ({request.whatsapp_number})")
+    logger.debug("Received order creation request for: %s", request.name)
     try:
-        # Create or find user
-        user = await User.find_one(User.whatsapp_number == request.whatsapp_number)
-        
-        if not user:
-            user = User(
-                name=request.name,
-                whatsapp_number=request.whatsapp_number
-            )
-            await user.insert()
-        else:
-            # Update name if changed
-            if user.name != request.name:
-                user.name = request.name
-                await user.save()
+        # Create or find user (and update the name if changed) in one atomic upsert
+        user_doc = await User.get_motor_collection().find_one_and_update(
+            {"whatsapp_number": request.whatsapp_number},
+            {
+                "$set": {"name": request.name},
+                "$setOnInsert": {"created_at": datetime.utcnow()},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        user = User(
+            id=user_doc["_id"],
+            name=user_doc["name"],
+            whatsapp_number=user_doc["whatsapp_number"],
+            # Users from before created_at was stored: fall back to the id's creation time
+            created_at=user_doc.get("created_at") or user_doc["_id"].generation_time.replace(tzinfo=None)
+        )
         
         # Create order
         order = Order(
@@ -67,8 +86,8 @@ async def create_order(request: CreateOrderRequest):
         )
         await order.insert()
         
-        # Send order confirmation via WhatsApp with AI personalization
-        await message_policy.send_order_confirmation(order)
+        # Send order confirmation via WhatsApp with AI personalization, off the request path
+        await notification_queue.enqueue("order_confirmation", order.id)
         
         return OrderResponse(
             id=str(order.id),
@@ -181,6 +200,7 @@ async def mark_order_shipped(
             raise HTTPException(status_code=404, detail="Order not found")
         
         order.status = OrderStatus.SHIPPED
+        order.shipped_at = datetime.utcnow()
         if tracking_id:
             order.tracking_id = tracking_id
         if carrier:
@@ -208,6 +228,7 @@ async def mark_order_delivered(order_id: str):
             raise HTTPException(status_code=404, detail="Order not found")
         
         order.status = OrderStatus.DELIVERED
+        order.delivered_at = datetime.utcnow()
         await order.save()
         
         # Send delivery notification and feedback request
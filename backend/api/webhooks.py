@@ -1,9 +1,41 @@
-from fastapi import APIRouter, Request, Response, HTTPException
+import os
+import hmac
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Request, Response, HTTPException, Header
+from pydantic import BaseModel, Field
 from services.message_policy import message_policy
+from services.tracking_service import tracking_service
+from services.tracking_carriers import ShipmentState
+from services.delivery_status import delivery_status_writer
+from phone import InvalidPhoneNumber, normalize_phone
+from models.order import Order
 from beanie import PydanticObjectId
 
+from logging_config import new_correlation_id
+
 
 router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
+logger = logging.getLogger(__name__)
+
+# Shared secret carriers send in X-Tracking-Token (unset: no check, for local development)
+TRACKING_WEBHOOK_TOKEN = os.getenv("TRACKING_WEBHOOK_TOKEN")
+TRACKING_WEBHOOK_MAX_EVENTS = int(os.getenv("TRACKING_WEBHOOK_MAX_EVENTS", "5000"))
+
+
+# Request Models
+class TrackingEvent(BaseModel):
+    tracking_id: str = Field(..., min_length=1)
+    status: str = Field(..., description="Carrier status, e.g. 'Out for Delivery', 'DELIVERED'")
+    carrier: Optional[str] = None
+    location: Optional[str] = None
+    eta: Optional[str] = None
+    occurred_at: Optional[datetime] = None
+
+
+class TrackingEventBatch(BaseModel):
+    events: List[TrackingEvent]
 
 
 @router.post("/whatsapp")
@@ -16,29 +48,31 @@ async def handle_whatsapp_webhook(request: Request):
     try:
         # Parse Twilio webhook data
         form_data = await request.form()
-        print(f"DEBUG: Webhook Payload: {dict(form_data)}")
+        
+        # Use Twilio's MessageSid as the correlation ID for everything this reply triggers
+        new_correlation_id(form_data.get("MessageSid"))
+        logger.debug("Webhook payload keys: %s", list(form_data.keys()))
         
         # Extract relevant fields
         from_number = form_data.get("From", "")
         message_body = form_data.get("Body", "")
         
-        # Check for interactive message payloads
-        button_payload = form_data.get("ButtonPayload")
-        list_id = form_data.get("ListId")
+        # Check for interactive message payloads; the intent router matches these IDs directly
+        payload = form_data.get("ButtonPayload") or form_data.get("ListId")
         
-        if button_payload:
-            print(f"🔹 Received Button Payload: {button_payload}")
-            message_body = button_payload 
-        elif list_id:
-            print(f"🔹 Received List ID: {list_id}")
-            message_body = list_id
+        if payload:
+            logger.debug("Received interactive payload: %s", payload)
+            if not message_body:
+                message_body = payload
         
-        # Clean the phone number (handle whatsapp: prefix and ensure +)
-        phone_number = from_number.replace("whatsapp:", "")
-        if not phone_number.startswith("+"):
-            phone_number = f"+{phone_number}"
+        # Same E.164 form users are stored in (drops the whatsapp: prefix)
+        try:
+            phone_number = normalize_phone(from_number)
+        except InvalidPhoneNumber:
+            logger.warning("Webhook sender number unreadable, cannot proceed")
+            return Response(content="", status_code=200)
         
-        print(f"📥 Incoming WhatsApp message from {phone_number}: {message_body}")
+        logger.info("Incoming WhatsApp message (%d chars)", len(message_body))
         
         # Find user
         from models.user import User
@@ -47,12 +81,6 @@ async def handle_whatsapp_webhook(request: Request):
         user = await User.find_one(User.whatsapp_number == phone_number)
         
         if user:
-            print(f"DEBUG: Found user {user.name} for number {phone_number}")
-            
-            # Diagnostic: Count all orders
-            all_orders_count = await Order.find_all().count()
-            print(f"DEBUG: Total orders in system: {all_orders_count}")
-            
             # Get the most recent order 
             # Using .id for the link comparison
             order = await Order.find(
@@ -60,22 +88,110 @@ async def handle_whatsapp_webhook(request: Request):
             ).sort(-Order.created_at).first_or_none()
             
             if order:
-                print(f"DEBUG: Found order {order.id} (status: {order.status}) for user {user.name}")
+                logger.debug("Found order %s (status: %s) for user %s", order.id, order.status, user.id)
                 # Process reply
-                await message_policy.process_customer_reply(order.id, message_body)
+                await message_policy.process_customer_reply(order.id, message_body, payload=payload)
             else:
-                print(f"⚠️ No orders found for user {phone_number} (User ID: {user.id})")
+                logger.warning("No orders found for user %s", user.id)
         else:
-            print(f"⚠️ Unknown user {phone_number}. Webhook cannot proceed.")
+            logger.warning("Unknown sender, webhook cannot proceed")
         
         return Response(content="", status_code=200)
         
     except Exception as e:
-        print(f"Error processing webhook: {str(e)}")
+        logger.exception("Error processing webhook: %s", str(e))
         # Still return 200 to prevent Twilio from retrying
         return Response(content="", status_code=200)
 
 
+@router.post("/whatsapp/status")
+async def handle_whatsapp_status_callback(request: Request):
+    """
+    Delivery status callbacks from Twilio (the StatusCallback URL set on
+    outgoing messages): queued, sent, delivered, read, failed.
+    
+    Events are buffered and applied to the message logs in bulk, so this
+    returns as soon as the event is queued.
+    """
+    try:
+        form_data = await request.form()
+        message_sid = form_data.get("MessageSid")
+        status = form_data.get("MessageStatus") or form_data.get("SmsStatus")
+        
+        if not await delivery_status_writer.record(message_sid, status, form_data.get("ErrorCode")):
+            logger.debug("Ignored status callback: %s", status)
+        
+    except Exception as e:
+        logger.exception("Error processing status callback: %s", str(e))
+    
+    # Always 200 so Twilio doesn't retry
+    return Response(content="", status_code=200)
+
+
+@router.post("/tracking")
+async def handle_tracking_webhook(batch: TrackingEventBatch, x_tracking_token: Optional[str] = Header(None)):
+    """
+    Batched shipment events pushed by carriers.
+    
+    Orders are resolved by tracking number in one query; each is moved to the
+    most advanced state reported for it (one guarded update per target
+    status) and the customer notifications are queued, not sent inline.
+    """
+    if TRACKING_WEBHOOK_TOKEN and not hmac.compare_digest(x_tracking_token or "", TRACKING_WEBHOOK_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid tracking webhook token")
+    if len(batch.events) > TRACKING_WEBHOOK_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {TRACKING_WEBHOOK_MAX_EVENTS} events per request")
+    
+    new_correlation_id()
+    try:
+        # Most advanced state per shipment; events may arrive out of order
+        latest: Dict[str, TrackingEvent] = {}
+        states: Dict[str, str] = {}
+        for event in batch.events:
+            state = ShipmentState.parse(event.status)
+            current = states.get(event.tracking_id)
+            if current is None or ShipmentState.RANK[state] >= ShipmentState.RANK[current]:
+                states[event.tracking_id] = state
+                latest[event.tracking_id] = event
+        
+        for tracking_id, event in latest.items():
+            tracking_service.remember({
+                "tracking_id": tracking_id,
+                "carrier": event.carrier or "Standard Shipping",
+                "status": event.status,
+                "state": states[tracking_id],
+                "location": event.location or "",
+                "eta": event.eta or "",
+            }, event.carrier)
+        
+        cursor = Order.get_motor_collection().find(
+            {"tracking_id": {"$in": list(states)}},
+            {"tracking_id": 1}
+        )
+        orders = await cursor.to_list(None)
+        
+        advanced = await tracking_service.advance_orders({
+            order["_id"]: states[order["tracking_id"]] for order in orders
+        })
+        
+        matched = {order["tracking_id"] for order in orders}
+        unknown = [tracking_id for tracking_id in states if tracking_id not in matched]
+        if unknown:
+            logger.info("Tracking webhook: %d events for unknown tracking IDs", len(unknown))
+        
+        return {
+            "received": len(batch.events),
+            "shipments": len(states),
+            "matched_orders": len(orders),
+            "advanced": {status: len(order_ids) for status, order_ids in advanced.items()},
+            "unknown_tracking_ids": unknown[:100],
+        }
+        
+    except Exception as e:
+        logger.exception("Error processing tracking webhook: %s", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/whatsapp")
 async def verify_whatsapp_webhook(request: Request):
     """
@@ -0,0 +1,65 @@
+"""
+Cold-start import-time report for the app entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+summarizes the result: total import time and the slowest packages anywhere in
+the import tree (cumulative, so a package's own imports are included).
+
+Run from the backend directory:
+    python -m benchmarks.import_time [--module main] [--top 15] [--runs 5]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def measure(module: str):
+    env = dict(os.environ)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.getcwd()
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    top_level = defaultdict(int)
+    total = 0
+    # Lines are "import time: self | cumulative | <2 spaces per nesting level>name"
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if indent == 1 and name == module:
+            total = cumulative
+        elif indent > 1:
+            # The outermost import of a package carries its whole cost
+            root = name.split(".")[0]
+            top_level[root] = max(top_level[root], cumulative)
+    return total, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    runs.sort(key=lambda run: run[0])
+    total, top_level = runs[len(runs) // 2]
+
+    print(f"import {args.module}: {total / 1000:.0f} ms (median of {args.runs} cold interpreters)")
+    print(f"{'package':<30} {'cumulative ms':>14}")
+    for name, micros in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<30} {micros / 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Hit rate, accuracy and latency of the intent router on a labelled reply corpus.
+
+The corpus mixes commands in several languages, typos, button/list payloads,
+ratings, emoji and genuine free text. Each reply is also run through the
+previous exact-match rules, for comparison. "Local" means resolved without an
+LLM call; free text answered by an emoji or rating sentiment counts as local too.
+
+Run from the backend directory:
+    python -m benchmarks.intent_router_bench [--typos 3] [--repeat 200]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.loadtest.report import percentile
+from services.intent_router import Intent, IntentRouter
+
+
+S, C, F, R, T = Intent.STATUS, Intent.CANCEL, Intent.FEEDBACK_PROMPT, Intent.RATING, Intent.FREE_TEXT
+
+# (reply text, button/list payload, expected intent)
+CORPUS = [
+    ("1", None, S), ("status", None, S), ("Status", None, S), ("check status", None, S), ("track", None, S),
+    ("Track my order", None, S), ("where is my order?", None, S), ("Where's my order", None, S),
+    ("order status please", None, S), ("tracking", None, S), ("📦", None, S), ("🚚", None, S),
+    ("¿Dónde está mi pedido?", None, S), ("estado del pedido", None, S), ("rastrear", None, S),
+    ("Onde está meu pedido?", None, S), ("suivi", None, S), ("Où est ma commande ?", None, S),
+    ("Wo ist meine Bestellung?", None, S), ("Check Status", "check_status", S), ("Track order", "TRACK_ORDER", S),
+    ("2", None, C), ("cancel", None, C), ("Cancel order", None, C), ("cancel_order", None, C),
+    ("please cancel my order", None, C), ("I want to cancel", None, C), ("cancelar", None, C),
+    ("cancelar mi pedido por favor", None, C), ("annuler ma commande", None, C), ("stornieren", None, C),
+    ("Bestellung stornieren bitte", None, C), ("❌", None, C), ("Cancel", "cancel_order", C), ("Cancel", "2", C),
+    ("3", None, F), ("feedback", None, F), ("Give feedback", None, F), ("leave a review", None, F),
+    ("📝", None, F), ("Feedback", "feedback", F),
+    ("5", None, R), ("5/5", None, R), ("4 stars", None, R), ("⭐⭐⭐⭐⭐", None, R), ("⭐⭐⭐", None, R),
+    ("rate 2", None, R), ("rating: 4", None, R), ("4 out of 5", None, R), ("5 estrellas", None, R),
+    ("Thanks, the tuna was incredibly fresh!", None, T), ("this is terrible, it arrived two days late", None, T),
+    ("can I change my delivery address?", None, T), ("do you deliver on Sundays?", None, T),
+    ("the salmon smelled off, I want a refund", None, T), ("great service as always", None, T),
+    ("don't cancel, I paid already", None, T), ("why was I charged twice", None, T),
+    ("hello", None, T), ("ok", None, T), ("👍", None, T), ("😡😡", None, T),
+    ("I want to cancel because it is too late now", None, T), ("Loved it, 5 stars, will order again", None, T),
+    ("can you send it tomorrow instead", None, T), ("who is the driver?", None, T),
+    ("I already paid by bank transfer this morning", None, T), ("gracias!", None, T),
+    # Real words one letter away from a short keyword
+    ("states", None, T), ("my order states", None, T), ("statue", None, T), ("the box states its damaged", None, T),
+]
+
+# Words whose typo'd versions should still resolve
+TYPO_SOURCES = [
+    ("status", S), ("tracking", S), ("cancel", C), ("cancelar", C), ("annuler", C),
+    ("stornieren", C), ("feedback", F), ("review", F), ("rastrear", S), ("cancellation", C),
+]
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word) - 1)
+    kind = rng.choice(("swap", "drop", "double", "replace"))
+    if kind == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == "drop":
+        return word[:i] + word[i + 1:]
+    if kind == "double":
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+
+
+def build_corpus(typos_per_word: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = list(CORPUS)
+    for word, intent in TYPO_SOURCES:
+        for _ in range(typos_per_word):
+            corpus.append((_typo(word, rng), None, intent))
+    return corpus
+
+
+def legacy_route(text: str, payload=None) -> Intent:
+    """The exact-match rules process_customer_reply used before the router"""
+    clean_reply = (payload or text).strip().lower()
+    if clean_reply in ["1", "status", "check status", "track"]:
+        return S
+    if clean_reply in ["2", "cancel", "cancel order", "cancel_order"]:
+        return C
+    if clean_reply == "3":
+        return F
+    return T
+
+
+def evaluate(name, route, corpus, repeat, clear_cache=None):
+    correct = local = 0
+    misses = []
+    latencies = []
+    for text, payload, expected in corpus:
+        result = route(text, payload)
+        intent = result.intent if hasattr(result, "intent") else result
+        sentiment = getattr(result, "sentiment", None)
+        correct += intent == expected
+        local += intent != T or sentiment is not None
+        if intent != expected:
+            misses.append((text, expected.value, intent.value))
+
+        elapsed = 0.0
+        for _ in range(repeat):
+            if clear_cache:
+                clear_cache()
+            start = time.perf_counter()
+            route(text, payload)
+            elapsed += time.perf_counter() - start
+        latencies.append(elapsed / repeat * 1e6)
+
+    latencies.sort()
+    commands = sum(1 for _, _, expected in corpus if expected != T)
+    print(
+        f"{name:<10} accuracy {correct / len(corpus):6.1%}   resolved locally {local / len(corpus):6.1%} "
+        f"(commands/ratings in corpus {commands / len(corpus):.1%})   "
+        f"p50 {percentile(latencies, 50):6.1f} us   p99 {percentile(latencies, 99):6.1f} us"
+    )
+    return misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--typos", type=int, default=3, help="Misspelled variants per keyword")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing iterations per reply")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.typos)
+    start = time.perf_counter()
+    router = IntentRouter()
+    print(f"{len(corpus)} replies, router compiled in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    evaluate("legacy", legacy_route, corpus, args.repeat)
+    misses = evaluate("router", router.route, corpus, args.repeat)
+    # Every distinct misspelling walks the trie once before it is cached
+    evaluate("uncached", router.route, corpus, args.repeat, clear_cache=router.keywords.lookup.cache_clear)
+    if args.show_misses:
+        for text, expected, got in misses:
+            print(f"  {text!r}: expected {expected}, got {got}")
+
+
+if __name__ == "__main__":
+    main()
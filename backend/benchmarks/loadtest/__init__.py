@@ -0,0 +1,8 @@
+"""
+End-to-end load test: the real app (uvicorn) against a local MongoDB database,
+a stand-in Twilio Messages API and the stub LLM provider.
+
+Run from the backend directory:
+    python -m benchmarks.loadtest --duration 60 --concurrency 50 --output baseline.json
+    python -m benchmarks.loadtest --compare baseline.json
+"""
@@ -0,0 +1,261 @@
+"""
+End-to-end load test of the API.
+
+Boots the app with uvicorn against a dedicated MongoDB database (dropped at
+the start of each run), a local Twilio stand-in (benchmarks/loadtest/stub_twilio.py)
+and the stub LLM provider, then drives a closed-loop request mix (see
+scenarios.MIXES) from --concurrency virtual clients. Requests during the
+warmup are not counted. Afterwards the scheduled jobs are timed in-process
+against the orders the run created, aged so each job has work to do.
+
+Reports requests, errors, throughput and p50/p95/p99 per endpoint; --output
+saves them as a JSON baseline, --compare diffs against a saved one.
+
+Run from the backend directory (needs a local MongoDB):
+    python -m benchmarks.loadtest --duration 60 --concurrency 50 --output baseline.json
+    python -m benchmarks.loadtest --compare baseline.json --fail-threshold 0.1
+    python -m benchmarks.loadtest --mix replies --twilio-latency-ms 300 --twilio-error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.loadtest.report import compare, print_table, summarize
+from benchmarks.loadtest.scenarios import ENDPOINTS, MIXES, Workload
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _serve(app: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited during startup (code {process.returncode})")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+def _app_env(args, twilio_url: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "MONGODB_URI": args.mongodb_uri,
+        "MONGODB_DATABASE": args.database,
+        "TWILIO_API_BASE_URL": twilio_url,
+        "TWILIO_ACCOUNT_SID": "ACloadtest",
+        "TWILIO_AUTH_TOKEN": "loadtest",
+        "TWILIO_WHATSAPP_NUMBER": "whatsapp:+15550000000",
+        "AI_PROVIDER": "stub",
+        "AI_FALLBACK_PROVIDERS": "",
+        "AI_STUB_LATENCY_MS": str(args.llm_latency_ms),
+        "TRACKING_POLL_INTERVAL_MINUTES": "0",
+        "LOG_LEVEL": os.getenv("LOADTEST_LOG_LEVEL", "WARNING"),
+        "SERVERLESS": "false",
+    })
+    return env
+
+
+def _reset_database(uri: str, name: str) -> None:
+    from pymongo import MongoClient
+
+    if "loadtest" not in name:
+        raise SystemExit(f"Refusing to drop {name!r}: the load test database name must contain 'loadtest'")
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    try:
+        client.drop_database(name)
+    finally:
+        client.close()
+
+
+async def drive(base_url: str, workload: Workload, concurrency: int, warmup: float, duration: float, timeout: float):
+    """Run the mix from `concurrency` clients; returns (latencies, errors, measured seconds) per endpoint"""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        measure_from = time.perf_counter() + warmup
+        stop = measure_from + duration
+
+        async def client_loop():
+            while time.perf_counter() < stop:
+                operation = workload.next_operation()
+                start = time.perf_counter()
+                try:
+                    name, response = await operation(client)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    name, failed = ENDPOINTS[operation.__name__], True
+                if start >= measure_from:
+                    latencies[name].append(time.perf_counter() - start)
+                    errors[name] += failed
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        measured = time.perf_counter() - measure_from
+
+    return latencies, errors, measured
+
+
+async def time_jobs(env: dict) -> dict:
+    """Run each scheduled job once, in-process, with the run's orders aged into its window"""
+    os.environ.update(env)
+    from database import init_db, close_db
+    from models.order import Order
+    from scheduler.reminder_scheduler import reminder_scheduler
+    from services.message_policy import message_policy
+
+    jobs = [
+        ("payment_reminder_5min", timedelta(minutes=7), reminder_scheduler.send_5min_reminders),
+        ("payment_reminder_24hour", timedelta(hours=24, minutes=30), reminder_scheduler.send_24hour_reminders),
+        ("no_response_check", timedelta(hours=49), message_policy.check_no_response_alerts),
+    ]
+    results = {}
+    await init_db()
+    try:
+        collection = Order.get_motor_collection()
+        for name, age, job in jobs:
+            aged = await collection.update_many({}, {"$set": {"created_at": datetime.utcnow() - age}})
+            start = time.perf_counter()
+            await job()
+            results[name] = {"orders": aged.modified_count, "seconds": round(time.perf_counter() - start, 3)}
+    finally:
+        await close_db()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual clients")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before that")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--request-timeout", type=float, default=30)
+    parser.add_argument("--mongodb-uri", default=os.getenv("LOADTEST_MONGODB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="order_followup_loadtest", help="Dropped at the start of each run")
+    parser.add_argument("--twilio-latency-ms", type=float, default=50)
+    parser.add_argument("--twilio-jitter-ms", type=float, default=20)
+    parser.add_argument("--twilio-error-rate", type=float, default=0.0, help="Share of sends answered with 503")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--skip-jobs", action="store_true", help="Don't time the scheduled jobs")
+    parser.add_argument("--app-url", help="Load an already running app instead (no database reset, no job timing)")
+    parser.add_argument("--output", help="Write the report as JSON here")
+    parser.add_argument("--compare", help="Baseline JSON to compare with")
+    parser.add_argument("--fail-threshold", type=float, help="With --compare: exit 1 if any p95 or throughput regresses by more than this fraction")
+    args = parser.parse_args()
+
+    processes = []
+    twilio_stats = None
+    try:
+        if args.app_url:
+            base_url = args.app_url.rstrip("/")
+            env = None
+        else:
+            _reset_database(args.mongodb_uri, args.database)
+
+            twilio_port, app_port = _free_port(), _free_port()
+            twilio_url = f"http://127.0.0.1:{twilio_port}"
+            stub_env = dict(os.environ)
+            stub_env.update({
+                "STUB_TWILIO_LATENCY_MS": str(args.twilio_latency_ms),
+                "STUB_TWILIO_JITTER_MS": str(args.twilio_jitter_ms),
+                "STUB_TWILIO_ERROR_RATE": str(args.twilio_error_rate),
+                "STUB_TWILIO_SEED": str(args.seed),
+            })
+            processes.append(_serve("benchmarks.loadtest.stub_twilio:app", twilio_port, stub_env))
+            _wait_ready(f"{twilio_url}/stats", processes[-1])
+
+            env = _app_env(args, twilio_url)
+            base_url = f"http://127.0.0.1:{app_port}"
+            processes.append(_serve("main:app", app_port, env))
+            _wait_ready(f"{base_url}/ready", processes[-1])
+
+        print(f"Load test: mix={args.mix} concurrency={args.concurrency} warmup={args.warmup:g}s duration={args.duration:g}s -> {base_url}")
+        workload = Workload(args.mix, seed=args.seed)
+        latencies, errors, measured = asyncio.run(
+            drive(base_url, workload, args.concurrency, args.warmup, args.duration, args.request_timeout)
+        )
+
+        if not args.app_url:
+            twilio_stats = httpx.get(f"{twilio_url}/stats", timeout=5).json()
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration_seconds": round(measured, 2),
+            "warmup_seconds": args.warmup,
+            "seed": args.seed,
+            "twilio_latency_ms": args.twilio_latency_ms,
+            "twilio_error_rate": args.twilio_error_rate,
+            "llm_latency_ms": args.llm_latency_ms,
+            "twilio_stub": twilio_stats,
+        },
+        "endpoints": {name: summarize(latencies[name], errors[name], measured) for name in sorted(latencies)},
+        "total": summarize(all_latencies, sum(errors.values()), measured),
+        "jobs": {},
+    }
+    if env is not None and not args.skip_jobs:
+        report["jobs"] = asyncio.run(time_jobs(env))
+
+    print_table(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    if args.compare and not compare(args.compare, report, args.fail_threshold):
+        print(f"\nRegression beyond {args.fail_threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Latency/throughput summaries for a load test run, the JSON baseline format,
+and comparison of two baselines.
+"""
+import json
+from typing import Dict, List, Optional
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict[str, float]:
+    """Summary of one endpoint's samples (seconds) as the baseline stores it (milliseconds)"""
+    samples = sorted(latencies)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / duration, 2) if duration else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+    }
+
+
+def print_table(report: dict) -> None:
+    print(f"\n{'endpoint':<42} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        print(
+            f"{name:<42} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+    if report.get("jobs"):
+        print(f"\n{'scheduled job':<42} {'orders':>7} {'seconds':>9}")
+        for name, stats in report["jobs"].items():
+            print(f"{name:<42} {stats['orders']:>7} {stats['seconds']:>9.3f}")
+
+
+def _change(old: float, new: float) -> str:
+    if not old:
+        return "     n/a"
+    return f"{(new - old) / old:+8.1%}"
+
+
+def compare(baseline_path: str, report: dict, threshold: Optional[float] = None) -> bool:
+    """
+    Print per-endpoint changes against a saved baseline. With `threshold`
+    (e.g. 0.1), returns False when any endpoint's p95 got that much slower
+    or its throughput that much lower.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('git_commit') or 'unknown commit'})")
+    print(f"{'endpoint':<42} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    ok = True
+    for name, stats in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        old = baseline["total"] if name == "TOTAL" else baseline["endpoints"].get(name)
+        if old is None:
+            print(f"{name:<42} (not in baseline)")
+            continue
+        print(
+            f"{name:<42} {_change(old['throughput_rps'], stats['throughput_rps'])} "
+            f"{_change(old['p50_ms'], stats['p50_ms'])} {_change(old['p95_ms'], stats['p95_ms'])} "
+            f"{_change(old['p99_ms'], stats['p99_ms'])}"
+        )
+        if threshold is not None and old["p95_ms"] and old["throughput_rps"]:
+            slower = (stats["p95_ms"] - old["p95_ms"]) / old["p95_ms"] > threshold
+            fewer = (old["throughput_rps"] - stats["throughput_rps"]) / old["throughput_rps"] > threshold
+            ok = ok and not (slower or fewer)
+    return ok
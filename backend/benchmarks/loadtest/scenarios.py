@@ -0,0 +1,164 @@
+"""
+The request mix a load test drives: customers placing orders, the payment
+gateway and warehouse moving them along, customers replying on WhatsApp, and
+staff browsing the dashboard. Orders only get requests that are valid for
+their current stage, like real traffic.
+"""
+import random
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+
+# Operation weights per named mix
+MIXES: Dict[str, Dict[str, int]] = {
+    "default": {
+        "create_order": 25, "pay": 15, "process": 8, "ship": 8, "deliver": 6,
+        "reply": 25, "admin_orders": 8, "get_order": 5,
+    },
+    # Inbound-heavy: a campaign went out and customers are answering
+    "replies": {"create_order": 10, "pay": 5, "reply": 80, "admin_orders": 5},
+    # Dashboard-heavy: support staff working through the order list
+    "admin": {"create_order": 10, "pay": 5, "reply": 10, "admin_orders": 60, "get_order": 15},
+}
+
+# (reply text, button payload); commands, ratings and free text in rough production proportions
+REPLIES: List[Tuple[str, Optional[str]]] = [
+    ("1", None), ("status", None), ("Where is my order?", None), ("Check Status", "check_status"),
+    ("3", None), ("5", None), ("4 stars", None), ("⭐⭐⭐⭐⭐", None),
+    ("Thanks, the tuna was incredibly fresh!", None), ("can I change my delivery address?", None),
+    ("this is terrible, it arrived two days late", None), ("do you deliver on Sundays?", None),
+    ("great service as always", None), ("why was I charged twice", None), ("ok", None),
+]
+
+PRODUCTS = [("Atlantic Salmon 1kg", 24.5), ("Yellowfin Tuna Steaks", 31.0), ("Tiger Prawns 500g", 18.75), ("Sea Bass Fillets", 22.0)]
+
+
+# Endpoint each operation is reported under
+ENDPOINTS: Dict[str, str] = {
+    "create_order": "POST /api/orders",
+    "pay": "PATCH /api/orders/{id}/payment-status",
+    "process": "PATCH /api/orders/{id}/process",
+    "ship": "PATCH /api/orders/{id}/ship",
+    "deliver": "PATCH /api/orders/{id}/deliver",
+    "reply": "POST /api/webhooks/whatsapp",
+    "admin_orders": "GET /api/admin/orders",
+    "get_order": "GET /api/orders/{id}",
+}
+
+
+class Workload:
+    """
+    Picks the next request and tracks which stage each order the run created
+    is in. Each operation returns the endpoint it was reported under (see
+    ENDPOINTS; operations with nothing to act on place an order instead)
+    and the HTTP response.
+    """
+
+    def __init__(self, mix: str = "default", seed: int = 1, number_prefix: str = "+1555"):
+        self.weights = MIXES[mix]
+        self.rng = random.Random(seed)
+        self.number_prefix = number_prefix
+        self._numbers = itertools.count()
+        self._messages = itertools.count()
+        self.customers: List[str] = []
+        # Order IDs by the stage they're in, as far as this run knows
+        self.stages: Dict[str, List[str]] = {"CREATED": [], "PAID": [], "IN_PROCESS": [], "SHIPPED": [], "DELIVERED": []}
+
+        self.operations: Dict[str, Callable] = {
+            "create_order": self.create_order,
+            "pay": self.pay,
+            "process": self.process,
+            "ship": self.ship,
+            "deliver": self.deliver,
+            "reply": self.reply,
+            "admin_orders": self.admin_orders,
+            "get_order": self.get_order,
+        }
+        self._names = list(self.weights)
+        self._cumulative = list(itertools.accumulate(self.weights.values()))
+
+    def next_operation(self) -> Callable:
+        return self.operations[self.rng.choices(self._names, cum_weights=self._cumulative)[0]]
+
+    def _take(self, stage: str) -> Optional[str]:
+        orders = self.stages[stage]
+        if not orders:
+            return None
+        # Swap-remove: O(1), and order within a stage doesn't matter
+        i = self.rng.randrange(len(orders))
+        orders[i], orders[-1] = orders[-1], orders[i]
+        return orders.pop()
+
+    async def create_order(self, client: httpx.AsyncClient):
+        # Mostly new customers, some returning ones
+        if self.customers and self.rng.random() < 0.3:
+            number = self.rng.choice(self.customers)
+        else:
+            number = f"{self.number_prefix}{next(self._numbers):07d}"
+            self.customers.append(number)
+        product, amount = self.rng.choice(PRODUCTS)
+        response = await client.post("/api/orders/", json={
+            "name": f"Load Test {number[-4:]}",
+            "whatsapp_number": number,
+            "product_name": product,
+            "amount": amount,
+        })
+        if response.status_code == 201:
+            order_id = response.json()["id"]
+            self.stages["CREATED"].append(order_id)
+        return ENDPOINTS["create_order"], response
+
+    async def _advance(self, client: httpx.AsyncClient, operation: str, from_stage: str, to_stage: str, path: str, params=None):
+        order_id = self._take(from_stage)
+        if order_id is None:
+            return await self.create_order(client)
+        response = await client.patch(path.format(order_id=order_id), params=params)
+        # A failed transition leaves the order where it was
+        self.stages[to_stage if response.status_code == 200 else from_stage].append(order_id)
+        return ENDPOINTS[operation], response
+
+    async def pay(self, client: httpx.AsyncClient):
+        return await self._advance(
+            client, "pay", "CREATED", "PAID",
+            "/api/orders/{order_id}/payment-status", params={"paid": "true"}
+        )
+
+    async def process(self, client: httpx.AsyncClient):
+        return await self._advance(client, "process", "PAID", "IN_PROCESS", "/api/orders/{order_id}/process")
+
+    async def ship(self, client: httpx.AsyncClient):
+        tracking_id = f"LT{self.rng.randrange(10 ** 9):09d}"
+        return await self._advance(
+            client, "ship", "IN_PROCESS", "SHIPPED",
+            "/api/orders/{order_id}/ship", params={"tracking_id": tracking_id, "carrier": "mock"}
+        )
+
+    async def deliver(self, client: httpx.AsyncClient):
+        return await self._advance(client, "deliver", "SHIPPED", "DELIVERED", "/api/orders/{order_id}/deliver")
+
+    async def reply(self, client: httpx.AsyncClient):
+        if not self.customers:
+            return await self.create_order(client)
+        text, payload = self.rng.choice(REPLIES)
+        form = {
+            "From": f"whatsapp:{self.rng.choice(self.customers)}",
+            "Body": text,
+            "MessageSid": f"SMLT{next(self._messages):030d}",
+        }
+        if payload:
+            form["ButtonPayload"] = payload
+        return ENDPOINTS["reply"], await client.post("/api/webhooks/whatsapp", data=form)
+
+    async def admin_orders(self, client: httpx.AsyncClient):
+        # Mostly the first page, sometimes deeper
+        skip = 0 if self.rng.random() < 0.7 else self.rng.randrange(1, 20) * 50
+        return ENDPOINTS["admin_orders"], await client.get("/api/admin/orders", params={"skip": skip, "limit": 50})
+
+    async def get_order(self, client: httpx.AsyncClient):
+        stages = [orders for orders in self.stages.values() if orders]
+        if not stages:
+            return await self.create_order(client)
+        order_id = self.rng.choice(self.rng.choice(stages))
+        return ENDPOINTS["get_order"], await client.get(f"/api/orders/{order_id}")
@@ -0,0 +1,60 @@
+"""
+Stand-in for the Twilio Messages API, for load tests.
+
+Accepts sends on the same path as Twilio and answers like it does (201 with a
+message SID), after STUB_TWILIO_LATENCY_MS (plus up to STUB_TWILIO_JITTER_MS).
+STUB_TWILIO_ERROR_RATE of sends get a 503 instead, to exercise the retry and
+circuit breaker paths. GET /stats reports what was received.
+
+Started by the load test runner, or on its own:
+    STUB_TWILIO_LATENCY_MS=80 uvicorn benchmarks.loadtest.stub_twilio:app --port 8099
+"""
+import os
+import random
+import asyncio
+import itertools
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+LATENCY = float(os.getenv("STUB_TWILIO_LATENCY_MS", "50")) / 1000
+JITTER = float(os.getenv("STUB_TWILIO_JITTER_MS", "20")) / 1000
+ERROR_RATE = float(os.getenv("STUB_TWILIO_ERROR_RATE", "0"))
+
+app = FastAPI(title="Twilio stand-in")
+_sids = itertools.count(1)
+_stats = {"sent": 0, "failed": 0}
+_rng = random.Random(int(os.getenv("STUB_TWILIO_SEED", "1")))
+
+
+@app.post("/2010-04-01/Accounts/{account_sid}/Messages.json")
+async def create_message(account_sid: str, request: Request):
+    form = await request.form()
+    await asyncio.sleep(LATENCY + _rng.uniform(0, JITTER))
+
+    if _rng.random() < ERROR_RATE:
+        _stats["failed"] += 1
+        return JSONResponse({"code": 20500, "message": "Service unavailable (stub)"}, status_code=503)
+
+    _stats["sent"] += 1
+    return JSONResponse(
+        {
+            "sid": f"SM{next(_sids):032x}",
+            "account_sid": account_sid,
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "status": "queued",
+        },
+        status_code=201
+    )
+
+
+@app.get("/2010-04-01/Accounts/{account_sid}/Messages.json")
+async def list_messages(account_sid: str):
+    return {"messages": []}
+
+
+@app.get("/stats")
+async def stats():
+    return _stats
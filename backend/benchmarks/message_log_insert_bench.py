@@ -0,0 +1,111 @@
+"""
+MessageLog insert throughput: one insert per record (what every send path
+did before) against the buffered MessageLogWriter at different batch sizes
+and write concerns.
+
+Each run writes --records logs from --concurrency tasks, the way a reminder
+sweep or a burst of webhooks would, and reports records/s until everything
+is durable (the writer is stopped, i.e. flushed, inside the timing).
+
+Uses its own database (default order_followup_bench) on MONGODB_URI.
+Run from the backend directory:
+    python -m benchmarks.message_log_insert_bench [--records 5000] [--batch-sizes 1,10,100,500,1000]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault("MONGODB_DATABASE", "order_followup_bench")
+
+from beanie import PydanticObjectId
+from bson import DBRef
+
+from database import init_db, close_db
+from models.message_log import MessageLog, MessageType
+from services.message_log_writer import MessageLogWriter, _write_concern
+
+
+BENCH_MARKER = "message-log-insert-bench"
+
+
+def _record(i: int) -> MessageLog:
+    return MessageLog(
+        order_id=DBRef("orders", PydanticObjectId()),
+        message_type=MessageType.PAYMENT_REMINDER_1,
+        message_content=f"Reminder {i}: your payment is pending",
+        whatsapp_message_id=f"{BENCH_MARKER}-{i}",
+    )
+
+
+async def _produce(write, records: int, concurrency: int) -> None:
+    async def producer(offset):
+        for i in range(offset, records, concurrency):
+            await write(_record(i))
+
+    await asyncio.gather(*(producer(offset) for offset in range(concurrency)))
+
+
+async def _single_inserts(records: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    await _produce(lambda log: log.insert(), records, concurrency)
+    return time.perf_counter() - start
+
+
+async def _writer(records: int, concurrency: int, batch_size: int, write_concern: str) -> float:
+    writer = MessageLogWriter()
+    writer.batch_size = batch_size
+    writer.max_buffer = max(writer.max_buffer, batch_size)
+    writer.write_concern = _write_concern(write_concern)
+    start = time.perf_counter()
+    writer.start()
+    await _produce(writer.write, records, concurrency)
+    await writer.stop()
+    return time.perf_counter() - start
+
+
+async def _cleanup() -> None:
+    await MessageLog.get_motor_collection().delete_many({"whatsapp_message_id": {"$regex": f"^{BENCH_MARKER}"}})
+
+
+async def run(records: int, concurrency: int, batch_sizes, write_concerns) -> None:
+    await init_db()
+    try:
+        await _cleanup()
+        print(f"{records} records from {concurrency} tasks")
+        print(f"{'mode':<28} {'seconds':>9} {'records/s':>11}")
+
+        elapsed = await _single_inserts(records, concurrency)
+        print(f"{'insert() per record':<28} {elapsed:>9.2f} {records / elapsed:>11,.0f}")
+        await _cleanup()
+
+        for write_concern in write_concerns:
+            for batch_size in batch_sizes:
+                elapsed = await _writer(records, concurrency, batch_size, write_concern)
+                print(f"{f'writer batch={batch_size} w={write_concern}':<28} {elapsed:>9.2f} {records / elapsed:>11,.0f}")
+                await _cleanup()
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--batch-sizes", default="1,10,100,500,1000")
+    parser.add_argument("--write-concerns", default="1,majority", help='Comma-separated: "0", "1", "majority"')
+    args = parser.parse_args()
+
+    asyncio.run(run(
+        args.records,
+        args.concurrency,
+        [int(size) for size in args.batch_sizes.split(",")],
+        [value.strip() for value in args.write_concerns.split(",")],
+    ))
+
+
+if __name__ == "__main__":
+    main()
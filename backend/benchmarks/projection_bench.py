@@ -0,0 +1,92 @@
+"""
+Bytes-per-page and read time for the admin list endpoints, before and after
+projection.
+
+"full" is what the list endpoints used to read (whole Beanie documents),
+"list view" is the OrderListView / MessageLogListView projection, and
+"fields=" is a narrowed projection like the dashboard's compact views.
+
+Needs a populated database (MONGODB_URI / MONGODB_DATABASE). Run from the
+backend directory:
+    python -m benchmarks.projection_bench [--page 50] [--repeat 20]
+"""
+import argparse
+import asyncio
+import time
+
+import bson
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import init_db, close_db
+from models.order import Order, OrderListView
+from models.message_log import MessageLog, MessageLogListView
+from api.fast_json import projection_for, ORDER_SUMMARY_PROJECTION, MESSAGE_LOG_PROJECTION
+
+
+async def _page_bytes(document_model, sort_field, page, projection=None):
+    cursor = document_model.get_motor_collection().find({}, projection)
+    docs = await cursor.sort(sort_field, -1).limit(page).to_list(length=page)
+    return sum(len(bson.encode(doc)) for doc in docs), len(docs)
+
+
+async def _median_ms(make_query, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await make_query().to_list()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+async def run(page, repeat):
+    await init_db()
+
+    cases = [
+        (
+            "orders", Order, "created_at",
+            lambda: Order.find_all().sort(-Order.created_at).limit(page),
+            lambda: Order.find_all().sort(-Order.created_at).limit(page).project(OrderListView),
+            ORDER_SUMMARY_PROJECTION,
+            projection_for(["id", "status", "payment_status", "created_at"], ORDER_SUMMARY_PROJECTION),
+        ),
+        (
+            "messages", MessageLog, "sent_at",
+            lambda: MessageLog.find_all().sort(-MessageLog.sent_at).limit(page),
+            lambda: MessageLog.find_all().sort(-MessageLog.sent_at).limit(page).project(MessageLogListView),
+            MESSAGE_LOG_PROJECTION,
+            projection_for(["id", "message_type", "sent_at", "is_incoming"], MESSAGE_LOG_PROJECTION),
+        ),
+    ]
+
+    print(f"Page size {page}, median of {repeat} runs")
+    print(f"{'endpoint':<10} {'variant':<10} {'bytes/page':>12} {'read (ms)':>10}")
+    for name, model, sort_field, full_query, view_query, view_projection, narrow_projection in cases:
+        full_bytes, rows = await _page_bytes(model, sort_field, page)
+        view_bytes, _ = await _page_bytes(model, sort_field, page, view_projection)
+        narrow_bytes, _ = await _page_bytes(model, sort_field, page, narrow_projection)
+        if not rows:
+            print(f"{name:<10} (no documents, seed the database first)")
+            continue
+
+        full_ms = await _median_ms(full_query, repeat)
+        view_ms = await _median_ms(view_query, repeat)
+        print(f"{name:<10} {'full':<10} {full_bytes:>12} {full_ms:>10.2f}")
+        print(f"{name:<10} {'list view':<10} {view_bytes:>12} {view_ms:>10.2f}")
+        print(f"{name:<10} {'fields=':<10} {narrow_bytes:>12} {'-':>10}")
+
+    await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.page, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Scale test: how admin endpoints and scheduler queries behave as the data grows.
+
+For each size it uses the synthetic dataset order_followup_scale_<size>
+(generated by benchmarks.synthetic_dataset, or here with --generate) and
+times:
+  - the admin list endpoints, called in-process through the ASGI app so the
+    real handler code runs (first page, a deep page, a narrowed fields= page,
+    filtered lists);
+  - the queries the scheduled jobs run, read-only, with their query plan
+    (index vs collection scan) and keys/documents examined, which is where
+    a regression in query shape shows up first.
+
+Results can be saved as JSON (--output) and compared with a previous run
+(--compare). Run from the backend directory:
+    python -m benchmarks.scale_test --sizes 10000,100000,1000000 --generate [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from benchmarks.loadtest.report import percentile
+from benchmarks.synthetic_dataset import generate
+
+
+# Admin endpoints: (name, path); {order_id} is filled with an order from the dataset
+ADMIN_REQUESTS = [
+    ("admin orders, first page", "/api/admin/orders?limit=50"),
+    ("admin orders, skip 5000", "/api/admin/orders?skip=5000&limit=50"),
+    ("admin orders, fields=", "/api/admin/orders?limit=50&fields=id,status,created_at"),
+    ("admin messages, first page", "/api/admin/messages?limit=100"),
+    ("admin messages, one order", "/api/admin/messages?order_id={order_id}"),
+    ("admin alerts, unresolved", "/api/admin/alerts?resolved=false"),
+    ("admin alerts, all", "/api/admin/alerts"),
+    ("order detail", "/api/orders/{order_id}"),
+]
+
+
+def scheduler_queries(now: datetime):
+    """
+    The filters the scheduled jobs run (reminder_scheduler, message_policy,
+    tracking_service, retention_service), as (name, collection, filter, sort,
+    limit). Keep in step with the jobs.
+    """
+    return [
+        ("payment_reminder_5min", "orders", {
+            "payment_status": "PENDING", "automation_enabled": True, "payment_reminder_1_sent_at": None,
+            "created_at": {"$lte": now - timedelta(minutes=5), "$gte": now - timedelta(minutes=10)},
+        }, None, 0),
+        ("payment_reminder_24hour", "orders", {
+            "payment_status": "PENDING", "automation_enabled": True, "payment_reminder_2_sent_at": None,
+            "created_at": {"$lte": now - timedelta(hours=24), "$gte": now - timedelta(hours=25)},
+        }, None, 0),
+        ("no_response_check", "orders", {
+            "automation_enabled": True, "created_at": {"$lt": now - timedelta(hours=48)}, "last_customer_reply_at": None,
+        }, None, 0),
+        ("tracking_poll page", "orders", {
+            "status": {"$in": ["SHIPPED", "OUT_FOR_DELIVERY"]}, "tracking_id": {"$ne": None},
+        }, [("_id", 1)], 500),
+        ("retention expired messages", "message_logs", {
+            "sent_at": {"$lt": now - timedelta(days=int(os.getenv("MESSAGE_LOG_RETENTION_DAYS", "90")))},
+        }, [("sent_at", 1)], 1000),
+    ]
+
+
+def _stages(plan: dict):
+    """Stage names of a winning plan, outermost first"""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+async def _explain(db, collection: str, query: dict, sort, limit: int) -> dict:
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+    result = await db.command({"explain": command, "verbosity": "executionStats"})
+    stats = result["executionStats"]
+    return {
+        "plan": ">".join(_stages(result["queryPlanner"]["winningPlan"])),
+        "keys_examined": stats["totalKeysExamined"],
+        "docs_examined": stats["totalDocsExamined"],
+    }
+
+
+def _summary(samples) -> dict:
+    samples = sorted(samples)
+    return {"p50_ms": round(percentile(samples, 50) * 1000, 2), "p95_ms": round(percentile(samples, 95) * 1000, 2)}
+
+
+async def run_size(size: int, repeat: int, generate_missing: bool) -> dict:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    database_name = f"order_followup_scale_{size}"
+    probe = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    existing = await probe[database_name]["orders"].estimated_document_count()
+    probe.close()
+    if not existing:
+        if not generate_missing:
+            raise SystemExit(f"{database_name} is empty; run benchmarks.synthetic_dataset --orders {size} or pass --generate")
+        await generate(database_name, size)
+
+    os.environ["MONGODB_DATABASE"] = database_name
+    from database import init_db, close_db
+    from models.order import Order
+    import main
+
+    await init_db()
+    results = {}
+    try:
+        db = Order.get_motor_collection().database
+        sample = await db["orders"].find_one({"status": "DELIVERED"}, {"_id": 1}) or await db["orders"].find_one({}, {"_id": 1})
+        order_id = str(sample["_id"])
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://scale-test") as client:
+            for name, path in ADMIN_REQUESTS:
+                url = path.format(order_id=order_id)
+                samples = []
+                response = None
+                for _ in range(repeat + 1):
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    samples.append(time.perf_counter() - start)
+                # The first call warms caches and is not counted
+                results[name] = {**_summary(samples[1:]), "status": response.status_code, "bytes": len(response.content)}
+
+        for name, collection, query, sort, limit in scheduler_queries(datetime.utcnow()):
+            samples = []
+            returned = 0
+            for _ in range(repeat + 1):
+                # Whole documents, as the jobs load them
+                cursor = db[collection].find(query)
+                if sort:
+                    cursor = cursor.sort(sort)
+                if limit:
+                    cursor = cursor.limit(limit)
+                start = time.perf_counter()
+                returned = len(await cursor.to_list(None))
+                samples.append(time.perf_counter() - start)
+            results[name] = {**_summary(samples[1:]), "returned": returned, **await _explain(db, collection, query, sort, limit)}
+    finally:
+        await close_db()
+    return results
+
+
+def _print(size: int, results: dict) -> None:
+    print(f"\n{size:,} orders")
+    print(f"{'query':<32} {'p50 ms':>9} {'p95 ms':>9} {'rows/http':>9} {'keys':>9} {'docs':>9}  plan")
+    for name, stats in results.items():
+        rows = stats.get("returned", stats.get("status"))
+        print(
+            f"{name:<32} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {rows:>9} "
+            f"{stats.get('keys_examined', ''):>9} {stats.get('docs_examined', ''):>9}  {stats.get('plan', '')}"
+        )
+
+
+def _compare(baseline_path: str, report: dict) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('timestamp')})")
+    for size, results in report["sizes"].items():
+        old_results = baseline["sizes"].get(size, {})
+        for name, stats in results.items():
+            old = old_results.get(name)
+            if not old or not old["p50_ms"]:
+                continue
+            change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"]
+            plan_change = f"  plan {old.get('plan')} -> {stats.get('plan')}" if old.get("plan") != stats.get("plan") else ""
+            print(f"{int(size):>10,} {name:<32} p50 {change:+7.1%}{plan_change}")
+
+
+async def run(sizes, repeat: int, generate_missing: bool) -> dict:
+    report = {"meta": {"timestamp": datetime.utcnow().isoformat() + "Z", "repeat": repeat}, "sizes": {}}
+    for size in sizes:
+        results = await run_size(size, repeat, generate_missing)
+        report["sizes"][str(size)] = results
+        _print(size, results)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated order counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (after one warmup)")
+    parser.add_argument("--generate", action="store_true", help="Generate missing datasets")
+    parser.add_argument("--output", help="Write the results as JSON here")
+    parser.add_argument("--compare", help="Previous results JSON to compare with")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = asyncio.run(run(sizes, args.repeat, args.generate))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        _compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
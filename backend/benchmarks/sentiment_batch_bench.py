@@ -0,0 +1,89 @@
+"""
+LLM request count and per-reply latency of sentiment classification, with
+and without micro-batching, for a burst of customer replies.
+
+Uses the stub LLM provider (AI_STUB_LATENCY_MS simulates the provider's
+round-trip), so it needs no API keys. Run from the backend directory:
+    python -m benchmarks.sentiment_batch_bench [--replies 500] [--rate 200] [--llm-latency-ms 400]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.loadtest.report import percentile
+
+
+REPLIES = [
+    "Thanks, the tuna was incredibly fresh!", "this is terrible, it arrived two days late",
+    "can I change my delivery address?", "do you deliver on Sundays?", "great service as always",
+    "the salmon smelled off, I want a refund", "why was I charged twice", "who is the driver?",
+]
+
+
+async def _burst(classify, replies: int, rate: float, seed: int):
+    """Replies arrive as a Poisson process at `rate` per second"""
+    rng = random.Random(seed)
+    latencies = []
+
+    async def one(text):
+        start = time.perf_counter()
+        await classify(text)
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    for _ in range(replies):
+        tasks.append(asyncio.create_task(one(rng.choice(REPLIES))))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    latencies.sort()
+    return latencies
+
+
+async def run(replies: int, rate: float, windows, max_size: int):
+    from services.ai_service import ai_service
+    from services.sentiment_batcher import SentimentBatcher
+
+    provider = ai_service.providers[0]
+    calls = {"n": 0}
+    complete = provider.complete
+
+    async def counted(request):
+        calls["n"] += 1
+        return await complete(request)
+
+    provider.complete = counted
+
+    print(f"{replies} replies at ~{rate:g}/s, LLM latency {os.environ['AI_STUB_LATENCY_MS']} ms")
+    print(f"{'window ms':>10} {'LLM calls':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for window in windows:
+        os.environ["SENTIMENT_BATCH_WINDOW_MS"] = str(window)
+        os.environ["SENTIMENT_BATCH_MAX_SIZE"] = str(max_size)
+        batcher = SentimentBatcher()
+        calls["n"] = 0
+        latencies = await _burst(batcher.classify, replies, rate, seed=1)
+        label = "off" if window == 0 else f"{window:g}"
+        print(f"{label:>10} {calls['n']:>10} {percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replies", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200, help="Replies per second")
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--windows", default="0,50,100,200", help="Batch windows to compare (ms, 0 = no batching)")
+    parser.add_argument("--max-size", type=int, default=20)
+    args = parser.parse_args()
+
+    # Before the services are imported: they read these at construction
+    os.environ["AI_PROVIDER"] = "stub"
+    os.environ["AI_FALLBACK_PROVIDERS"] = ""
+    os.environ["AI_STUB_LATENCY_MS"] = str(args.llm_latency_ms)
+    # The corpus repeats replies; measure batching alone, not the response cache
+    os.environ["AI_CACHE_TTL_SECONDS"] = "0"
+    asyncio.run(run(args.replies, args.rate, [float(w) for w in args.windows.split(",")], args.max_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Microbenchmark: serialization cost per 1,000 admin list rows.
+
+Compares the default path (Pydantic response models + FastAPI's
+jsonable_encoder + json) with the opt-in FAST_JSON_RESPONSES path
+(raw projected documents rendered with orjson).
+
+Run from the backend directory:
+    python -m benchmarks.serialization_bench [--rows 1000] [--repeat 50]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from bson import DBRef, ObjectId
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+
+load_dotenv()
+
+from api.admin import OrderSummary, MessageLogResponse, AlertResponse
+from api import fast_json
+
+
+def _raw_orders(n):
+    now = datetime.utcnow()
+    users = {}
+    orders = []
+    for i in range(n):
+        user_id = ObjectId()
+        users[user_id] = {"_id": user_id, "name": f"Customer {i}", "whatsapp_number": f"+1555{i:07d}"}
+        orders.append({
+            "_id": ObjectId(),
+            "user_id": DBRef("users", user_id),
+            "status": "SHIPPED",
+            "payment_status": "PAID",
+            "sentiment": "positive",
+            "automation_enabled": True,
+            "product_name": "Atlantic Salmon",
+            "amount": 49.99,
+            "created_at": now - timedelta(minutes=i),
+            "feedback_rating": 5,
+            "feedback_text": "Fresh catch, arrived on ice. Great service!",
+        })
+    return orders, users
+
+
+def _raw_messages(n):
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "order_id": DBRef("orders", ObjectId()),
+            "message_type": "SHIPPING_NOTIFICATION",
+            "message_content": "Great news, your order has been shipped and is sailing your way. " * 3,
+            "sent_at": now - timedelta(seconds=i),
+            "is_incoming": False,
+            "sentiment": None,
+        }
+        for i in range(n)
+    ]
+
+
+def _raw_alerts(n):
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "order_id": DBRef("orders", ObjectId()),
+            "reason": "NEGATIVE_SENTIMENT",
+            "description": "Customer expressed negative sentiment: 'the fish was not fresh'...",
+            "created_at": now - timedelta(seconds=i),
+            "resolved": False,
+        }
+        for i in range(n)
+    ]
+
+
+def _default_orders(orders, users):
+    # Mirrors get_all_orders: build response models, then FastAPI
+    # re-validates against response_model and encodes them.
+    models = []
+    for doc in orders:
+        user = users[doc["user_id"].id]
+        models.append(OrderSummary(
+            id=str(doc["_id"]),
+            user_name=user["name"],
+            whatsapp_number=user["whatsapp_number"],
+            status=doc["status"],
+            payment_status=doc["payment_status"],
+            sentiment=doc["sentiment"],
+            automation_enabled=doc["automation_enabled"],
+            product_name=doc["product_name"],
+            amount=doc["amount"],
+            created_at=doc["created_at"],
+            feedback_rating=doc["feedback_rating"],
+            feedback_text=doc["feedback_text"],
+        ))
+    validated = [OrderSummary.model_validate(m.model_dump()) for m in models]
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def _default_messages(messages):
+    models = [
+        MessageLogResponse(
+            id=str(doc["_id"]),
+            order_id=str(doc["order_id"].id),
+            message_type=doc["message_type"],
+            message_content=doc["message_content"],
+            sent_at=doc["sent_at"],
+            is_incoming=doc["is_incoming"],
+            sentiment=doc["sentiment"],
+        )
+        for doc in messages
+    ]
+    validated = [MessageLogResponse.model_validate(m.model_dump()) for m in models]
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def _default_alerts(alerts):
+    models = [
+        AlertResponse(
+            id=str(doc["_id"]),
+            order_id=str(doc["order_id"].id),
+            reason=doc["reason"],
+            description=doc["description"],
+            created_at=doc["created_at"],
+            resolved=doc["resolved"],
+        )
+        for doc in alerts
+    ]
+    validated = [AlertResponse.model_validate(m.model_dump()) for m in models]
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    orders, users = _raw_orders(args.rows)
+    messages = _raw_messages(args.rows)
+    alerts = _raw_alerts(args.rows)
+
+    cases = [
+        ("orders", lambda: _default_orders(orders, users),
+         lambda: fast_json.dumps(fast_json.order_summary_rows(orders, users))),
+        ("messages", lambda: _default_messages(messages),
+         lambda: fast_json.dumps(fast_json.message_log_rows(messages))),
+        ("alerts", lambda: _default_alerts(alerts),
+         lambda: fast_json.dumps(fast_json.alert_rows(alerts))),
+    ]
+
+    per_1k = 1000 / args.rows
+    print(f"Median serialization time per 1,000 rows ({args.rows} rows x {args.repeat} runs)")
+    print(f"{'endpoint':<10} {'default (ms)':>14} {'orjson (ms)':>14} {'speedup':>9}")
+    for name, default_fn, fast_fn in cases:
+        default_ms = _time(default_fn, args.repeat) * 1000 * per_1k
+        fast_ms = _time(fast_fn, args.repeat) * 1000 * per_1k
+        print(f"{name:<10} {default_ms:>14.2f} {fast_ms:>14.2f} {default_ms / fast_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Synthetic dataset generator for scale testing.
+
+Bulk-generates Users, Orders across every OrderStatus, MessageLogs and Alerts
+with realistic shapes: timestamps consistent with each order's progress,
+reminders on unpaid orders, tracking numbers on shipments, customer replies
+with sentiment, feedback on delivered orders, and alerts (mostly resolved)
+on a small share of orders. A slice of orders is created in the last few
+hours, so the payment reminder windows have work in them.
+
+Documents are built as raw dicts in the layout Beanie stores (links as
+DBRefs, enums as values) and written with unordered insert_many, several
+batches in flight at once. Indexes are built afterwards by init_db, which
+is faster than maintaining them during the load.
+
+Writes to its own database (default order_followup_scale_<orders>) on
+MONGODB_URI. Run from the backend directory:
+    python -m benchmarks.synthetic_dataset --orders 100000 [--messages-per-order 10] [--drop]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import DBRef, ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv()
+
+
+# Share of orders in each status
+STATUS_WEIGHTS = {
+    "CREATED": 8, "PAYMENT_PENDING": 7, "PAID": 10, "IN_PROCESS": 10,
+    "SHIPPED": 12, "OUT_FOR_DELIVERY": 3, "DELIVERED": 45, "CANCELLED": 5,
+}
+# How far along each status is, for deciding which messages and timestamps an order has
+PROGRESS = {
+    "CREATED": 0, "PAYMENT_PENDING": 0, "CANCELLED": 0, "PAID": 1,
+    "IN_PROCESS": 2, "SHIPPED": 3, "OUT_FOR_DELIVERY": 4, "DELIVERED": 5,
+}
+# Outgoing messages an order has received by each progress step
+OUTGOING = [
+    ("PAYMENT_CONFIRMATION", 1), ("IN_PROCESS_NOTIFICATION", 2), ("SHIPPING_NOTIFICATION", 3),
+    ("OUT_FOR_DELIVERY_NOTIFICATION", 4), ("DELIVERY_NOTIFICATION", 5), ("FEEDBACK_REQUEST", 5),
+]
+ALERT_REASONS = ["NEGATIVE_SENTIMENT", "NO_CUSTOMER_RESPONSE", "PAYMENT_OVERDUE", "DELIVERY_DELAYED", "CANCELLATION_REQUEST"]
+PRODUCTS = [
+    ("Atlantic Salmon 1kg", 24.5), ("Yellowfin Tuna Steaks", 31.0), ("Tiger Prawns 500g", 18.75),
+    ("Sea Bass Fillets", 22.0), ("Smoked Mackerel", 9.5), ("King Crab Legs", 64.0),
+]
+REPLIES = [
+    ("Thanks, the tuna was incredibly fresh!", "positive"), ("great service as always", "positive"),
+    ("status", "neutral"), ("Where is my order?", "neutral"), ("do you deliver on Sundays?", "neutral"),
+    ("ok", "neutral"), ("5", "positive"), ("this is terrible, it arrived two days late", "negative"),
+    ("why was I charged twice", "negative"),
+]
+
+
+class DatasetGenerator:
+    """
+    Produces documents a batch of orders at a time (with their messages and
+    alerts), so memory stays flat however large the dataset is.
+    """
+
+    def __init__(self, orders: int, messages_per_order: float, orders_per_user: float, alert_rate: float,
+                 days: int, seed: int):
+        self.orders = orders
+        self.messages_per_order = messages_per_order
+        self.alert_rate = alert_rate
+        self.days = days
+        self.rng = random.Random(seed)
+        self.now = datetime.utcnow()
+        self.user_ids = [ObjectId() for _ in range(max(1, int(orders / orders_per_user)))]
+        self._statuses = list(STATUS_WEIGHTS)
+        self._status_weights = list(STATUS_WEIGHTS.values())
+
+    def users(self, start: int, count: int):
+        return [
+            {
+                "_id": self.user_ids[i],
+                "name": f"Customer {i}",
+                "whatsapp_number": f"+1555{i:07d}",
+                "created_at": self.now - timedelta(days=self.days + 1),
+            }
+            for i in range(start, min(start + count, len(self.user_ids)))
+        ]
+
+    def _created_at(self) -> datetime:
+        # 2% of orders are from the last two hours, the rest spread over --days
+        if self.rng.random() < 0.02:
+            return self.now - timedelta(seconds=self.rng.uniform(0, 7200))
+        return self.now - timedelta(seconds=self.rng.uniform(0, self.days * 86400))
+
+    def _after(self, moment: datetime, min_hours: float, max_hours: float) -> datetime:
+        return min(self.now, moment + timedelta(hours=self.rng.uniform(min_hours, max_hours)))
+
+    def order_batch(self, count: int):
+        """Orders plus their message logs and alerts"""
+        orders, messages, alerts = [], [], []
+        rng = self.rng
+        for _ in range(count):
+            order_id = ObjectId()
+            status = rng.choices(self._statuses, weights=self._status_weights)[0]
+            progress = PROGRESS[status]
+            created_at = self._created_at()
+            product, amount = rng.choice(PRODUCTS)
+            age = self.now - created_at
+
+            order = {
+                "_id": order_id,
+                "user_id": DBRef("users", rng.choice(self.user_ids)),
+                "status": status,
+                "payment_status": "PAID" if progress > 0 else ("FAILED" if rng.random() < 0.1 else "PENDING"),
+                "automation_enabled": rng.random() < 0.95,
+                "sentiment": "unknown",
+                "product_name": product,
+                "amount": amount,
+                "tracking_id": None,
+                "carrier": None,
+                "last_transition_id": None,
+                "feedback_rating": None,
+                "feedback_text": None,
+                "created_at": created_at,
+                "payment_reminder_1_sent_at": None,
+                "payment_reminder_2_sent_at": None,
+                "shipped_at": None,
+                "delivered_at": None,
+                "last_customer_reply_at": None,
+            }
+            if status == "CANCELLED" and rng.random() < 0.5:
+                order["payment_status"] = "PAID"
+            if order["payment_status"] == "PENDING":
+                if age > timedelta(minutes=5):
+                    order["payment_reminder_1_sent_at"] = created_at + timedelta(minutes=5)
+                if age > timedelta(hours=24):
+                    order["payment_reminder_2_sent_at"] = created_at + timedelta(hours=24)
+            if progress >= 3:
+                order["shipped_at"] = self._after(created_at, 12, 72)
+                order["tracking_id"] = f"SYN{rng.randrange(10 ** 10):010d}"
+                order["carrier"] = "mock"
+            if progress >= 5:
+                order["delivered_at"] = self._after(order["shipped_at"], 24, 96)
+                if rng.random() < 0.3:
+                    order["feedback_rating"] = rng.choices([1, 2, 3, 4, 5], weights=[3, 4, 10, 33, 50])[0]
+                    order["feedback_text"] = "Great quality" if order["feedback_rating"] >= 4 else "Could be better"
+
+            # Outgoing messages for the order's progress, then customer replies up to its message count
+            target = rng.randint(1, max(1, round(2 * self.messages_per_order) - 1))
+            outgoing = [("ORDER_CONFIRMATION", created_at)]
+            if order["payment_reminder_1_sent_at"]:
+                outgoing.append(("PAYMENT_REMINDER_1", order["payment_reminder_1_sent_at"]))
+            if order["payment_reminder_2_sent_at"]:
+                outgoing.append(("PAYMENT_REMINDER_2", order["payment_reminder_2_sent_at"]))
+            outgoing += [
+                (message_type, order["shipped_at"] if step >= 3 and order["shipped_at"] else self._after(created_at, 0.1, 12))
+                for message_type, step in OUTGOING if progress >= step
+            ]
+            for message_type, sent_at in outgoing[:target]:
+                messages.append({
+                    "order_id": DBRef("orders", order_id),
+                    "message_type": message_type,
+                    "message_content": f"{message_type.replace('_', ' ').title()} for your {product}",
+                    "sent_at": sent_at,
+                    "is_incoming": False,
+                    "sentiment": None,
+                    "whatsapp_message_id": f"SM{rng.getrandbits(128):032x}",
+                })
+            for _ in range(target - len(outgoing[:target])):
+                text, sentiment = rng.choice(REPLIES)
+                sent_at = self._after(created_at, 0.01, max(0.02, age.total_seconds() / 3600))
+                messages.append({
+                    "order_id": DBRef("orders", order_id),
+                    "message_type": "CUSTOMER_REPLY",
+                    "message_content": text,
+                    "sent_at": sent_at,
+                    "is_incoming": True,
+                    "sentiment": sentiment,
+                    "whatsapp_message_id": f"SM{rng.getrandbits(128):032x}",
+                })
+                order["sentiment"] = sentiment
+                order["last_customer_reply_at"] = max(order["last_customer_reply_at"] or sent_at, sent_at)
+
+            if rng.random() < self.alert_rate:
+                alert_at = self._after(created_at, 1, 96)
+                resolved = rng.random() < 0.6
+                reason = rng.choice(ALERT_REASONS)
+                alerts.append({
+                    "order_id": DBRef("orders", order_id),
+                    "reason": reason,
+                    "description": reason.replace("_", " ").capitalize(),
+                    "created_at": alert_at,
+                    "resolved": resolved,
+                    "resolved_at": self._after(alert_at, 1, 48) if resolved else None,
+                })
+
+            orders.append(order)
+        return orders, messages, alerts
+
+
+async def generate(database_name: str, orders: int, messages_per_order: float = 10.0, orders_per_user: float = 3.0,
+                   alert_rate: float = 0.03, days: int = 180, batch_size: int = 5000, concurrency: int = 8,
+                   seed: int = 1, drop: bool = False) -> dict:
+    """Populate `database_name` and build its indexes; returns document counts"""
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    db = client[database_name]
+    if drop:
+        await client.drop_database(database_name)
+    elif await db["orders"].estimated_document_count():
+        client.close()
+        raise SystemExit(f"{database_name} already has orders; pass --drop to regenerate it")
+
+    generator = DatasetGenerator(orders, messages_per_order, orders_per_user, alert_rate, days, seed)
+    counts = {"users": 0, "orders": 0, "message_logs": 0, "alerts": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    async def insert(collection: str, documents):
+        try:
+            if documents:
+                await db[collection].insert_many(documents, ordered=False)
+                counts[collection] += len(documents)
+        finally:
+            semaphore.release()
+
+    async def submit(collection: str, documents):
+        # Generation keeps going while up to `concurrency` batches are being written
+        await semaphore.acquire()
+        tasks.append(asyncio.create_task(insert(collection, documents)))
+
+    start = time.perf_counter()
+    for i in range(0, len(generator.user_ids), batch_size):
+        await submit("users", generator.users(i, batch_size))
+
+    last_report = start
+    for i in range(0, orders, batch_size):
+        batch_orders, batch_messages, batch_alerts = generator.order_batch(min(batch_size, orders - i))
+        await submit("orders", batch_orders)
+        for j in range(0, len(batch_messages), batch_size):
+            await submit("message_logs", batch_messages[j:j + batch_size])
+        await submit("alerts", batch_alerts)
+        if time.perf_counter() - last_report > 10:
+            last_report = time.perf_counter()
+            print(f"  {i + batch_size:,} / {orders:,} orders generated ({last_report - start:.0f}s)")
+        # Let the in-flight inserts make progress between batches
+        await asyncio.sleep(0)
+
+    await asyncio.gather(*tasks)
+    load_seconds = time.perf_counter() - start
+    client.close()
+
+    # Beanie builds the indexes declared on the models
+    from database import init_db, close_db
+    os.environ["MONGODB_DATABASE"] = database_name
+    index_start = time.perf_counter()
+    await init_db()
+    await close_db()
+
+    print(
+        f"{database_name}: {counts['users']:,} users, {counts['orders']:,} orders, "
+        f"{counts['message_logs']:,} messages, {counts['alerts']:,} alerts in {load_seconds:.1f}s "
+        f"({(sum(counts.values())) / load_seconds:,.0f} docs/s), indexes in {time.perf_counter() - index_start:.1f}s"
+    )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--messages-per-order", type=float, default=10.0, help="Average; 1M orders -> ~10M messages")
+    parser.add_argument("--orders-per-user", type=float, default=3.0)
+    parser.add_argument("--alert-rate", type=float, default=0.03, help="Share of orders with an alert")
+    parser.add_argument("--days", type=int, default=180, help="Order creation dates span this many days")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8, help="insert_many batches in flight")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database", help="Default: order_followup_scale_<orders>")
+    parser.add_argument("--drop", action="store_true", help="Drop the database first if it exists")
+    args = parser.parse_args()
+
+    asyncio.run(generate(
+        args.database or f"order_followup_scale_{args.orders}",
+        args.orders,
+        messages_per_order=args.messages_per_order,
+        orders_per_user=args.orders_per_user,
+        alert_rate=args.alert_rate,
+        days=args.days,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        drop=args.drop,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Checks that a Twilio send made as the circuit breaker's half-open probe
+always settles its probe slot, so the breaker can't stick in HALF_OPEN
+with every later send rejected.
+
+Twilio is stood in for by httpx.MockTransport, so it needs no network or
+credentials. Run from the backend directory:
+    python -m benchmarks.twilio_breaker_check
+"""
+import asyncio
+import os
+
+import httpx
+
+os.environ.update({
+    "TWILIO_ACCOUNT_SID": "ACbench",
+    "TWILIO_AUTH_TOKEN": "bench",
+    "TWILIO_WHATSAPP_NUMBERS": "+15550000001,+15550000002",
+    "TWILIO_BREAKER_FAILURE_THRESHOLD": "1",
+    "TWILIO_BREAKER_RESET_SECONDS": "0",
+})
+os.environ.pop("TWILIO_MESSAGING_SERVICE_SID", None)
+
+from services.circuit_breaker import CircuitBreaker
+from services.whatsapp_service import WhatsAppService
+
+
+_AsyncClient = httpx.AsyncClient
+
+
+def _service(handler) -> WhatsAppService:
+    """A WhatsAppService whose HTTP client sends to `handler`, with its breaker half-open"""
+    httpx.AsyncClient = lambda **kwargs: _AsyncClient(transport=httpx.MockTransport(handler), **kwargs)
+    service = WhatsAppService()
+    service.breaker.record_failure()
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    return service
+
+
+async def check_spillover_probe():
+    """The probe's sender gets a 429, the send spills over to the other sender"""
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "1"}),
+        httpx.Response(201, json={"sid": "SMbench"}),
+    ]
+    service = _service(lambda request: responses.pop(0))
+
+    sid = await service.send_message("+15551234567", "spill-over probe")
+    assert sid == "SMbench", sid
+    assert service.breaker.state == CircuitBreaker.CLOSED, service.breaker.state
+    assert service.breaker._probes_in_flight == 0
+    print("429 on a half-open probe, spilled over: breaker closed")
+
+
+async def check_cancelled_probe():
+    """The caller is cancelled while the probe is in flight"""
+    started = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    service = _service(handler)
+    send = asyncio.create_task(service.send_message("+15551234567", "cancelled probe"))
+    await started.wait()
+    send.cancel()
+    try:
+        await send
+    except asyncio.CancelledError:
+        pass
+    assert service.breaker._probes_in_flight == 0
+    assert service.breaker.allow(), "probe slot not given back"
+    print("Half-open probe cancelled: probe slot given back")
+
+
+def main():
+    asyncio.run(check_spillover_probe())
+    asyncio.run(check_cancelled_probe())
+
+
+if __name__ == "__main__":
+    main()
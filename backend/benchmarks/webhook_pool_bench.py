@@ -0,0 +1,152 @@
+"""
+Concurrency benchmark of the webhook's MongoDB path against different pool sizes.
+
+Each simulated inbound reply does the round-trips handle_whatsapp_webhook and
+process_customer_reply make for a free-text message (user lookup, latest
+order, order reload, message log insert, order save), without the Twilio and
+LLM calls. Running it at increasing concurrency shows where the pool
+saturates: latency climbs once in-flight requests exceed maxPoolSize, and
+checkouts start failing once waits exceed waitQueueTimeoutMS.
+
+Uses its own database (default order_followup_bench) on MONGODB_URI.
+Run from the backend directory:
+    python -m benchmarks.webhook_pool_bench [--pool-sizes 10,50,100] [--concurrency 10,50,200,500]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from prometheus_client import REGISTRY
+
+load_dotenv()
+
+from benchmarks.loadtest.report import percentile
+from database import init_db, close_db
+from models.user import User
+from models.order import Order
+from models.message_log import MessageLog, MessageType
+from metrics import MONGO_POOL_CHECKOUT_FAILURES
+
+
+BENCH_PRODUCT = "webhook-pool-bench"
+
+
+async def _seed(customers: int):
+    await Order.find(Order.product_name == BENCH_PRODUCT).delete()
+    numbers = [f"+1999{i:07d}" for i in range(customers)]
+    await User.find({"whatsapp_number": {"$in": numbers}}).delete()
+
+    users = [User(name=f"Bench {i}", whatsapp_number=number) for i, number in enumerate(numbers)]
+    await User.insert_many(users)
+    users = await User.find({"whatsapp_number": {"$in": numbers}}).to_list()
+    await Order.insert_many([Order(user_id=user, product_name=BENCH_PRODUCT) for user in users])
+    return numbers
+
+
+async def _cleanup(numbers):
+    orders = await Order.find(Order.product_name == BENCH_PRODUCT).to_list()
+    await MessageLog.find({"order_id.$id": {"$in": [order.id for order in orders]}}).delete()
+    await Order.find(Order.product_name == BENCH_PRODUCT).delete()
+    await User.find({"whatsapp_number": {"$in": numbers}}).delete()
+
+
+async def _webhook_db_path(phone_number: str):
+    user = await User.find_one(User.whatsapp_number == phone_number)
+    order = await Order.find(Order.user_id.id == user.id).sort(-Order.created_at).first_or_none()
+    order = await Order.get(order.id)
+    await MessageLog(
+        order_id=order,
+        message_type=MessageType.CUSTOMER_REPLY,
+        message_content="benchmark reply",
+        is_incoming=True,
+    ).insert()
+    await order.save()
+
+
+async def _run_level(numbers, concurrency: int, requests: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    peak_checked_out = 0
+
+    async def one(i):
+        nonlocal errors, peak_checked_out
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await _webhook_db_path(numbers[i % len(numbers)])
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+            peak_checked_out = max(peak_checked_out, _checked_out())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "errors": errors,
+        "peak_checked_out": int(peak_checked_out),
+    }
+
+
+def _checked_out():
+    # metrics.MONGO_POOL_CHECKED_OUT, as the pool listener keeps it
+    return REGISTRY.get_sample_value("mongo_pool_connections_checked_out") or 0
+
+
+def _checkout_failures():
+    return sum(sample.value for metric in MONGO_POOL_CHECKOUT_FAILURES.collect()
+               for sample in metric.samples if sample.name.endswith("_total"))
+
+
+async def run(pool_sizes, concurrency_levels, requests, customers):
+    print(f"{'pool':>5} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'in use':>7} {'errors':>7} {'checkout fails':>15}")
+    numbers = None
+    for pool_size in pool_sizes:
+        os.environ["MONGODB_MAX_POOL_SIZE"] = str(pool_size)
+        os.environ["MONGODB_MIN_POOL_SIZE"] = "0"
+        await init_db()
+        if numbers is None:
+            numbers = await _seed(customers)
+
+        for concurrency in concurrency_levels:
+            failures_before = _checkout_failures()
+            result = await _run_level(numbers, concurrency, requests)
+            print(
+                f"{pool_size:>5} {concurrency:>5} {result['throughput']:>9.0f} {result['p50_ms']:>8.1f} "
+                f"{result['p99_ms']:>8.1f} {result['peak_checked_out']:>7} {result['errors']:>7} "
+                f"{int(_checkout_failures() - failures_before):>15}"
+            )
+
+        if pool_size == pool_sizes[-1]:
+            await _cleanup(numbers)
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", default="10,50,100")
+    parser.add_argument("--concurrency", default="10,50,200,500")
+    parser.add_argument("--requests", type=int, default=2000, help="Simulated webhooks per level")
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--database", default="order_followup_bench")
+    args = parser.parse_args()
+
+    os.environ["MONGODB_DATABASE"] = args.database
+    asyncio.run(run(
+        [int(p) for p in args.pool_sizes.split(",")],
+        [int(c) for c in args.concurrency.split(",")],
+        args.requests,
+        args.customers,
+    ))
+
+
+if __name__ == "__main__":
+    main()
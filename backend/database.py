@@ -1,33 +1,118 @@
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import logging
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 from beanie import init_beanie
+from pymongo import ReadPreference
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
 
 from models.user import User
 from models.order import Order
 from models.message_log import MessageLog
 from models.alert import Alert
+from models.llm_cache import LLMCacheEntry
+from metrics import MongoCommandMetrics, MongoPoolMetrics
+
+
+logger = logging.getLogger(__name__)
+
+# Shared Motor client, created by init_db and closed by close_db
+_client: Optional[AsyncIOMotorClient] = None
+_init_lock = asyncio.Lock()
+
+
+def _client_options() -> dict:
+    """Connection pool, timeout and compression settings from the environment"""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000")),
+        # Fail fast instead of queueing forever when the pool is exhausted
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000")),
+        # Unavailable compressors are skipped by PyMongo with a warning
+        "compressors": os.getenv("MONGODB_COMPRESSORS", "zstd,snappy,zlib"),
+        "retryWrites": True,
+    }
+
+
+def get_client() -> AsyncIOMotorClient:
+    if _client is None:
+        raise RuntimeError("Database not initialized, call init_db() first")
+    return _client
+
+
+def admin_collection(document_model) -> AsyncIOMotorCollection:
+    """
+    Collection handle for admin dashboard reads. These tolerate replication lag,
+    so they go to secondaries (MONGODB_ADMIN_READ_PREFERENCE, default
+    secondaryPreferred) and keep load off the primary that serves the webhook path.
+    """
+    return document_model.get_motor_collection().with_options(read_preference=ADMIN_READ_PREFERENCE)
+
+
+def _admin_read_preference():
+    name = os.getenv("MONGODB_ADMIN_READ_PREFERENCE", "secondaryPreferred")
+    try:
+        return make_read_preference(read_pref_mode_from_name(name), None)
+    except (KeyError, ValueError):
+        logger.warning("Unknown MONGODB_ADMIN_READ_PREFERENCE %r, using primary", name)
+        return ReadPreference.PRIMARY
+
+
+ADMIN_READ_PREFERENCE = _admin_read_preference()
 
 
 async def init_db():
     """Initialize MongoDB connection with Beanie ODM"""
-    
+    global _client
+
     # Get MongoDB URI from environment
     mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     database_name = os.getenv("MONGODB_DATABASE", "order_followup_db")
-    
+
     # Create Motor client
-    client = AsyncIOMotorClient(mongodb_uri)
-    
+    options = _client_options()
+    client = AsyncIOMotorClient(
+        mongodb_uri,
+        event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()],
+        **options
+    )
+
     # Initialize Beanie with document models
     await init_beanie(
         database=client[database_name],
-        document_models=[User, Order, MessageLog, Alert]
+        document_models=[User, Order, MessageLog, Alert, LLMCacheEntry]
     )
-    
-    print(f"Connected to MongoDB: {database_name}")
+    # Only published once Beanie is ready, so ensure_db() never sees a half-initialized client
+    _client = client
+
+    logger.info(
+        "Connected to MongoDB: %s (pool %s-%s)",
+        database_name, options["minPoolSize"], options["maxPoolSize"]
+    )
+
+
+async def ensure_db():
+    """
+    Initialize the database on first use (serverless mode, where startup
+    hooks are unreliable). Concurrent first requests share one init.
+    """
+    if _client is not None:
+        return
+    async with _init_lock:
+        if _client is None:
+            await init_db()
 
 
 async def close_db():
     """Close MongoDB connection (called on shutdown)"""
-    # Beanie/Motor handles connection pooling automatically
-    print("MongoDB connection closed")
+    global _client
+
+    if _client is not None:
+        _client.close()
+        _client = None
+    logger.info("MongoDB connection closed")
@@ -0,0 +1,208 @@
+import atexit
+import copy
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from metrics import register_queue
+
+
+_listeners: List[logging.handlers.QueueListener] = []
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+# Correlation ID of the request/job currently being handled. Context variables
+# follow awaits and tasks, so everything a webhook triggers logs the same ID.
+correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "correlation_id"}
+
+
+def new_correlation_id(value: Optional[str] = None) -> str:
+    """Set (or generate) the correlation ID for the current context"""
+    value = value or uuid.uuid4().hex
+    correlation_id.set(value)
+    return value
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp records with the current correlation ID"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep only every Nth DEBUG record (LOG_DEBUG_SAMPLE_EVERY) so high-volume
+    debug lines can stay enabled in production without flooding the output.
+    Records at INFO and above always pass.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(every, 1)
+        self._counter = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        return next(self._counter) % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS:
+                entry[key] = value
+        # Rendered by the queue handler before the record crossed threads
+        exc_text = record.exc_text or (self.formatException(record.exc_info) if record.exc_info else None)
+        if exc_text:
+            entry["exc_info"] = exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging() -> None:
+    """
+    Configure application logging from the environment:
+      LOG_LEVEL              root level (default INFO)
+      LOG_LEVELS             per-module overrides, e.g. "api.webhooks=DEBUG,services.ai_service=WARNING"
+      LOG_FORMAT             "json" (default) or "text"
+      LOG_DEBUG_SAMPLE_EVERY keep 1 in N DEBUG records (default 1, i.e. all)
+    Output goes to stdout through a queue, so handlers never block the event loop.
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return
+
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for override in filter(None, os.getenv("LOG_LEVELS", "").split(",")):
+        name, _, level = override.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(correlation_id)s]: %(message)s"
+        ))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    # Filters run in the caller's context, where the correlation ID is visible
+    queue_handler.addFilter(CorrelationIdFilter())
+    queue_handler.addFilter(DebugSamplingFilter(int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "1"))))
+    root.addHandler(queue_handler)
+    register_queue("log:root", log_queue.qsize)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+
+def _build_file_handler(filename: str) -> logging.Handler:
+    """Rotating file handler: by size (default) or by time (LOG_ROTATION=midnight/H/D...)"""
+    rotation = os.getenv("LOG_ROTATION", "size")
+    backup_count = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+    if rotation == "size":
+        handler = logging.handlers.RotatingFileHandler(
+            filename,
+            maxBytes=int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True
+        )
+    else:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename,
+            when=rotation,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+            utc=True
+        )
+
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(correlation_id)s]: %(message)s"))
+    return handler
+
+
+def get_file_logger(name: str, filename: str, level_env: str) -> logging.Logger:
+    """
+    Get a logger that writes to a rotating file without blocking the caller.
+    Records go onto an in-memory queue and a QueueListener thread does the
+    disk I/O, so the event loop never touches the file. The level is read
+    from `level_env` (default WARNING, i.e. debug output off).
+    """
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(os.getenv(level_env, "WARNING").upper())
+    logger.propagate = False
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = _NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationIdFilter())
+    logger.addHandler(queue_handler)
+    register_queue(f"log:{name}", log_queue.qsize)
+
+    listener = logging.handlers.QueueListener(log_queue, _build_file_handler(filename), respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+    return logger
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge the arguments into the message and render the traceback into
+        exc_text, in the caller's thread. The base class folds the traceback
+        into msg instead, which would leave JsonFormatter no exc_info to report.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer threads"""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(shutdown_logging)
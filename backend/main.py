@@ -1,35 +1,54 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
+import time
+import logging
 from dotenv import load_dotenv
 
 # Load environment variables FIRST before any other imports
 load_dotenv()
 
-from database import init_db, close_db
-from scheduler.reminder_scheduler import reminder_scheduler
+from logging_config import setup_logging, shutdown_logging, new_correlation_id
+setup_logging()
+
+from database import init_db, ensure_db, close_db
+from metrics import HTTP_REQUEST_LATENCY
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from worker import start_background, stop_background
 from api.orders import router as orders_router
 from api.admin import router as admin_router
 from api.webhooks import router as webhooks_router
+from api.health import router as health_router
+
+
+logger = logging.getLogger(__name__)
+
+# Serverless (Vercel): no in-process scheduler, database initialized on first request
+SERVERLESS = os.getenv("SERVERLESS", "false").lower() == "true"
+# false when a separate worker (python -m worker) runs the scheduled jobs
+RUN_SCHEDULER = os.getenv("RUN_SCHEDULER", "true").lower() == "true"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
-    print("Starting AI-Assisted Order Follow-Up System...")
-    await init_db()
-    reminder_scheduler.start()
-    print("Application started successfully")
+    logger.info("Starting AI-Assisted Order Follow-Up System...")
+    if not SERVERLESS:
+        await init_db()
+        # Queues and writers run here either way: requests feed them
+        start_background(run_scheduler=RUN_SCHEDULER)
+    logger.info("Application started successfully")
     
     yield
     
     # Shutdown
-    print("Shutting down...")
-    reminder_scheduler.shutdown()
+    logger.info("Shutting down...")
+    await stop_background()
     await close_db()
-    print("Application shutdown complete")
+    logger.info("Application shutdown complete")
+    shutdown_logging()
 
 
 # Create FastAPI app
@@ -53,6 +72,43 @@ app.add_middleware(
 )
 
 
+if SERVERLESS:
+    @app.middleware("http")
+    async def lazy_db_middleware(request: Request, call_next):
+        """Deferred Beanie init: paid by the first request that needs it, not by every cold start"""
+        # Probes and scrapes must not block on MongoDB (/ready initializes it under its own timeout)
+        if request.url.path not in ("/health", "/ready", "/metrics"):
+            await ensure_db()
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Tag every log line of a request with one correlation ID (X-Request-ID if supplied)"""
+    request_id = new_correlation_id(request.headers.get("X-Request-ID"))
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Record request latency per route template (not raw path, to keep label cardinality bounded)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_LATENCY.labels(
+            request.method,
+            route.path if route else "unmatched",
+            str(status)
+        ).observe(time.perf_counter() - start)
+
+
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
@@ -60,6 +116,14 @@ from fastapi.responses import FileResponse
 app.include_router(orders_router)
 app.include_router(admin_router)
 app.include_router(webhooks_router)
+app.include_router(health_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 
 # Mount static files and serve frontend (if directory exists)
 # This is used for unified Docker deployment
@@ -80,9 +144,10 @@ async def root(request: Request):
     if request.method == "POST":
         try:
             body = await request.body()
-            print(f"DEBUG: Unexpected POST to root endpoint (/). Body: {body.decode(errors='ignore')}")
+            logger.warning("Unexpected POST to root endpoint (/), %d byte body", len(body))
+            logger.debug("Root POST body: %s", body.decode(errors="ignore"))
         except Exception as e:
-            print(f"DEBUG: Failed to read POST body on root: {str(e)}")
+            logger.warning("Failed to read POST body on root: %s", str(e))
             
         return {
             "status": "operational",
@@ -95,16 +160,6 @@ async def root(request: Request):
     }
 
 
-@app.api_route("/health", methods=["GET", "HEAD"])
-async def health_check():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "scheduler": "running"
-    }
-
-
 if __name__ == "__main__":
     import uvicorn
     
@@ -113,5 +168,5 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=int(os.environ.get("PORT", 10000)),
-        reload=True  # Enable hot reload during development
+        reload=True  # Enable hot reload during development (RUN_SCHEDULER=false + python -m worker avoids restarting jobs)
     )
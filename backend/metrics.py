@@ -0,0 +1,285 @@
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+
+# HTTP
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+
+# MongoDB
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ["collection", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "Failed MongoDB commands",
+    ["collection", "operation"]
+)
+
+# Twilio
+TWILIO_SEND_LATENCY = Histogram(
+    "twilio_send_duration_seconds",
+    "Twilio Messages API call latency"
+)
+TWILIO_SEND_TOTAL = Counter(
+    "twilio_send_total",
+    "Twilio Messages API calls by HTTP status code ('error' for transport failures)",
+    ["status_code"]
+)
+TWILIO_RETRIES = Counter(
+    "twilio_send_retries_total",
+    "Twilio sends retried, or not retried because the retry budget was spent",
+    ["outcome"]
+)
+TWILIO_SENDER_MESSAGES = Counter(
+    "twilio_sender_messages_total",
+    "Sends per pooled sender number: on the customer's sticky sender or spilled over to another",
+    ["sender", "route"]
+)
+
+# LLM
+LLM_CALL_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "LLM provider call latency",
+    ["provider", "method"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+)
+LLM_CALL_FAILURES = Counter(
+    "llm_call_failures_total",
+    "LLM provider calls that raised",
+    ["provider", "method"]
+)
+LLM_HEDGED_CALLS = Counter(
+    "llm_hedged_calls_total",
+    "Backup requests sent to the next provider because the previous one was slow",
+    ["provider", "method"]
+)
+LLM_FALLBACKS = Counter(
+    "llm_static_fallbacks_total",
+    "AIService calls answered with the static fallback instead of a provider",
+    ["method", "reason"]
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "LLM response cache lookups: memory hit, shared (MongoDB) hit or miss",
+    ["method", "result"]
+)
+LLM_BATCH_SIZE = Histogram(
+    "llm_batch_size",
+    "Items classified per micro-batched LLM request",
+    ["method"],
+    buckets=(1, 2, 5, 10, 20, 50, 100)
+)
+LLM_BATCH_FALLBACKS = Counter(
+    "llm_batch_fallbacks_total",
+    "Micro-batches whose answer couldn't be parsed and were classified item by item",
+    ["method"]
+)
+
+# Circuit breakers
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["circuit"]
+)
+CIRCUIT_REJECTED = Counter(
+    "circuit_breaker_rejected_total",
+    "Calls rejected without reaching the dependency because the circuit was open",
+    ["circuit"]
+)
+
+# Carrier tracking
+TRACKING_LOOKUPS = Counter(
+    "tracking_lookups_total",
+    "Tracking lookups by outcome: cache hit, miss (upstream call) or coalesced onto an in-flight call",
+    ["result"]
+)
+
+# Customer replies
+REPLY_PROCESSING_LATENCY = Histogram(
+    "customer_reply_duration_seconds",
+    "End-to-end processing time of an inbound customer reply",
+    ["intent"]
+)
+
+# Scheduler
+SCHEDULER_JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Scheduled job run time",
+    ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0)
+)
+SCHEDULER_ITEMS_PROCESSED = Counter(
+    "scheduler_items_processed_total",
+    "Items (orders, documents) handled by scheduled jobs",
+    ["job"]
+)
+
+# In-process queues and buffers
+MESSAGE_LOG_WRITES = Counter(
+    "message_log_writes_total",
+    "Message log records handled by the buffered writer: written, retried or dropped",
+    ["outcome"]
+)
+DELIVERY_STATUS_UPDATES = Counter(
+    "delivery_status_updates_total",
+    "Twilio delivery status callbacks written to message logs: matched or unmatched",
+    ["outcome"]
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth",
+    "Items waiting in an in-process queue",
+    ["queue"]
+)
+
+# Upstream dependencies
+DEPENDENCY_LAST_SUCCESS = Gauge(
+    "dependency_last_success_timestamp_seconds",
+    "Unix time of the last successful call to an upstream dependency",
+    ["dependency"]
+)
+
+_queues: Dict[str, Callable[[], int]] = {}
+_last_success: Dict[str, float] = {}
+
+
+def register_queue(name: str, size_fn: Callable[[], int]) -> None:
+    """Expose the current size of an in-process queue as queue_depth{queue=name}"""
+    _queues[name] = size_fn
+    QUEUE_DEPTH.labels(name).set_function(size_fn)
+
+
+def queue_depths() -> Dict[str, int]:
+    return {name: size_fn() for name, size_fn in _queues.items()}
+
+
+def mark_success(dependency: str) -> None:
+    """Record a successful call to an upstream dependency (e.g. "twilio", "llm")"""
+    now = time.time()
+    _last_success[dependency] = now
+    DEPENDENCY_LAST_SUCCESS.labels(dependency).set(now)
+
+
+def last_success_age(dependency: str) -> Optional[float]:
+    """Seconds since the last successful call, or None if there hasn't been one"""
+    last = _last_success.get(dependency)
+    return round(time.time() - last, 1) if last else None
+
+
+@contextmanager
+def observe_llm_call(provider: str, method: str):
+    """Time an LLM call and count it as a failure if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+        mark_success("llm")
+    except Exception:
+        LLM_CALL_FAILURES.labels(provider, method).inc()
+        raise
+    finally:
+        LLM_CALL_LATENCY.labels(provider, method).observe(time.perf_counter() - start)
+
+
+def track_job(job: str):
+    """Decorator recording the duration of an async scheduled job"""
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with SCHEDULER_JOB_DURATION.labels(job).time():
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    PyMongo command listener feeding MONGO_COMMAND_LATENCY.
+    Registered on the Motor client, so every Beanie and raw query is covered
+    without touching call sites.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[int, object], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = "-"
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = collection
+
+    def _pop_collection(self, event) -> str:
+        with self._lock:
+            return self._pending.pop((event.request_id, event.connection_id), "-")
+
+    def succeeded(self, event):
+        collection = self._pop_collection(event)
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._pop_collection(event)
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongo_pool_connections_checked_out",
+    "MongoDB connections currently checked out of the pool"
+)
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Pool checkouts that failed (e.g. waitQueueTimeoutMS exceeded)",
+    ["reason"]
+)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool listener: in-use connections and checkout failures (pool saturation)"""
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(str(event.reason)).inc()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
@@ -0,0 +1,104 @@
+"""
+One-time migration: rewrite every user's whatsapp_number in E.164 form,
+merge users that turn out to share a number, and make the users index on
+whatsapp_number unique.
+
+Duplicates are merged into the oldest user (which takes the newest name);
+their orders are moved over to it. Users whose number can't be read are
+left as they are and listed. Safe to run again.
+
+Run from the backend directory, before deploying the unique index:
+    python migrate_phone_numbers.py [--dry-run]
+"""
+import os
+import asyncio
+import argparse
+from collections import defaultdict
+
+from bson import DBRef
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+
+load_dotenv()
+
+from phone import InvalidPhoneNumber, normalize_phone
+
+
+BATCH_SIZE = 1000
+
+
+def _created(user: dict):
+    return user.get("created_at") or user["_id"].generation_time.replace(tzinfo=None)
+
+
+async def migrate(dry_run: bool) -> None:
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    db = client[os.getenv("MONGODB_DATABASE", "order_followup_db")]
+    users, orders = db["users"], db["orders"]
+
+    by_number = defaultdict(list)
+    invalid = []
+    async for user in users.find({}, {"name": 1, "whatsapp_number": 1, "created_at": 1}):
+        try:
+            by_number[normalize_phone(user.get("whatsapp_number"))].append(user)
+        except InvalidPhoneNumber:
+            invalid.append(user)
+    print(f"{sum(len(group) for group in by_number.values())} users, {len(by_number)} distinct numbers, {len(invalid)} unreadable")
+
+    renames = []
+    renamed = merged = moved = 0
+    for number, group in by_number.items():
+        group.sort(key=_created)
+        keep, duplicates = group[0], group[1:]
+        updates = {}
+        if keep["whatsapp_number"] != number:
+            updates["whatsapp_number"] = number
+
+        if duplicates:
+            duplicate_ids = [user["_id"] for user in duplicates]
+            if duplicates[-1].get("name") and duplicates[-1]["name"] != keep.get("name"):
+                updates["name"] = duplicates[-1]["name"]
+            merged += len(duplicates)
+            if dry_run:
+                moved += await orders.count_documents({"user_id.$id": {"$in": duplicate_ids}})
+            else:
+                result = await orders.update_many(
+                    {"user_id.$id": {"$in": duplicate_ids}},
+                    {"$set": {"user_id": DBRef("users", keep["_id"])}}
+                )
+                moved += result.modified_count
+                await users.delete_many({"_id": {"$in": duplicate_ids}})
+
+        if updates:
+            renamed += 1
+            renames.append(UpdateOne({"_id": keep["_id"]}, {"$set": updates}))
+            if len(renames) >= BATCH_SIZE:
+                if not dry_run:
+                    await users.bulk_write(renames, ordered=False)
+                renames = []
+
+    if renames and not dry_run:
+        await users.bulk_write(renames, ordered=False)
+
+    verb = "Would merge" if dry_run else "Merged"
+    print(f"{verb} {merged} duplicate users ({moved} orders moved); {renamed} users updated")
+    for user in invalid[:50]:
+        print(f"  unreadable number on user {user['_id']}: {user.get('whatsapp_number')!r}")
+
+    if not dry_run:
+        # Replace a non-unique index on the field, if there is one
+        for name, info in (await users.index_information()).items():
+            if info["key"] == [("whatsapp_number", ASCENDING)] and not info.get("unique"):
+                await users.drop_index(name)
+        await users.create_index([("whatsapp_number", ASCENDING)], unique=True)
+        print("Unique index on users.whatsapp_number in place")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.dry_run))
@@ -1,6 +1,7 @@
 from .user import User
-from .order import Order
-from .message_log import MessageLog
+from .order import Order, OrderListView
+from .message_log import MessageLog, MessageLogListView
 from .alert import Alert
+from .llm_cache import LLMCacheEntry
 
-__all__ = ["User", "Order", "MessageLog", "Alert"]
+__all__ = ["User", "Order", "OrderListView", "MessageLog", "MessageLogListView", "Alert", "LLMCacheEntry"]
@@ -1,5 +1,6 @@
 from beanie import Document, Link
 from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -28,6 +29,11 @@ class Alert(Document):
     
     class Settings:
         name = "alerts"
+        indexes = [
+            IndexModel([("created_at", DESCENDING)]),
+            # Retention sweep over resolved alerts
+            IndexModel([("resolved", ASCENDING), ("resolved_at", ASCENDING)]),
+        ]
         
     class Config:
         use_enum_values = True
@@ -0,0 +1,24 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+from datetime import datetime
+from typing import Optional
+
+
+class LLMCacheEntry(Document):
+    """LLM response shared by all replicas, keyed by a content hash of the request (see LLMCache.key)"""
+    
+    id: Optional[str] = Field(default=None, description="SHA-256 of provider, model, method and normalized input")
+    provider: str
+    model: str
+    method: str
+    response: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+    
+    class Settings:
+        name = "llm_cache"
+        indexes = [
+            # MongoDB deletes entries once expires_at passes
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
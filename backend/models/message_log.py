@@ -1,5 +1,7 @@
-from beanie import Document, Link
-from pydantic import Field
+from beanie import Document, Link, PydanticObjectId
+from bson import DBRef
+from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -21,6 +23,15 @@ class MessageType(str, Enum):
     CUSTOMER_REPLY = "CUSTOMER_REPLY"
 
 
+class DeliveryStatus(str, Enum):
+    """Delivery state of an outgoing message, from Twilio status callbacks"""
+    QUEUED = "QUEUED"
+    SENT = "SENT"
+    FAILED = "FAILED"
+    DELIVERED = "DELIVERED"
+    READ = "READ"
+
+
 class MessageLog(Document):
     """Log of all WhatsApp messages sent/received"""
     
@@ -36,8 +47,24 @@ class MessageLog(Document):
     # WhatsApp metadata
     whatsapp_message_id: Optional[str] = None
     
+    # Delivery tracking for outgoing messages (Twilio status callbacks)
+    delivery_status: Optional[DeliveryStatus] = None
+    delivered_at: Optional[datetime] = None
+    read_at: Optional[datetime] = None
+    failed_at: Optional[datetime] = None
+    delivery_error_code: Optional[str] = None
+    status_updated_at: Optional[datetime] = None
+    
     class Settings:
         name = "message_logs"
+        indexes = [
+            # Admin list sort and the retention sweep
+            IndexModel([("sent_at", DESCENDING)]),
+            # Status callbacks are keyed on the Twilio message SID
+            IndexModel([("whatsapp_message_id", ASCENDING)], sparse=True),
+            # Per-order message lists and the no-response sweep
+            IndexModel([("order_id.$id", ASCENDING), ("sent_at", DESCENDING)]),
+        ]
         
     class Config:
         use_enum_values = True
@@ -48,3 +75,29 @@ class MessageLog(Document):
                 "is_incoming": False
             }
         }
+
+
+class MessageLogListView(BaseModel):
+    """Projection of the message log fields shown in the admin messages list"""
+    
+    id: PydanticObjectId = Field(alias="_id")
+    order_id: DBRef
+    message_type: str
+    message_content: str
+    sent_at: datetime
+    is_incoming: bool = False
+    sentiment: Optional[str] = None
+    
+    class Settings:
+        projection = {
+            "_id": 1,
+            "order_id": 1,
+            "message_type": 1,
+            "message_content": 1,
+            "sent_at": 1,
+            "is_incoming": 1,
+            "sentiment": 1,
+        }
+        
+    class Config:
+        arbitrary_types_allowed = True
@@ -1,5 +1,7 @@
-from beanie import Document, Link
-from pydantic import Field
+from beanie import Document, Link, PydanticObjectId
+from bson import DBRef
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 from enum import Enum
@@ -51,6 +53,9 @@ class Order(Document):
     tracking_id: Optional[str] = None
     carrier: Optional[str] = None
     
+    # Bulk status change that last moved this order (see services/order_transitions.py)
+    last_transition_id: Optional[PydanticObjectId] = None
+    
     # Feedback
     feedback_rating: Optional[int] = Field(None, description="Customer rating out of 5")
     feedback_text: Optional[str] = Field(None, description="Customer feedback comments")
@@ -65,6 +70,15 @@ class Order(Document):
     
     class Settings:
         name = "orders"
+        indexes = [
+            # Active-shipment polling: status filter, paged by _id
+            IndexModel([("status", ASCENDING), ("_id", ASCENDING)]),
+            # Carrier webhooks resolve orders by tracking number
+            IndexModel([("tracking_id", ASCENDING)], sparse=True),
+            IndexModel([("last_transition_id", ASCENDING)], sparse=True),
+            # Admin orders list (newest first) and the reminders' created_at windows
+            IndexModel([("created_at", DESCENDING)]),
+        ]
         
     class Config:
         use_enum_values = True
@@ -77,3 +91,37 @@ class Order(Document):
                 "amount": 99.99
             }
         }
+
+
+class OrderListView(BaseModel):
+    """Projection of the order fields shown in the admin orders list"""
+    
+    id: PydanticObjectId = Field(alias="_id")
+    user_id: DBRef
+    status: str
+    payment_status: str
+    sentiment: str
+    automation_enabled: bool
+    product_name: Optional[str] = None
+    amount: Optional[float] = None
+    created_at: datetime
+    feedback_rating: Optional[int] = None
+    feedback_text: Optional[str] = None
+    
+    class Settings:
+        projection = {
+            "_id": 1,
+            "user_id": 1,
+            "status": 1,
+            "payment_status": 1,
+            "sentiment": 1,
+            "automation_enabled": 1,
+            "product_name": 1,
+            "amount": 1,
+            "created_at": 1,
+            "feedback_rating": 1,
+            "feedback_text": 1,
+        }
+        
+    class Config:
+        arbitrary_types_allowed = True
@@ -1,8 +1,11 @@
 from beanie import Document
-from pydantic import Field
+from pydantic import Field, field_validator
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime
 from typing import Optional
 
+from phone import InvalidPhoneNumber, normalize_phone
+
 
 class User(Document):
     """User model for storing customer information"""
@@ -11,8 +14,22 @@ class User(Document):
     whatsapp_number: str = Field(..., description="WhatsApp number with country code")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
+    @field_validator("whatsapp_number")
+    @classmethod
+    def _normalize_whatsapp_number(cls, value: str) -> str:
+        # Lenient: a legacy record with an unreadable number still loads (API input is checked strictly)
+        try:
+            return normalize_phone(value)
+        except InvalidPhoneNumber:
+            return value
+    
     class Settings:
         name = "users"  # MongoDB collection name
+        indexes = [
+            # One user per E.164 number; order creation upserts and webhook lookups hit it
+            # (run migrate_phone_numbers.py on existing data first)
+            IndexModel([("whatsapp_number", ASCENDING)], unique=True),
+        ]
         
     class Config:
         json_schema_extra = {
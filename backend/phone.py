@@ -0,0 +1,50 @@
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+
+# Country code for numbers given in national form with a trunk 0 ("07911 123456"); unset: such numbers are rejected
+DEFAULT_COUNTRY_CODE = os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "").lstrip("+")
+
+# Separators people and providers put in numbers
+_SEPARATORS = re.compile(r"[\s\-()./\u00a0]")
+_E164_DIGITS = re.compile(r"[1-9][0-9]{6,14}")
+
+
+class InvalidPhoneNumber(ValueError):
+    """Raised for a value that can't be read as an E.164 phone number"""
+
+
+@lru_cache(maxsize=int(os.getenv("PHONE_NORMALIZE_CACHE_SIZE", "65536")))
+def normalize_phone(value: Optional[str]) -> str:
+    """
+    Canonical E.164 form ("+14155238886") of a phone number as any caller
+    has it: with or without a "whatsapp:" prefix, "+", "00" international
+    prefix, spaces, dashes or parentheses.
+
+    Every write and lookup of User.whatsapp_number goes through this, so
+    one customer is always one exact, indexed value. Cached: the same
+    numbers come through the webhooks over and over.
+    """
+    number = (value or "").strip()
+    if number.lower().startswith("whatsapp:"):
+        number = number[len("whatsapp:"):]
+    number = _SEPARATORS.sub("", number)
+
+    if number.startswith("+"):
+        digits = number[1:]
+    elif number.startswith("00"):
+        digits = number[2:]
+    elif number.startswith("0"):
+        if not DEFAULT_COUNTRY_CODE:
+            raise InvalidPhoneNumber(f"Number needs a country code: {value!r}")
+        digits = DEFAULT_COUNTRY_CODE + number[1:]
+    else:
+        # Twilio and older clients send international numbers without the "+"
+        digits = number
+
+    # E.164: up to 15 digits, country codes never start with 0
+    if not _E164_DIGITS.fullmatch(digits):
+        raise InvalidPhoneNumber(f"Not a valid phone number: {value!r}")
+    return f"+{digits}"
@@ -1,26 +1,78 @@
+import os
+import socket
+import logging
+from functools import wraps
+from pymongo.errors import DuplicateKeyError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime, timedelta
 
 from models.order import Order, PaymentStatus
 from services.message_policy import message_policy
+from services.retention_service import retention_service
+from services.tracking_service import tracking_service
+from logging_config import new_correlation_id
+from metrics import SCHEDULER_ITEMS_PROCESSED, track_job
+
+
+logger = logging.getLogger(__name__)
 
 
 class ReminderScheduler:
     """
     Background scheduler for automated payment reminders and alert checks.
     Uses APScheduler for time-based automation.
+    
+    Runs in the API process, or in a separate worker (python -m worker)
+    with RUN_SCHEDULER=false on the API. Each run takes a lease on its job
+    in MongoDB first, so with several schedulers running a job still runs
+    once per interval.
     """
     
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
+        self.started = False
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+    
+    async def _acquire_lease(self, job_id: str, seconds: float) -> bool:
+        """Claim this run of a job for `seconds`; False if another scheduler holds it"""
+        now = datetime.utcnow()
+        leases = Order.get_motor_collection().database["scheduler_leases"]
+        try:
+            # Matches only an expired lease; otherwise the upsert collides with the live one
+            await leases.update_one(
+                {"_id": job_id, "expires_at": {"$lte": now}},
+                {"$set": {"owner": self.owner, "acquired_at": now, "expires_at": now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+    
+    def _leased(self, job_id: str, interval_seconds: float, func):
+        """Wrap a job so only one scheduler runs it per interval"""
+        # A little short of the interval, so the next tick can always take it
+        lease_seconds = interval_seconds * 0.9
+        
+        @wraps(func)
+        async def run():
+            try:
+                if not await self._acquire_lease(job_id, lease_seconds):
+                    logger.debug("Skipping %s: another scheduler has this run", job_id)
+                    return
+            except Exception as e:
+                logger.error("Could not take the %s lease: %s", job_id, str(e))
+                return
+            await func()
+        
+        return run
     
     def start(self):
         """Start the scheduler with all jobs"""
         
         # Job 1: Check for 5-minute payment reminders (runs every 1 minute)
         self.scheduler.add_job(
-            self.send_5min_reminders,
+            self._leased("payment_reminder_5min", 60, self.send_5min_reminders),
             trigger=IntervalTrigger(minutes=1),
             id="payment_reminder_5min",
             name="Send 5-minute payment reminders",
@@ -29,7 +81,7 @@ class ReminderScheduler:
         
         # Job 2: Check for 24-hour payment reminders (runs every hour)
         self.scheduler.add_job(
-            self.send_24hour_reminders,
+            self._leased("payment_reminder_24hour", 3600, self.send_24hour_reminders),
             trigger=IntervalTrigger(hours=1),
             id="payment_reminder_24hour",
             name="Send 24-hour payment reminders",
@@ -38,23 +90,50 @@ class ReminderScheduler:
         
         # Job 3: Check for no-response alerts (runs every 4 hours)
         self.scheduler.add_job(
-            message_policy.check_no_response_alerts,
+            self._leased("no_response_check", 4 * 3600, message_policy.check_no_response_alerts),
             trigger=IntervalTrigger(hours=4),
             id="no_response_check",
             name="Check for no-response alerts",
             replace_existing=True
         )
         
+        # Job 4: Archive expired message logs and resolved alerts (runs daily)
+        self.scheduler.add_job(
+            self._leased("retention_archive", 24 * 3600, retention_service.archive_expired),
+            trigger=IntervalTrigger(hours=24),
+            id="retention_archive",
+            name="Archive expired message logs and alerts",
+            replace_existing=True
+        )
+        
+        # Job 5: Poll carriers for shipped orders and auto-advance them (off unless configured)
+        tracking_poll_minutes = int(os.getenv("TRACKING_POLL_INTERVAL_MINUTES", "0"))
+        if tracking_poll_minutes > 0:
+            self.scheduler.add_job(
+                self._leased("tracking_poll", tracking_poll_minutes * 60, tracking_service.poll_active_shipments),
+                trigger=IntervalTrigger(minutes=tracking_poll_minutes),
+                id="tracking_poll",
+                name="Poll carrier tracking for active shipments",
+                replace_existing=True,
+                max_instances=1
+            )
+        
         self.scheduler.start()
-        print("✓ Scheduler started with automated jobs")
+        self.started = True
+        logger.info("Scheduler started with automated jobs")
     
     def shutdown(self):
         """Gracefully shutdown the scheduler"""
+        if not self.started:
+            return
         self.scheduler.shutdown()
-        print("✓ Scheduler shutdown")
+        self.started = False
+        logger.info("Scheduler shutdown")
     
+    @track_job("payment_reminder_5min")
     async def send_5min_reminders(self):
         """Send first payment reminder 5 minutes after order creation"""
+        new_correlation_id()
         try:
             # Find orders created ~5 minutes ago with pending payment
             cutoff_time = datetime.utcnow() - timedelta(minutes=5)
@@ -69,17 +148,21 @@ class ReminderScheduler:
             ).to_list()
             
             for order in orders:
-                print(f"⏰ Sending 5-min payment reminder for order {order.id}")
+                logger.debug("Sending 5-min payment reminder for order %s", order.id)
                 await message_policy.send_payment_reminder(order, reminder_number=1)
             
+            SCHEDULER_ITEMS_PROCESSED.labels("payment_reminder_5min").inc(len(orders))
+            
             if orders:
-                print(f"✓ Sent {len(orders)} 5-minute payment reminders")
+                logger.info("Sent %d 5-minute payment reminders", len(orders))
                 
         except Exception as e:
-            print(f"Error in 15min reminder job: {str(e)}")
+            logger.error("Error in 5min reminder job: %s", str(e))
     
+    @track_job("payment_reminder_24hour")
     async def send_24hour_reminders(self):
         """Send final payment reminder 24 hours after order creation"""
+        new_correlation_id()
         try:
             # Find orders created ~24 hours ago with pending payment
             cutoff_time = datetime.utcnow() - timedelta(hours=24)
@@ -94,14 +177,16 @@ class ReminderScheduler:
             ).to_list()
             
             for order in orders:
-                print(f"⏰ Sending 24-hour payment reminder for order {order.id}")
+                logger.debug("Sending 24-hour payment reminder for order %s", order.id)
                 await message_policy.send_payment_reminder(order, reminder_number=2)
             
+            SCHEDULER_ITEMS_PROCESSED.labels("payment_reminder_24hour").inc(len(orders))
+            
             if orders:
-                print(f"✓ Sent {len(orders)} 24-hour payment reminders")
+                logger.info("Sent %d 24-hour payment reminders", len(orders))
                 
         except Exception as e:
-            print(f"Error in 24hour reminder job: {str(e)}")
+            logger.error("Error in 24hour reminder job: %s", str(e))
 
 
 # Singleton instance
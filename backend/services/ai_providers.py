@@ -0,0 +1,143 @@
+import os
+import re
+import json
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Type
+
+
+@dataclass
+class LLMRequest:
+    """One completion request, independent of the provider that serves it"""
+    method: str  # AIService method name, used for metrics and by the stub
+    system: str
+    prompt: str
+    temperature: float = 0.7
+    max_tokens: int = 100
+    # Structured inputs the prompt was built from (read by the stub provider, and the cache key)
+    context: Dict[str, str] = field(default_factory=dict)
+    # Name of the provider whose answer was used, set by AIService
+    served_by: Optional[str] = None
+
+
+class AIProvider:
+    """
+    Interface for LLM backends. Implementations are async and import their SDK
+    on first use, so an unused provider costs nothing at startup.
+    """
+
+    name = "base"
+    # Model identifier, part of the response cache key
+    model = ""
+
+    async def complete(self, request: LLMRequest) -> str:
+        raise NotImplementedError
+
+
+class OpenAIProvider(AIProvider):
+    name = "openai"
+
+    def __init__(self):
+        self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY environment variable is required for the openai provider")
+            from openai import AsyncOpenAI
+            # Deadlines are enforced by AIService; don't let the SDK retry behind its back
+            self._client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        return self._client
+
+    async def complete(self, request: LLMRequest) -> str:
+        response = await self._get_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": request.system},
+                {"role": "user", "content": request.prompt}
+            ],
+            temperature=request.temperature,
+            max_tokens=request.max_tokens
+        )
+        return response.choices[0].message.content.strip()
+
+
+class GeminiProvider(AIProvider):
+    name = "gemini"
+
+    def __init__(self):
+        self.model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY environment variable is required for the gemini provider")
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(self.model)
+        return self._model
+
+    async def complete(self, request: LLMRequest) -> str:
+        response = await self._get_model().generate_content_async(request.prompt)
+        return response.text.strip()
+
+
+class StubProvider(AIProvider):
+    """
+    Local deterministic provider for development and load tests: no network,
+    same answer for the same input. AI_STUB_LATENCY_MS adds an artificial delay.
+    """
+
+    name = "stub"
+    model = "stub"
+
+    POSITIVE = ("thank", "great", "good", "love", "perfect", "awesome", "happy", "excellent")
+    NEGATIVE = ("bad", "late", "wrong", "broken", "angry", "terrible", "refund", "worst", "never")
+
+    def __init__(self):
+        self.latency = float(os.getenv("AI_STUB_LATENCY_MS", "0")) / 1000
+
+    async def complete(self, request: LLMRequest) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        text = request.context.get("text", "").lower()
+        if request.method == "classify_sentiment":
+            return self._sentiment(text)
+
+        if request.method == "classify_sentiment_batch":
+            return json.dumps([self._sentiment(item.lower()) for item in request.context.get("texts", [])])
+
+        if request.method == "extract_feedback_rating":
+            match = re.search(r"[1-5]", text)
+            return match.group() if match else "0"
+
+        product = request.context.get("product_name")
+        product_info = f" ({product})" if product else ""
+        status = request.context.get("order_status", "").replace("_", " ").lower()
+        return f"Hi {request.context.get('customer_name', 'there')}, your order{product_info} is now {status}."
+
+    def _sentiment(self, text: str) -> str:
+        if any(word in text for word in self.NEGATIVE):
+            return "negative"
+        if any(word in text for word in self.POSITIVE):
+            return "positive"
+        return "neutral"
+
+
+PROVIDERS: Dict[str, Type[AIProvider]] = {
+    OpenAIProvider.name: OpenAIProvider,
+    GeminiProvider.name: GeminiProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+def get_provider(name: str) -> AIProvider:
+    provider_cls = PROVIDERS.get(name.strip().lower())
+    if provider_cls is None:
+        raise ValueError(f"Unsupported AI provider: {name}")
+    return provider_cls()
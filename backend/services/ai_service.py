@@ -1,88 +1,266 @@
 import os
-from typing import Optional
-import google.generativeai as genai
-from openai import OpenAI
+import re
+import json
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from metrics import observe_llm_call, LLM_HEDGED_CALLS, LLM_FALLBACKS
+from services.ai_providers import AIProvider, LLMRequest, get_provider
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.llm_cache import llm_cache
+
+
+logger = logging.getLogger(__name__)
 
 
 class AIService:
+    """
+    Message personalization and reply understanding on top of a chain of LLM
+    providers (AI_PROVIDER first, then AI_FALLBACK_PROVIDERS).
+
+    Every call has a hard deadline (AI_TIMEOUT_SECONDS). Each provider but the
+    last in line gets only its share of it (AI_PROVIDER_TIMEOUT_SECONDS,
+    default the deadline split evenly), so a hung provider still leaves time
+    for the next one; the last gets whatever remains. When AI_HEDGE_AFTER_MS
+    is set and the current provider hasn't answered by then, the next provider
+    in the chain is raced against it. Each provider sits behind a circuit
+    breaker, so a failing provider is skipped outright; when nothing is left
+    the caller gets the static fallback immediately.
+
+    Answers are cached (LLMCache) per provider and model, so repeated inputs
+    are served without reaching a provider, here or on any other replica.
+    """
+    
     def __init__(self):
         self.ai_provider = os.getenv("AI_PROVIDER", "gemini").lower()  # Default to Gemini
+        fallbacks = [name for name in os.getenv("AI_FALLBACK_PROVIDERS", "").split(",") if name.strip()]
+        
+        self.providers: List[AIProvider] = []
+        for name in [self.ai_provider] + fallbacks:
+            provider = get_provider(name)
+            if provider.name not in [p.name for p in self.providers]:
+                self.providers.append(provider)
+        
+        self.timeout = float(os.getenv("AI_TIMEOUT_SECONDS", "5.0"))
+        provider_timeout = float(os.getenv("AI_PROVIDER_TIMEOUT_SECONDS", "0"))  # 0: timeout split over the chain
+        self.provider_timeout = provider_timeout if provider_timeout > 0 else self.timeout / len(self.providers)
+        hedge_after_ms = float(os.getenv("AI_HEDGE_AFTER_MS", "0"))  # 0 disables hedging
+        self.hedge_after = hedge_after_ms / 1000 if hedge_after_ms > 0 else None
+        
+        self.breakers = {
+            provider.name: CircuitBreaker(
+                f"llm:{provider.name}",
+                failure_threshold=int(os.getenv("AI_BREAKER_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+            )
+            for provider in self.providers
+        }
+    
+    async def _complete(self, request: LLMRequest, skip_cache_lookup: bool = False) -> str:
+        """
+        Answer a request from the cache, or else run it through the provider
+        chain within the deadline. Raises the last provider error,
+        CircuitOpenError or asyncio.TimeoutError.
+        
+        `skip_cache_lookup` is for callers that already missed the cache
+        for this request; the answer is still cached.
+        """
+        if llm_cache.enabled_for(request.method) and not skip_cache_lookup:
+            # Any provider's cached answer will do; the chain's order is the preference
+            keys = [llm_cache.key(provider, request) for provider in self.providers]
+            cached = await llm_cache.get(keys, request.method)
+            if cached is not None:
+                return cached
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        candidates = list(self.providers)
+        pending = set()
+        error: Exception = CircuitOpenError("All AI provider circuits are open")
         
-        if self.ai_provider == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY environment variable is required when AI_PROVIDER=openai")
-            self.client = OpenAI(api_key=api_key)
-            self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-        elif self.ai_provider == "gemini":
-            api_key = os.getenv("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY environment variable is required when AI_PROVIDER=gemini")
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel(os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
-        else:
-            raise ValueError(f"Unsupported AI provider: {self.ai_provider}")
+        def launch(hedged: bool = False) -> bool:
+            while candidates:
+                provider = candidates.pop(0)
+                if self.breakers[provider.name].allow():
+                    if hedged:
+                        LLM_HEDGED_CALLS.labels(provider.name, request.method).inc()
+                    # A provider with others behind it gets its share; the last one gets the rest
+                    attempt_deadline = min(deadline, loop.time() + self.provider_timeout) if candidates else deadline
+                    pending.add(asyncio.ensure_future(self._attempt(provider, request, attempt_deadline)))
+                    return True
+            return False
+        
+        launch()
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                wait_for = min(self.hedge_after, remaining) if self.hedge_after and candidates else None
+                done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # Slow answer: race the next provider against it
+                    if loop.time() < deadline:
+                        launch(hedged=True)
+                    continue
+                
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        provider, text = task.result()
+                        request.served_by = provider.name
+                        if llm_cache.enabled_for(request.method):
+                            llm_cache.put(llm_cache.key(provider, request), provider, request, text)
+                        return text
+                    error = task.exception()
+                
+                # Fast failure: move down the chain
+                if not pending and loop.time() < deadline:
+                    launch()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
     
-    def personalize_message(self, customer_name: str, order_status: str, product_name: Optional[str] = None) -> str:
+    async def _attempt(self, provider: AIProvider, request: LLMRequest, deadline: float) -> Tuple[AIProvider, str]:
+        """One provider call, bounded by its deadline and reported to its breaker"""
+        breaker = self.breakers[provider.name]
         try:
-            prompt = self._build_personalization_prompt(customer_name, order_status, product_name)
-            
-            if self.ai_provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a friendly customer service assistant. Generate short, warm WhatsApp messages (max 2-3 sentences)."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7,
-                    max_tokens=100
+            with observe_llm_call(provider.name, request.method):
+                text = await asyncio.wait_for(
+                    provider.complete(request),
+                    timeout=max(0.0, deadline - asyncio.get_running_loop().time())
                 )
-                return response.choices[0].message.content.strip()
+        except asyncio.CancelledError:
+            # Lost a hedge race: says nothing about the provider's health
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        
+        if not text:
+            breaker.record_failure()
+            raise ValueError(f"Empty response from {provider.name}")
+        breaker.record_success()
+        return provider, text
+    
+    def _fallback_reason(self, error: Exception) -> str:
+        if isinstance(error, CircuitOpenError):
+            return "circuit_open"
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        return "error"
+    
+    async def personalize_message(self, customer_name: str, order_status: str, product_name: Optional[str] = None) -> str:
+        try:
+            prompt = self._build_personalization_prompt(customer_name, order_status, product_name)
             
-            elif self.ai_provider == "gemini":
-                response = self.model.generate_content(prompt)
-                return response.text.strip()
+            return await self._complete(LLMRequest(
+                method="personalize_message",
+                system="You are a friendly customer service assistant. Generate short, warm WhatsApp messages (max 2-3 sentences).",
+                prompt=prompt,
+                temperature=0.7,
+                max_tokens=100,
+                context={"customer_name": customer_name, "order_status": order_status, "product_name": product_name or ""}
+            ))
                 
         except Exception as e:
-            print(f"AI personalization failed: {str(e)}")
+            LLM_FALLBACKS.labels("personalize_message", self._fallback_reason(e)).inc()
+            logger.warning("AI personalization failed: %s", str(e) or type(e).__name__)
             # Fallback to static message
             return self._get_fallback_message(customer_name, order_status, product_name)
     
-    def classify_sentiment(self, customer_reply: str) -> str:
-        try:
-            prompt = f"""Classify the sentiment of this customer message as exactly one word: positive, neutral, or negative.
+    def _sentiment_request(self, customer_reply: str) -> LLMRequest:
+        prompt = f"""Classify the sentiment of this customer message as exactly one word: positive, neutral, or negative.
 
 Customer message: "{customer_reply}"
 
 Respond with only one word: positive, neutral, or negative."""
 
-            if self.ai_provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a sentiment classifier. Respond with exactly one word: positive, neutral, or negative."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=10
-                )
-                sentiment = response.choices[0].message.content.strip().lower()
-            
-            elif self.ai_provider == "gemini":
-                response = self.model.generate_content(prompt)
-                sentiment = response.text.strip().lower()
-            
-            # Validate response
-            if sentiment in ["positive", "neutral", "negative"]:
-                return sentiment
-            else:
-                return "neutral"  # Default
+        return LLMRequest(
+            method="classify_sentiment",
+            system="You are a sentiment classifier. Respond with exactly one word: positive, neutral, or negative.",
+            prompt=prompt,
+            temperature=0.3,
+            max_tokens=10,
+            context={"text": customer_reply}
+        )
+    
+    def _parse_sentiment(self, response: str) -> str:
+        sentiment = response.strip().lower()
+        # Validate response
+        return sentiment if sentiment in ["positive", "neutral", "negative"] else "neutral"
+    
+    async def cached_sentiment(self, customer_reply: str) -> Optional[str]:
+        """classify_sentiment's answer if it's cached, without calling a provider"""
+        request = self._sentiment_request(customer_reply)
+        if not llm_cache.enabled_for(request.method):
+            return None
+        cached = await llm_cache.get([llm_cache.key(provider, request) for provider in self.providers], request.method)
+        return self._parse_sentiment(cached) if cached is not None else None
+    
+    async def classify_sentiment(self, customer_reply: str, skip_cache_lookup: bool = False) -> str:
+        try:
+            response = await self._complete(self._sentiment_request(customer_reply), skip_cache_lookup=skip_cache_lookup)
+            return self._parse_sentiment(response)
                 
         except Exception as e:
-            print(f"AI sentiment classification failed: {str(e)}")
+            LLM_FALLBACKS.labels("classify_sentiment", self._fallback_reason(e)).inc()
+            logger.warning("AI sentiment classification failed: %s", str(e) or type(e).__name__)
             return "neutral"  # Safe default
+    
+    async def classify_sentiment_batch(self, customer_replies: List[str]) -> Optional[List[str]]:
+        """
+        Classify several replies in one request (used by SentimentBatcher).
+        
+        Returns one sentiment per reply, all "neutral" if no provider could
+        answer (as classify_sentiment would), or None when the answer can't be
+        parsed, so the caller can fall back to classifying them one by one.
+        """
+        try:
+            prompt = f"""Classify the sentiment of each customer message below as exactly one word: positive, neutral, or negative.
+
+Customer messages (JSON array): {json.dumps(customer_replies, ensure_ascii=False)}
+
+Respond with only a JSON array of {len(customer_replies)} strings, one per message, in the same order."""
+
+            request = LLMRequest(
+                method="classify_sentiment_batch",
+                system="You are a sentiment classifier. Respond with only a JSON array of words, each positive, neutral, or negative.",
+                prompt=prompt,
+                temperature=0.3,
+                max_tokens=10 * len(customer_replies) + 20,
+                context={"texts": customer_replies}
+            )
+            response = await self._complete(request)
             
-    def extract_feedback_rating(self, feedback_text: str) -> Optional[int]:
+        except Exception as e:
+            LLM_FALLBACKS.labels("classify_sentiment_batch", self._fallback_reason(e)).inc()
+            logger.warning("AI batch sentiment classification failed: %s", str(e) or type(e).__name__)
+            return ["neutral"] * len(customer_replies)
+        
+        # Models sometimes wrap the array in prose or a code fence
+        match = re.search(r"\[.*\]", response, re.DOTALL)
+        try:
+            sentiments = [str(item).strip().lower() for item in json.loads(match.group())] if match else None
+        except ValueError:
+            sentiments = None
+        if not sentiments or len(sentiments) != len(customer_replies):
+            logger.warning("Unparseable batch sentiment response for %d replies", len(customer_replies))
+            return None
+        sentiments = [self._parse_sentiment(sentiment) for sentiment in sentiments]
+        
+        # Cache each answer as if it came from classify_sentiment, so repeats skip the batch entirely
+        provider = next((p for p in self.providers if p.name == request.served_by), None)
+        if provider is not None:
+            for customer_reply, sentiment in zip(customer_replies, sentiments):
+                single = self._sentiment_request(customer_reply)
+                if llm_cache.enabled_for(single.method):
+                    llm_cache.put(llm_cache.key(provider, single), provider, single, sentiment)
+        return sentiments
+            
+    async def extract_feedback_rating(self, feedback_text: str) -> Optional[int]:
         """
         Extract a numerical rating (1-5) from feedback text using AI.
         """
@@ -95,24 +273,16 @@ Customer feedback: "{feedback_text}"
 
 Rating (1-5):"""
 
-            if self.ai_provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a data extractor. Respond with only a single digit from 0 to 5."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=5
-                )
-                rating_str = response.choices[0].message.content.strip()
-            
-            elif self.ai_provider == "gemini":
-                response = self.model.generate_content(prompt)
-                rating_str = response.text.strip()
+            rating_str = await self._complete(LLMRequest(
+                method="extract_feedback_rating",
+                system="You are a data extractor. Respond with only a single digit from 0 to 5.",
+                prompt=prompt,
+                temperature=0.1,
+                max_tokens=5,
+                context={"text": feedback_text}
+            ))
             
             # Extract first digit found
-            import re
             match = re.search(r'[0-5]', rating_str)
             if match:
                 rating = int(match.group())
@@ -120,7 +290,8 @@ Rating (1-5):"""
             return None
                 
         except Exception as e:
-            print(f"AI rating extraction failed: {str(e)}")
+            LLM_FALLBACKS.labels("extract_feedback_rating", self._fallback_reason(e)).inc()
+            logger.warning("AI rating extraction failed: %s", str(e) or type(e).__name__)
             return None
     
     def _build_personalization_prompt(self, customer_name: str, order_status: str, product_name: Optional[str]) -> str:
@@ -0,0 +1,143 @@
+import time
+import logging
+from typing import Dict
+
+from metrics import CIRCUIT_STATE, CIRCUIT_REJECTED
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for an upstream dependency.
+
+    CLOSED: calls go through; `failure_threshold` failures in a row open it.
+    OPEN: calls are rejected without touching the dependency for `reset_timeout` seconds.
+    HALF_OPEN: up to `half_open_max_calls` probe calls go through; a success
+    closes the circuit, a failure opens it again.
+
+    Not locked: all callers run on the event loop.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+        CIRCUIT_STATE.labels(name).set(0)
+        _breakers[name] = self
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit starts probing again (0 if not open)"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go out now. In HALF_OPEN this reserves a probe slot,
+        so every allowed call must end in record_success, record_failure or release.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        CIRCUIT_REJECTED.labels(self.name).inc()
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            self._trip()
+            return
+        self._failures += 1
+        if self._state == self.CLOSED and self._failures >= self.failure_threshold:
+            self._trip()
+
+    def release(self) -> None:
+        """Give back a probe slot for a call that ended without a verdict (e.g. cancelled)"""
+        if self._state == self.HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _trip(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning("Circuit %s: %s -> %s", self.name, self._state, state)
+        self._state = state
+        self._failures = 0
+        self._probes_in_flight = 0
+        CIRCUIT_STATE.labels(self.name).set(self._STATE_VALUES[state])
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic, so retries can't multiply
+    load on a dependency that is already struggling. Every request deposits
+    `ratio` tokens, every retry spends one; `min_per_second` keeps a trickle
+    of retries available at low traffic.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+
+    def _refill(self, amount: float = 0.0) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + amount + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_request(self) -> None:
+        self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_states() -> Dict[str, str]:
+    """Current state of every circuit breaker, for the readiness report"""
+    return {name: breaker.state for name, breaker in _breakers.items()}
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from models.message_log import MessageLog, DeliveryStatus
+from services.message_log_writer import message_log_writer
+from metrics import DELIVERY_STATUS_UPDATES, register_queue
+
+
+logger = logging.getLogger(__name__)
+
+
+# Twilio MessageStatus -> DeliveryStatus
+TWILIO_STATUSES: Dict[str, DeliveryStatus] = {
+    "accepted": DeliveryStatus.QUEUED,
+    "scheduled": DeliveryStatus.QUEUED,
+    "queued": DeliveryStatus.QUEUED,
+    "sending": DeliveryStatus.QUEUED,
+    "sent": DeliveryStatus.SENT,
+    "delivered": DeliveryStatus.DELIVERED,
+    "read": DeliveryStatus.READ,
+    "undelivered": DeliveryStatus.FAILED,
+    "failed": DeliveryStatus.FAILED,
+    "canceled": DeliveryStatus.FAILED,
+}
+
+# Callbacks arrive out of order; a status never replaces a later one.
+# FAILED ranks below DELIVERED: a late failure doesn't undo a delivery.
+STATUS_ORDER = [
+    DeliveryStatus.QUEUED.value,
+    DeliveryStatus.SENT.value,
+    DeliveryStatus.FAILED.value,
+    DeliveryStatus.DELIVERED.value,
+    DeliveryStatus.READ.value,
+]
+
+# Timestamp fields set (first time only) when a status is reported
+STATUS_TIMESTAMPS: Dict[DeliveryStatus, tuple] = {
+    DeliveryStatus.DELIVERED: ("delivered_at",),
+    # A read receipt implies delivery, even if that callback was lost
+    DeliveryStatus.READ: ("read_at", "delivered_at"),
+    DeliveryStatus.FAILED: ("failed_at",),
+}
+
+
+class DeliveryStatusWriter:
+    """
+    Applies Twilio status callbacks to MessageLog records, buffered: events
+    are coalesced per message SID and written every DELIVERY_STATUS_FLUSH_MS
+    with one unordered bulk_write, instead of a round-trip per callback
+    (Twilio sends up to four per outgoing message).
+
+    Each update is a guarded pipeline update, so replays and out-of-order
+    callbacks can't move a message back to an earlier status, and each
+    timestamp keeps the first time it was reported.
+
+    When the writer isn't running (serverless mode, scripts) events are
+    written inline by record().
+    """
+
+    def __init__(self):
+        self.flush_interval = float(os.getenv("DELIVERY_STATUS_FLUSH_MS", "500")) / 1000
+        self.batch_size = max(1, int(os.getenv("DELIVERY_STATUS_BATCH_SIZE", "1000")))
+
+        # message SID -> {"status", "times", "error_code"}
+        self._pending: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        register_queue("delivery_status", lambda: len(self._pending))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Delivery status writer started (every %d ms)", self.flush_interval * 1000)
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write out everything still pending"""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self._flush()
+        if self._pending:
+            logger.error("Delivery status writer stopped with %d updates unwritten", len(self._pending))
+
+    async def record(self, message_sid: str, twilio_status: str, error_code: Optional[str] = None) -> bool:
+        """Queue one status callback; False if the status isn't one we track"""
+        status = TWILIO_STATUSES.get((twilio_status or "").strip().lower())
+        if status is None or not message_sid:
+            return False
+
+        now = datetime.utcnow()
+        entry = self._pending.setdefault(message_sid, {"status": status, "times": {}, "error_code": None})
+        if STATUS_ORDER.index(status.value) > STATUS_ORDER.index(entry["status"].value):
+            entry["status"] = status
+        for field in STATUS_TIMESTAMPS.get(status, ()):
+            entry["times"].setdefault(field, now)
+        if error_code:
+            entry["error_code"] = str(error_code)
+
+        if not self.running:
+            await self._flush()
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+
+    @staticmethod
+    def _update(message_sid: str, entry: dict, now: datetime) -> UpdateOne:
+        status = entry["status"].value
+        advances = {"$gt": [
+            {"$indexOfArray": [STATUS_ORDER, status]},
+            {"$indexOfArray": [STATUS_ORDER, "$delivery_status"]},
+        ]}
+        fields = {
+            "delivery_status": {"$cond": [advances, status, "$delivery_status"]},
+            "status_updated_at": now,
+        }
+        for field, reported_at in entry["times"].items():
+            fields[field] = {"$ifNull": [f"${field}", reported_at]}
+        if entry["error_code"]:
+            fields["delivery_error_code"] = entry["error_code"]
+        return UpdateOne({"whatsapp_message_id": message_sid}, [{"$set": fields}])
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        # Callbacks can beat the buffered insert of the message they're about
+        await message_log_writer.flush()
+
+        collection = MessageLog.get_motor_collection()
+        while self._pending:
+            sids = list(self._pending)[:self.batch_size]
+            batch = {sid: self._pending.pop(sid) for sid in sids}
+            now = datetime.utcnow()
+            try:
+                result = await collection.bulk_write(
+                    [self._update(sid, entry, now) for sid, entry in batch.items()],
+                    ordered=False
+                )
+                DELIVERY_STATUS_UPDATES.labels("matched").inc(result.matched_count)
+                DELIVERY_STATUS_UPDATES.labels("unmatched").inc(len(batch) - result.matched_count)
+            except Exception as e:
+                # Put the batch back (newer events for the same SIDs merge on the next record) and retry later
+                for sid, entry in batch.items():
+                    self._merge(sid, entry)
+                logger.warning("Delivery status batch of %d failed, will retry: %s", len(batch), str(e))
+                break
+
+    def _merge(self, message_sid: str, entry: dict) -> None:
+        current = self._pending.get(message_sid)
+        if current is None:
+            self._pending[message_sid] = entry
+            return
+        if STATUS_ORDER.index(entry["status"].value) > STATUS_ORDER.index(current["status"].value):
+            current["status"] = entry["status"]
+        for field, reported_at in entry["times"].items():
+            current["times"][field] = min(reported_at, current["times"].get(field, reported_at))
+        current["error_code"] = current["error_code"] or entry["error_code"]
+
+
+# Singleton instance
+delivery_status_writer = DeliveryStatusWriter()
@@ -0,0 +1,327 @@
+import re
+import unicodedata
+from enum import Enum
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class Intent(str, Enum):
+    STATUS = "status"
+    CANCEL = "cancel"
+    FEEDBACK_PROMPT = "feedback_prompt"
+    RATING = "rating"
+    FREE_TEXT = "free_text"
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: Intent
+    source: str  # payload, phrase, rating, emoji, keyword or none
+    rating: Optional[int] = None
+    sentiment: Optional[str] = None  # Set when it can be told without the LLM
+
+
+# Interactive message IDs (Twilio ButtonPayload / ListId) of our templates
+PAYLOADS: Dict[str, Intent] = {
+    "1": Intent.STATUS,
+    "status": Intent.STATUS,
+    "check_status": Intent.STATUS,
+    "track": Intent.STATUS,
+    "track_order": Intent.STATUS,
+    "2": Intent.CANCEL,
+    "cancel": Intent.CANCEL,
+    "cancel_order": Intent.CANCEL,
+    "3": Intent.FEEDBACK_PROMPT,
+    "feedback": Intent.FEEDBACK_PROMPT,
+}
+
+# Whole-message phrases, matched after normalization (lowercase, no accents or punctuation)
+PHRASES: Dict[Intent, Tuple[str, ...]] = {
+    Intent.STATUS: (
+        "1", "status", "check status", "track", "order status", "track order", "track my order",
+        "where is my order", "where is my package", "where is it", "wheres my order",
+        "estado", "estado del pedido", "donde esta mi pedido", "rastrear", "rastrear pedido",
+        "onde esta meu pedido", "status do pedido", "rastreio",
+        "statut", "suivi", "ou est ma commande", "suivre ma commande",
+        "wo ist meine bestellung", "sendungsverfolgung", "stato ordine", "dove e il mio ordine",
+    ),
+    Intent.CANCEL: (
+        "2", "cancel", "cancel order", "cancel my order", "cancel it", "i want to cancel",
+        "cancelar", "cancelar pedido", "cancelar mi pedido", "cancelar meu pedido", "quiero cancelar",
+        "annuler", "annuler commande", "annuler ma commande",
+        "stornieren", "bestellung stornieren", "annulla", "annulla ordine", "cancella ordine",
+    ),
+    Intent.FEEDBACK_PROMPT: (
+        "3", "feedback", "give feedback", "leave feedback", "review", "leave a review",
+        "opinion", "comentario", "avis", "donner mon avis", "bewertung", "recensione",
+    ),
+}
+
+# Single-word keywords, matched typo-tolerantly in short messages
+KEYWORDS: Dict[Intent, Tuple[str, ...]] = {
+    Intent.STATUS: (
+        "status", "track", "tracking", "estado", "rastrear", "rastreio", "statut", "suivi",
+        "sendungsverfolgung", "tracciamento",
+    ),
+    Intent.CANCEL: (
+        "cancel", "cancellation", "cancelar", "cancelamento", "cancelacion", "annuler", "annulation",
+        "stornieren", "storno", "annulla", "cancella",
+    ),
+    Intent.FEEDBACK_PROMPT: (
+        "feedback", "review", "bewertung", "recensione", "comentario",
+    ),
+}
+
+# Words that may surround a keyword without changing its meaning
+FILLER_WORDS = frozenset("""
+    i me my the a an to of for on please pls plz want would like can could you check order
+    mi el la los del por favor quiero pedido meu o de do pedido quero
+    je ma mon ma commande veux sil vous plait
+    ich meine bestellung bitte will
+    il mio ordine per
+""".split())
+
+# Any of these turns a short command into free text ("don't cancel")
+NEGATIONS = frozenset("no not dont never nao nunca pas ne nicht kein non".split())
+
+STAR_EMOJI = {"⭐", "🌟"}
+EMOJI_INTENTS: Dict[str, Intent] = {
+    "📦": Intent.STATUS,
+    "🚚": Intent.STATUS,
+    "🔍": Intent.STATUS,
+    "❌": Intent.CANCEL,
+    "🚫": Intent.CANCEL,
+    "📝": Intent.FEEDBACK_PROMPT,
+}
+EMOJI_SENTIMENT: Dict[str, str] = {
+    "👍": "positive",
+    "👌": "positive",
+    "🙏": "positive",
+    "❤": "positive",
+    "😊": "positive",
+    "😀": "positive",
+    "😍": "positive",
+    "👎": "negative",
+    "😡": "negative",
+    "😠": "negative",
+    "😞": "negative",
+    "😢": "negative",
+}
+
+_RATING_WORDS = r"(?:rating|rate|rated|score|nota|calificacion|avaliacao|note|bewertung)"
+_RATING_UNITS = r"(?:of 5|out of 5|de 5|sur 5|von 5|su 5|stars?|estrellas?|estrelas?|etoiles?|sterne?|stelle)"
+# Normalized text, so "5/5" arrives as "5 5" and "4 ⭐" as "4"
+RATING_PATTERN = re.compile(rf"^(?:{_RATING_WORDS} )?([1-5])(?: (?:5|{_RATING_UNITS}))?$")
+# Explicit rating inside longer feedback ("4 stars, the fish was fresh")
+EMBEDDED_RATING_PATTERN = re.compile(
+    rf"\b([1-5]) {_RATING_UNITS}\b|\b{_RATING_WORDS} ([1-5])\b"
+)
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Casefold, strip accents and apostrophes, turn punctuation and emoji into spaces"""
+    text = unicodedata.normalize("NFKD", _APOSTROPHES.sub("", text.casefold()))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def rating_sentiment(rating: int) -> str:
+    if rating >= 4:
+        return "positive"
+    return "neutral" if rating == 3 else "negative"
+
+
+def _near_miss(token: str, keyword: str) -> bool:
+    """
+    One dropped, extra or swapped letter. A substituted letter is left out:
+    in short words it usually makes another real word ("states", "statue").
+    """
+    if abs(len(token) - len(keyword)) == 1:
+        longer, shorter = (token, keyword) if len(token) > len(keyword) else (keyword, token)
+        return any(longer[:i] + longer[i + 1:] == shorter for i in range(len(longer)))
+    if len(token) == len(keyword):
+        diffs = [i for i in range(len(token)) if token[i] != keyword[i]]
+        return (
+            len(diffs) == 2 and diffs[1] == diffs[0] + 1
+            and token[diffs[0]] == keyword[diffs[1]] and token[diffs[1]] == keyword[diffs[0]]
+        )
+    return False
+
+
+class _KeywordTrie:
+    """Trie over keywords with bounded edit-distance lookup (Damerau: a swap of two letters costs 1)"""
+
+    _END = "\0"
+
+    def __init__(self, words: Dict[str, Intent], cache_size: int = 4096):
+        self.root: dict = {}
+        for word, intent in words.items():
+            node = self.root
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[self._END] = intent
+        # Customers repeat the same typos; each distinct token is only walked once
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _lookup(self, word: str, max_distance: int) -> Optional[Intent]:
+        """
+        Intent of the closest keyword within max_distance, or None when there
+        is none or the closest ones disagree.
+        """
+        n = len(word)
+        limit = max_distance + 1
+        best_distance = limit
+        found = set()
+        first_row = [min(i, limit) for i in range(n + 1)]
+
+        # (node, its char, depth, DP row of the parent, row of the grandparent, parent's char)
+        stack = [(child, ch, 1, first_row, None, None) for ch, child in self.root.items() if ch != self._END]
+        while stack:
+            node, ch, depth, previous, before_previous, previous_ch = stack.pop()
+
+            # Only cells within max_distance of the diagonal can stay in range
+            row = [limit] * (n + 1)
+            row[0] = min(depth, limit)
+            low, high = max(1, depth - max_distance), min(n, depth + max_distance)
+            for i in range(low, high + 1):
+                cost = min(
+                    row[i - 1] + 1,
+                    previous[i] + 1,
+                    previous[i - 1] + (word[i - 1] != ch)
+                )
+                if before_previous and i > 1 and word[i - 1] == previous_ch and word[i - 2] == ch:
+                    cost = min(cost, before_previous[i - 2] + 1)
+                row[i] = min(cost, limit)
+
+            if self._END in node and row[n] <= max_distance:
+                if row[n] < best_distance:
+                    best_distance, found = row[n], {node[self._END]}
+                elif row[n] == best_distance:
+                    found.add(node[self._END])
+
+            # Prune branches that can no longer get within range
+            if low <= high and min(row[low - 1:high + 1]) <= min(max_distance, best_distance):
+                stack.extend(
+                    (child, next_ch, depth + 1, row, previous, ch)
+                    for next_ch, child in node.items() if next_ch != self._END
+                )
+
+        return found.pop() if len(found) == 1 else None
+
+
+class IntentRouter:
+    """
+    Resolves command-like customer replies (status, cancel, feedback, ratings)
+    locally, so only real free text goes to the LLM. All tables are compiled
+    once at import; a lookup is a handful of dict hits plus, for short
+    messages, a bounded trie walk.
+    """
+
+    # Longer messages are treated as free text unless they match a phrase
+    MAX_COMMAND_TOKENS = 5
+    # Tokens up to this long only match a keyword through _near_miss, not the edit-distance trie
+    SHORT_TOKEN_LENGTH = 6
+
+    def __init__(self):
+        self.payloads = {key.lower(): intent for key, intent in PAYLOADS.items()}
+        self.phrases = {
+            normalize(phrase): intent
+            for intent, phrases in PHRASES.items()
+            for phrase in phrases
+        }
+        self.keywords = _KeywordTrie({
+            normalize(word): intent
+            for intent, words in KEYWORDS.items()
+            for word in words
+        })
+        self._exact_keywords = {normalize(word): intent for intent, words in KEYWORDS.items() for word in words}
+        self._short_keywords = [
+            (word, intent) for word, intent in self._exact_keywords.items()
+            if len(word) <= self.SHORT_TOKEN_LENGTH + 1
+        ]
+
+    def route(self, text: str, payload: Optional[str] = None) -> IntentMatch:
+        if payload:
+            intent = self.payloads.get(payload.strip().lower())
+            if intent:
+                return IntentMatch(intent, "payload")
+
+        normalized = normalize(text or "")
+
+        intent = self.phrases.get(normalized)
+        if intent:
+            return IntentMatch(intent, "phrase")
+
+        emoji = [ch for ch in (text or "") if ch in STAR_EMOJI or ch in EMOJI_INTENTS or ch in EMOJI_SENTIMENT]
+
+        rating = self._match_rating(normalized, emoji)
+        if rating:
+            return IntentMatch(Intent.RATING, "rating", rating=rating, sentiment=rating_sentiment(rating))
+
+        if not normalized and emoji:
+            return self._match_emoji(emoji)
+
+        tokens = normalized.split()
+        if len(tokens) <= self.MAX_COMMAND_TOKENS:
+            intent = self._match_keywords(tokens)
+            if intent:
+                return IntentMatch(intent, "keyword")
+
+        return IntentMatch(Intent.FREE_TEXT, "none", rating=self._find_rating(normalized))
+
+    def _match_rating(self, normalized: str, emoji: Iterable[str]) -> Optional[int]:
+        stars = sum(1 for ch in emoji if ch in STAR_EMOJI)
+        if stars and not normalized and 1 <= stars <= 5:
+            return stars
+        match = RATING_PATTERN.match(normalized)
+        return int(match.group(1)) if match else None
+
+    def _find_rating(self, normalized: str) -> Optional[int]:
+        match = EMBEDDED_RATING_PATTERN.search(normalized)
+        return int(match.group(1) or match.group(2)) if match else None
+
+    def _match_emoji(self, emoji: Iterable[str]) -> IntentMatch:
+        intents = {EMOJI_INTENTS[ch] for ch in emoji if ch in EMOJI_INTENTS}
+        if len(intents) == 1:
+            return IntentMatch(intents.pop(), "emoji")
+        sentiments = {EMOJI_SENTIMENT[ch] for ch in emoji if ch in EMOJI_SENTIMENT}
+        sentiment = sentiments.pop() if len(sentiments) == 1 else None
+        return IntentMatch(Intent.FREE_TEXT, "emoji", sentiment=sentiment)
+
+    def _match_keywords(self, tokens) -> Optional[Intent]:
+        """Single intent when every token is a (possibly misspelled) keyword or a filler word"""
+        found = set()
+        unknown = []
+        # Cheap checks first, so most free text never reaches the trie
+        for token in tokens:
+            if token in NEGATIONS:
+                return None
+            intent = self._exact_keywords.get(token)
+            if intent is not None:
+                found.add(intent)
+            elif token not in FILLER_WORDS:
+                if len(token) < 5:
+                    return None
+                unknown.append(token)
+
+        for token in unknown:
+            if len(token) <= self.SHORT_TOKEN_LENGTH:
+                intent = self._match_short(token)
+            else:
+                intent = self.keywords.lookup(token, 1 if len(token) < 8 else 2)
+            if intent is None:
+                return None
+            found.add(intent)
+        return found.pop() if len(found) == 1 else None
+
+    def _match_short(self, token: str) -> Optional[Intent]:
+        intents = {intent for word, intent in self._short_keywords if _near_miss(token, word)}
+        return intents.pop() if len(intents) == 1 else None
+
+
+# Singleton instance
+intent_router = IntentRouter()
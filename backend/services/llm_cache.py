@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models.llm_cache import LLMCacheEntry
+from services.ai_providers import AIProvider, LLMRequest
+from metrics import LLM_CACHE_LOOKUPS
+
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Content-addressed cache of LLM responses: an in-process LRU in front of
+    the TTL-indexed `llm_cache` collection, which all replicas share and
+    which survives restarts. Entries are keyed by a hash of the provider,
+    model, method, prompt settings and normalized input, so "OK" and " ok "
+    share an answer, and a different model never reuses another's answers.
+
+    MongoDB is only a best effort: a slow or failed lookup counts as a miss
+    and writes happen in the background, so the cache never makes a call
+    slower than going to the provider.
+    """
+
+    # Bump when prompts change, so answers to the old prompts stop matching
+    PROMPT_VERSION = 1
+
+    def __init__(self):
+        self.ttl = float(os.getenv("AI_CACHE_TTL_SECONDS", "604800"))  # 0 disables the cache
+        self.memory_entries = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "5000"))
+        self.lookup_timeout = float(os.getenv("AI_CACHE_LOOKUP_TIMEOUT_MS", "50")) / 1000
+        methods = os.getenv("AI_CACHE_METHODS", "classify_sentiment,extract_feedback_rating,personalize_message")
+        self.methods = {method.strip() for method in methods.split(",") if method.strip()}
+
+        # key -> (expires at, monotonic clock; response), least recently used first
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._writes: set = set()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def enabled_for(self, method: str) -> bool:
+        return self.ttl > 0 and method in self.methods
+
+    @staticmethod
+    def normalize(value):
+        """Collapse whitespace and case, so trivially different inputs share an entry"""
+        if isinstance(value, str):
+            return " ".join(value.split()).casefold()
+        if isinstance(value, (list, tuple)):
+            return [LLMCache.normalize(item) for item in value]
+        return value
+
+    def key(self, provider: AIProvider, request: LLMRequest) -> str:
+        material = {
+            "version": self.PROMPT_VERSION,
+            "provider": provider.name,
+            "model": provider.model,
+            "method": request.method,
+            "system": request.system,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+            "input": {name: self.normalize(value) for name, value in request.context.items()},
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+    def _count(self, method: str, result: str) -> None:
+        LLM_CACHE_LOOKUPS.labels(method, result).inc()
+        counts = self._stats.setdefault(method, {"memory_hits": 0, "shared_hits": 0, "misses": 0})
+        counts[result if result == "misses" else f"{result}_hits"] += 1
+
+    def _remember(self, key: str, response: str, ttl: float) -> None:
+        self._memory[key] = (time.monotonic() + ttl, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, keys: List[str], method: str) -> Optional[str]:
+        """First cached response among `keys` (in order of preference), or None"""
+        now = time.monotonic()
+        for key in keys:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._count(method, "memory")
+                    return entry[1]
+                del self._memory[key]
+
+        try:
+            cursor = LLMCacheEntry.get_motor_collection().find(
+                {"_id": {"$in": keys}, "expires_at": {"$gt": datetime.utcnow()}},
+                {"response": 1, "expires_at": 1}
+            )
+            docs = await asyncio.wait_for(cursor.to_list(len(keys)), timeout=self.lookup_timeout)
+        except Exception as e:
+            logger.debug("LLM cache lookup skipped: %s", str(e) or type(e).__name__)
+            docs = []
+
+        found = {doc["_id"]: doc for doc in docs}
+        for key in keys:
+            if key in found:
+                doc = found[key]
+                self._remember(key, doc["response"], (doc["expires_at"] - datetime.utcnow()).total_seconds())
+                self._count(method, "shared")
+                return doc["response"]
+
+        self._count(method, "misses")
+        return None
+
+    def put(self, key: str, provider: AIProvider, request: LLMRequest, response: str) -> None:
+        """Cache a response here at once, and in MongoDB in the background"""
+        self._remember(key, response, self.ttl)
+        now = datetime.utcnow()
+        try:
+            write = LLMCacheEntry.get_motor_collection().update_one(
+                {"_id": key},
+                {"$set": {
+                    "provider": provider.name,
+                    "model": provider.model,
+                    "method": request.method,
+                    "response": response,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            # No database in this process (scripts, benchmarks): in-process cache only
+            logger.debug("LLM cache write skipped: %s", str(e) or type(e).__name__)
+            return
+        task = asyncio.ensure_future(write)
+        self._writes.add(task)
+        task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: asyncio.Task) -> None:
+        self._writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("LLM cache write failed: %s", str(task.exception()))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Lookup counts and hit rate per method since startup"""
+        report = {}
+        for method, counts in self._stats.items():
+            total = sum(counts.values())
+            hits = counts["memory_hits"] + counts["shared_hits"]
+            report[method] = {**counts, "hit_rate": round(hits / total, 3) if total else 0.0}
+        return report
+
+
+# Singleton instance
+llm_cache = LLMCache()
@@ -0,0 +1,139 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+
+from models.message_log import MessageLog
+from metrics import MESSAGE_LOG_WRITES, register_queue
+
+
+logger = logging.getLogger(__name__)
+
+
+def _write_concern(value: str) -> WriteConcern:
+    """MESSAGE_LOG_WRITE_CONCERN: "majority", or a number of members ("1"; "0" = unacknowledged)"""
+    return WriteConcern(w=int(value) if value.isdigit() else value)
+
+
+class MessageLogWriter:
+    """
+    Buffers MessageLog inserts and writes them with unordered insert_many,
+    when MESSAGE_LOG_BATCH_SIZE records are waiting or every
+    MESSAGE_LOG_FLUSH_MS, whichever comes first. A reminder sweep over
+    thousands of orders then costs a handful of round-trips instead of one
+    per message.
+
+    The buffer is bounded (MESSAGE_LOG_BUFFER_SIZE): when MongoDB can't keep
+    up, writers wait for room rather than memory growing. Failed batches are
+    retried on the next flush, and stop() flushes whatever is left.
+
+    When the writer isn't running (serverless mode, scripts) records are
+    inserted inline by write().
+    """
+
+    def __init__(self):
+        self.batch_size = max(1, int(os.getenv("MESSAGE_LOG_BATCH_SIZE", "500")))
+        self.flush_interval = float(os.getenv("MESSAGE_LOG_FLUSH_MS", "200")) / 1000
+        self.max_buffer = max(self.batch_size, int(os.getenv("MESSAGE_LOG_BUFFER_SIZE", "20000")))
+        # Logs can tolerate a weaker guarantee than orders; "majority" restores the strict default
+        self.write_concern = _write_concern(os.getenv("MESSAGE_LOG_WRITE_CONCERN", "1"))
+
+        self._buffer: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._room: Optional[asyncio.Event] = None
+        register_queue("message_log", lambda: len(self._buffer))
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Message log writer started (batches of %d, every %d ms)", self.batch_size, self.flush_interval * 1000)
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write out everything still buffered"""
+        if not self.running:
+            return
+        # Not cancelled: that could abandon a batch mid-insert
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        await self._flush()
+        if self._buffer:
+            logger.error("Message log writer stopped with %d records unwritten", len(self._buffer))
+
+    async def write(self, log: MessageLog) -> MessageLog:
+        """Queue a log record (its id is assigned right away) and return it"""
+        if not self.running:
+            await log.insert()
+            return log
+
+        while len(self._buffer) >= self.max_buffer:
+            # Backpressure: wait for a flush to make room
+            self._room.clear()
+            self._wakeup.set()
+            await self._room.wait()
+
+        if log.id is None:
+            log.id = PydanticObjectId()
+        self._buffer.append(get_dict(log, to_db=True, keep_nulls=log.get_settings().keep_nulls))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return log
+
+    async def flush(self) -> None:
+        """Write out everything buffered so far (no-op when not running)"""
+        if self.running:
+            await self._flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        collection = MessageLog.get_motor_collection().with_options(write_concern=self.write_concern)
+        while self._buffer:
+            batch = self._buffer[:self.batch_size]
+            del self._buffer[:self.batch_size]
+            try:
+                await collection.insert_many(batch, ordered=False)
+                MESSAGE_LOG_WRITES.labels("written").inc(len(batch))
+            except BulkWriteError as e:
+                # Unordered: everything but the failed documents was written; those aren't retryable
+                failed = len(e.details.get("writeErrors", []))
+                MESSAGE_LOG_WRITES.labels("written").inc(len(batch) - failed)
+                MESSAGE_LOG_WRITES.labels("dropped").inc(failed)
+                logger.error("Message log batch: %d of %d records rejected", failed, len(batch))
+            except Exception as e:
+                # MongoDB unreachable: put the batch back and try again on the next flush
+                self._buffer[:0] = batch
+                MESSAGE_LOG_WRITES.labels("retried").inc(len(batch))
+                logger.warning("Message log batch of %d failed, will retry: %s", len(batch), str(e))
+                break
+            finally:
+                if self._room is not None and len(self._buffer) < self.max_buffer:
+                    self._room.set()
+
+
+# Singleton instance
+message_log_writer = MessageLogWriter()
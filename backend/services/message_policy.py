@@ -1,14 +1,27 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from beanie import PydanticObjectId
+from bson import DBRef
 
 from models.order import Order, OrderStatus, PaymentStatus, Sentiment
-from models.message_log import MessageLog, MessageType
+from models.message_log import MessageLog, MessageType, DeliveryStatus
 from models.alert import Alert, AlertReason
 from services.ai_service import ai_service
+from services.sentiment_batcher import sentiment_batcher
 from services.whatsapp_service import whatsapp_service
+from services.message_log_writer import message_log_writer
 from services.tracking_service import tracking_service
+from services.intent_router import Intent, intent_router
+from metrics import REPLY_PROCESSING_LATENCY, SCHEDULER_ITEMS_PROCESSED, track_job
 import os
+import time
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Orders checked per page by the no-response sweep
+NO_RESPONSE_BATCH_SIZE = int(os.getenv("NO_RESPONSE_CHECK_BATCH_SIZE", "500"))
 
 
 class MessagePolicyService:
@@ -25,7 +38,7 @@ class MessagePolicyService:
                 user = order.user_id
             
             # Generate personalized message using AI
-            message = ai_service.personalize_message(
+            message = await ai_service.personalize_message(
                 customer_name=user.name,
                 order_status="CREATED",
                 product_name=order.product_name
@@ -52,20 +65,20 @@ class MessagePolicyService:
             
             if msg_sid:
                 # Log the message
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.ORDER_CONFIRMATION,
                     message_content=f"[Template: {template_sid}]" if template_sid else message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
+                ))
                 
                 return True
             
             return False
             
         except Exception as e:
-            print(f"Error sending order confirmation: {str(e)}")
+            logger.error("Error sending order confirmation: %s", str(e))
             return False
 
     async def send_payment_confirmation(self, order: Order) -> bool:
@@ -75,7 +88,7 @@ class MessagePolicyService:
             else:
                 user = order.user_id
             
-            message = ai_service.personalize_message(
+            message = await ai_service.personalize_message(
                 customer_name=user.name,
                 order_status="PAID",
                 product_name=order.product_name
@@ -86,20 +99,20 @@ class MessagePolicyService:
             msg_sid = await whatsapp_service.send_message(user.whatsapp_number, message)
             
             if msg_sid:
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.PAYMENT_CONFIRMATION,
                     message_content=message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
+                ))
                 
                 return True
             
             return False
             
         except Exception as e:
-            print(f"Error sending payment confirmation: {str(e)}")
+            logger.error("Error sending payment confirmation: %s", str(e))
             return False
     
     async def send_payment_reminder(self, order: Order, reminder_number: int) -> bool:
@@ -116,7 +129,7 @@ class MessagePolicyService:
             
             # Generate reminder message
             if reminder_number == 1:
-                message = ai_service.personalize_message(
+                message = await ai_service.personalize_message(
                     customer_name=user.name,
                     order_status="PAYMENT_PENDING",
                     product_name=order.product_name
@@ -136,13 +149,13 @@ class MessagePolicyService:
             msg_sid = await whatsapp_service.send_message(user.whatsapp_number, message)
             
             if msg_sid:
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=msg_type,
                     message_content=message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
+                ))
                 
                 await order.save()
                 return True
@@ -150,7 +163,7 @@ class MessagePolicyService:
             return False
             
         except Exception as e:
-            print(f"Error sending payment reminder: {str(e)}")
+            logger.error("Error sending payment reminder: %s", str(e))
             return False
     
     async def send_shipping_notification(self, order: Order) -> bool:
@@ -160,7 +173,7 @@ class MessagePolicyService:
             else:
                 user = order.user_id
             
-            message = ai_service.personalize_message(
+            message = await ai_service.personalize_message(
                 customer_name=user.name,
                 order_status="SHIPPED",
                 product_name=order.product_name
@@ -175,22 +188,20 @@ class MessagePolicyService:
             msg_sid = await whatsapp_service.send_message(user.whatsapp_number, message)
             
             if msg_sid:
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.SHIPPING_NOTIFICATION,
                     message_content=message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
-                
-                order.shipped_at = datetime.utcnow()
-                await order.save()
+                ))
+                # shipped_at is set by the status transition, not here: saving this (stale) order could undo a later one
                 return True
             
             return False
             
         except Exception as e:
-            print(f"Error sending shipping notification: {str(e)}")
+            logger.error("Error sending shipping notification: %s", str(e))
             return False
     
     async def send_delivery_notification(self, order: Order) -> bool:
@@ -200,7 +211,7 @@ class MessagePolicyService:
             else:
                 user = order.user_id
             
-            message = ai_service.personalize_message(
+            message = await ai_service.personalize_message(
                 customer_name=user.name,
                 order_status="DELIVERED",
                 product_name=order.product_name
@@ -228,22 +239,20 @@ class MessagePolicyService:
                  msg_sid = await whatsapp_service.send_message(user.whatsapp_number, message)
             
             if msg_sid:
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.DELIVERY_NOTIFICATION,
                     message_content=f"[Template: {template_sid}]" if template_sid else message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
-                
-                order.delivered_at = datetime.utcnow()
-                await order.save()
+                ))
+                # delivered_at is set by the status transition, not here
                 return True
             
             return False
             
         except Exception as e:
-            print(f"Error sending delivery notification: {str(e)}")
+            logger.error("Error sending delivery notification: %s", str(e))
             return False
     
     async def send_in_process_notification(self, order: Order) -> bool:
@@ -254,7 +263,7 @@ class MessagePolicyService:
             else:
                 user = order.user_id
             
-            message = ai_service.personalize_message(
+            message = await ai_service.personalize_message(
                 customer_name=user.name,
                 order_status="IN_PROCESS",
                 product_name=order.product_name
@@ -265,19 +274,19 @@ class MessagePolicyService:
             msg_sid = await whatsapp_service.send_message(user.whatsapp_number, message)
             
             if msg_sid:
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.IN_PROCESS_NOTIFICATION,
                     message_content=message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
+                ))
                 return True
             
             return False
             
         except Exception as e:
-            print(f"Error sending in-process notification: {str(e)}")
+            logger.error("Error sending in-process notification: %s", str(e))
             return False
 
     async def send_out_for_delivery_notification(self, order: Order) -> bool:
@@ -288,7 +297,7 @@ class MessagePolicyService:
             else:
                 user = order.user_id
             
-            message = ai_service.personalize_message(
+            message = await ai_service.personalize_message(
                 customer_name=user.name,
                 order_status="OUT_FOR_DELIVERY",
                 product_name=order.product_name
@@ -299,83 +308,95 @@ class MessagePolicyService:
             msg_sid = await whatsapp_service.send_message(user.whatsapp_number, message)
             
             if msg_sid:
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.OUT_FOR_DELIVERY_NOTIFICATION,
                     message_content=message,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
+                ))
                 return True
             
             return False
             
         except Exception as e:
-            print(f"Error sending out-for-delivery notification: {str(e)}")
+            logger.error("Error sending out-for-delivery notification: %s", str(e))
             return False
 
-    async def process_customer_reply(self, order_id: PydanticObjectId, reply_text: str) -> None:
+    async def process_customer_reply(self, order_id: PydanticObjectId, reply_text: str, payload: Optional[str] = None) -> None:
+        """
+        Handle an inbound reply. `payload` is the ButtonPayload / ListId of an
+        interactive message reply, if any.
+        """
+        start = time.perf_counter()
+        intent = await self._process_customer_reply(order_id, reply_text, payload)
+        REPLY_PROCESSING_LATENCY.labels(intent).observe(time.perf_counter() - start)
+
+    async def _process_customer_reply(self, order_id: PydanticObjectId, reply_text: str, payload: Optional[str] = None) -> str:
+        """Handle a reply and return the intent it resolved to (used as a metrics label)"""
         try:
             order = await Order.get(order_id)
             if not order:
-                print(f"⚠️ process_customer_reply: Order {order_id} not found")
-                return
+                logger.warning("process_customer_reply: Order %s not found", order_id)
+                return "unknown_order"
                 
-            print(f"DEBUG: Processing reply for order {order.id}: '{reply_text}'")
-            clean_reply = reply_text.strip().lower()
+            logger.debug("Processing reply for order %s (%d chars)", order.id, len(reply_text))
+            match = intent_router.route(reply_text, payload)
             
             # 1. Check for Commands
-            if clean_reply in ["1", "status", "check status", "track"]:
+            if match.intent == Intent.STATUS:
                 await self._handle_status_check(order)
-                return
+                return "status"
                 
-            if clean_reply in ["2", "cancel", "cancel order", "cancel_order"]:
+            if match.intent == Intent.CANCEL:
                 await self._handle_cancel_request(order)
-                return
+                return "cancel"
                 
-            if clean_reply == "3":
+            if match.intent == Intent.FEEDBACK_PROMPT:
                 # Prompt for detailed feedback (just acknowledgement for now)
                 await self._send_reply(order, "Please type your feedback or experience with us!")
-                return
+                return "feedback_prompt"
 
             # 2. Handle Feedback for DELIVERED orders
             if order.status == OrderStatus.DELIVERED:
-                # Extract rating (1-5) using AI
-                rating = ai_service.extract_feedback_rating(reply_text)
+                # Extract rating (1-5), using AI unless the reply states it explicitly
+                rating = match.rating
+                if rating is None:
+                    rating = await ai_service.extract_feedback_rating(reply_text)
                 order.feedback_rating = rating
                 order.feedback_text = reply_text
                 
                 # Classify sentiment as usual
-                sentiment = ai_service.classify_sentiment(reply_text)
+                sentiment = match.sentiment or await sentiment_batcher.classify(reply_text)
                 order.sentiment = sentiment
                 
                 await order.save()
                 
                 # Log the feedback message
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.CUSTOMER_REPLY,
                     message_content=reply_text,
                     is_incoming=True,
                     sentiment=sentiment
-                ).insert()
+                ))
                 
                 # Send thank you
                 await self._send_reply(order, "Thank you so much for your feedback! It helps us improve.")
-                return
+                return "feedback"
 
             # 3. Normal AI Processing & Feedback Logging
-            # Classify sentiment using AI
-            sentiment = ai_service.classify_sentiment(reply_text)
+            # Classify sentiment using AI (skipped for bare ratings and emoji)
+            sentiment = match.sentiment or await sentiment_batcher.classify(reply_text)
             
             # Log the incoming message
-            await MessageLog(
+            await message_log_writer.write(MessageLog(
                 order_id=order,
                 message_type=MessageType.CUSTOMER_REPLY,
                 message_content=reply_text,
                 is_incoming=True,
                 sentiment=sentiment
-            ).insert()
+            ))
             
             # Update order
             order.last_customer_reply_at = datetime.utcnow()
@@ -391,12 +412,14 @@ class MessagePolicyService:
                     description=f"Customer expressed negative sentiment: '{reply_text[:100]}...'"
                 ).insert()
                 
-                print(f"Negative sentiment detected for order {order.id}. Automation stopped.")
+                logger.info("Negative sentiment detected for order %s. Automation stopped.", order.id)
             
             await order.save()
+            return "free_text"
             
         except Exception as e:
-            print(f"Error processing customer reply: {str(e)}")
+            logger.error("Error processing customer reply: %s", str(e))
+            return "error"
 
     async def _handle_status_check(self, order: Order):
         """Handle '1' - Status Check"""
@@ -406,7 +429,7 @@ class MessagePolicyService:
         
         # Add Tracking Info if available
         if order.tracking_id:
-            tracking_info = tracking_service.get_tracking_info(order.tracking_id, order.carrier)
+            tracking_info = await tracking_service.get_tracking_info(order.tracking_id, order.carrier)
             if tracking_info:
                 status_msg += f"\n🚚 *Tracking Update*:\nStatus: {tracking_info.get('status')}\nLocation: {tracking_info.get('location')}\nETA: {tracking_info.get('eta')}\n"
         
@@ -431,7 +454,7 @@ class MessagePolicyService:
                 description=f"Customer requested cancellation via WhatsApp (Current status: {order.status})"
             ).insert()
             
-            print(f"Cancellation request alert created for order {order.id}")
+            logger.info("Cancellation request alert created for order %s", order.id)
         else:
             await self._send_reply(order, f"Sorry, your order cannot be cancelled as it is already {order.status}. Please contact support.")
 
@@ -446,50 +469,87 @@ class MessagePolicyService:
             msg_sid = await whatsapp_service.send_message(user.whatsapp_number, text)
             if msg_sid:
                 # Log as outgoing message
-                await MessageLog(
+                await message_log_writer.write(MessageLog(
                     order_id=order,
                     message_type=MessageType.CUSTOMER_REPLY, # Using this type for now as 'system reply'
                     message_content=text,
                     whatsapp_message_id=msg_sid,
                     is_incoming=False
-                ).insert()
+                ))
         except Exception as e:
-            print(f"Error sending reply: {str(e)}")
+            logger.error("Error sending reply: %s", str(e))
     
+    @track_job("no_response_check")
     async def check_no_response_alerts(self) -> None:
-        """Check for orders with no customer response in 48 hours (scheduled job)"""
+        """Check for orders with no customer response in 48 hours (scheduled job), a page at a time"""
+        checked = 0
+        last_id = None
+        
         try:
             cutoff_time = datetime.utcnow() - timedelta(hours=48)
-            
-            # Find orders with messages sent but no recent customer reply
-            orders = await Order.find(
-                Order.automation_enabled == True,
-                Order.created_at < cutoff_time,
-                Order.last_customer_reply_at == None
-            ).to_list()
-            
-            for order in orders:
-                # Check if we've sent at least one message
-                msg_count = await MessageLog.find(
-                    MessageLog.order_id.ref.id == order.id,
-                    MessageLog.is_incoming == False
-                ).count()
+            orders_collection = Order.get_motor_collection()
+            
+            while True:
+                # Orders with no customer reply yet
+                query = {
+                    "automation_enabled": True,
+                    "created_at": {"$lt": cutoff_time},
+                    "last_customer_reply_at": None,
+                }
+                if last_id is not None:
+                    query["_id"] = {"$gt": last_id}
+                cursor = orders_collection.find(query, {"_id": 1})
+                page = await cursor.sort("_id", 1).limit(NO_RESPONSE_BATCH_SIZE).to_list(None)
+                if not page:
+                    break
+                last_id = page[-1]["_id"]
+                checked += len(page)
+                
+                # Delivery states of the messages we sent, per order, in one query per page
+                order_ids = [order["_id"] for order in page]
+                cursor = MessageLog.get_motor_collection().aggregate([
+                    {"$match": {"order_id.$id": {"$in": order_ids}, "is_incoming": False}},
+                    # null for logs without a receipt (older logs, no status callback): unknown, not failed
+                    {"$group": {"_id": "$order_id.$id", "statuses": {"$push": {"$ifNull": ["$delivery_status", None]}}}},
+                ])
+                sent = {doc["_id"]: doc["statuses"] async for doc in cursor}
                 
-                if msg_count > 0:
-                    # Create alert and stop automation
-                    order.automation_enabled = False
-                    await order.save()
+                for order_id in order_ids:
+                    statuses = sent.get(order_id)
+                    # Only orders we've sent at least one message to
+                    if not statuses:
+                        continue
+                    
+                    if all(status == DeliveryStatus.FAILED.value for status in statuses):
+                        description = "No customer response for 48 hours: none of our messages were delivered"
+                    elif DeliveryStatus.READ.value in statuses:
+                        description = "No customer response for 48 hours: messages were read but not answered"
+                    else:
+                        description = "No customer response for 48 hours"
+                    
+                    # Stop automation; only alert if it was still on (another run or an admin may have beaten us)
+                    result = await orders_collection.update_one(
+                        {"_id": order_id, "automation_enabled": True},
+                        {"$set": {"automation_enabled": False}}
+                    )
+                    if not result.modified_count:
+                        continue
                     
                     await Alert(
-                        order_id=order,
+                        order_id=DBRef(Order.get_collection_name(), order_id),
                         reason=AlertReason.NO_CUSTOMER_RESPONSE,
-                        description=f"No customer response for 48 hours"
+                        description=description
                     ).insert()
                     
-                    print(f"No response alert created for order {order.id}")
+                    logger.debug("No response alert created for order %s", order_id)
+                
+                if len(page) < NO_RESPONSE_BATCH_SIZE:
+                    break
+            
+            SCHEDULER_ITEMS_PROCESSED.labels("no_response_check").inc(checked)
             
         except Exception as e:
-            print(f"Error checking no-response alerts: {str(e)}")
+            logger.error("Error checking no-response alerts: %s", str(e))
 
 
 # Singleton instance
@@ -0,0 +1,108 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from models.order import Order
+from logging_config import correlation_id, new_correlation_id
+from metrics import register_queue
+
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """
+    Bounded in-process queue of customer notifications, drained by a few
+    worker tasks. Order confirmations and bulk status changes (carrier
+    webhooks, admin bulk actions) enqueue here instead of sending inline, so
+    the request that triggered them returns as soon as the database is updated.
+
+    When the workers aren't running (serverless mode, scripts) notifications
+    are sent inline by enqueue().
+    """
+
+    # Notification kind -> MessagePolicyService method
+    HANDLERS = {
+        "order_confirmation": "send_order_confirmation",
+        "in_process": "send_in_process_notification",
+        "shipped": "send_shipping_notification",
+        "out_for_delivery": "send_out_for_delivery_notification",
+        "delivered": "send_delivery_notification",
+    }
+
+    def __init__(self):
+        self.max_size = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "10000"))
+        self.worker_count = int(os.getenv("NOTIFICATION_WORKERS", "4"))
+        self.drain_timeout = float(os.getenv("NOTIFICATION_DRAIN_SECONDS", "10"))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        register_queue("notifications", lambda: self._queue.qsize() if self._queue else 0)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        logger.info("Notification queue started with %d workers", self.worker_count)
+
+    async def stop(self) -> None:
+        """Let queued notifications drain for up to NOTIFICATION_DRAIN_SECONDS, then stop the workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Notification queue stopped with %d notifications unsent", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(self, kind: str, order_id: PydanticObjectId) -> None:
+        if kind not in self.HANDLERS:
+            raise ValueError(f"Unknown notification kind: {kind}")
+        job = (kind, order_id, correlation_id.get())
+        if not self.running:
+            await self._deliver(job)
+            return
+        # Blocks when full: backpressure on the producer rather than unbounded memory
+        await self._queue.put(job)
+
+    async def enqueue_many(self, kind: str, order_ids: List[PydanticObjectId]) -> None:
+        for order_id in order_ids:
+            await self.enqueue(kind, order_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: Tuple[str, PydanticObjectId, Optional[str]]) -> None:
+        # Imported here: message_policy pulls in the AI and WhatsApp services
+        from services.message_policy import message_policy
+
+        kind, order_id, request_id = job
+        new_correlation_id(request_id)
+        try:
+            order = await Order.get(order_id)
+            if order is None:
+                logger.warning("Notification %s skipped: order %s not found", kind, order_id)
+                return
+            await getattr(message_policy, self.HANDLERS[kind])(order)
+        except Exception as e:
+            logger.error("Error sending %s notification for order %s: %s", kind, order_id, str(e))
+
+
+# Singleton instance
+notification_queue = NotificationQueue()
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+
+from models.order import Order, OrderStatus
+
+
+# Statuses an order may move to a given status from
+ALLOWED_FROM: Dict[OrderStatus, List[OrderStatus]] = {
+    OrderStatus.PAID: [OrderStatus.CREATED, OrderStatus.PAYMENT_PENDING],
+    OrderStatus.IN_PROCESS: [OrderStatus.PAID],
+    OrderStatus.SHIPPED: [OrderStatus.PAID, OrderStatus.IN_PROCESS],
+    OrderStatus.OUT_FOR_DELIVERY: [OrderStatus.SHIPPED],
+    OrderStatus.DELIVERED: [OrderStatus.SHIPPED, OrderStatus.OUT_FOR_DELIVERY],
+    OrderStatus.CANCELLED: [OrderStatus.CREATED, OrderStatus.PAYMENT_PENDING, OrderStatus.PAID, OrderStatus.IN_PROCESS],
+}
+
+# Customer notification (NotificationQueue kind) sent after moving to a status
+STATUS_NOTIFICATIONS: Dict[OrderStatus, str] = {
+    OrderStatus.IN_PROCESS: "in_process",
+    OrderStatus.SHIPPED: "shipped",
+    OrderStatus.OUT_FOR_DELIVERY: "out_for_delivery",
+    OrderStatus.DELIVERED: "delivered",
+}
+
+
+# Timestamp fields set when an order reaches a status
+STATUS_TIMESTAMPS: Dict[OrderStatus, str] = {
+    OrderStatus.SHIPPED: "shipped_at",
+    OrderStatus.DELIVERED: "delivered_at",
+}
+
+
+async def bulk_transition(
+    query: dict,
+    target: OrderStatus,
+    from_statuses: Optional[Iterable[OrderStatus]] = None,
+    extra_set: Optional[dict] = None
+) -> List[PydanticObjectId]:
+    """
+    Move every order matching `query` that is in an allowed from-status to
+    `target` with a single update_many, and return the IDs that actually moved.
+
+    Each call stamps the orders it changes with a fresh last_transition_id,
+    so the follow-up read returns exactly this call's changes even when
+    other writers touch the same orders concurrently. Orders already moved
+    by someone else fail the status guard and are not returned, so nothing
+    gets notified twice.
+    """
+    if from_statuses is None:
+        from_statuses = ALLOWED_FROM.get(target, [])
+    from_values = [OrderStatus(status).value for status in from_statuses]
+    if not from_values:
+        return []
+
+    updates = {"status": target.value}
+    if target in STATUS_TIMESTAMPS:
+        updates[STATUS_TIMESTAMPS[target]] = datetime.utcnow()
+    updates.update(extra_set or {})
+
+    transition_id = ObjectId()
+    collection = Order.get_motor_collection()
+    await collection.update_many(
+        {"$and": [query, {"status": {"$in": from_values}}]},
+        {"$set": {**updates, "last_transition_id": transition_id}}
+    )
+
+    cursor = collection.find({"last_transition_id": transition_id}, {"_id": 1})
+    return [doc["_id"] async for doc in cursor]
@@ -0,0 +1,107 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from models.message_log import MessageLog
+from models.alert import Alert
+from metrics import SCHEDULER_ITEMS_PROCESSED, track_job
+
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService:
+    """
+    Moves expired message logs and resolved alerts out of the hot collections
+    into zstd-compressed archive collections, so `message_logs` and `alerts`
+    (and their indexes) stay small enough to live in RAM.
+    """
+
+    ARCHIVE_SUFFIX = "_archive"
+
+    def __init__(self):
+        # 0 disables archival for that collection
+        self.message_log_retention_days = int(os.getenv("MESSAGE_LOG_RETENTION_DAYS", "90"))
+        self.alert_retention_days = int(os.getenv("RESOLVED_ALERT_RETENTION_DAYS", "30"))
+        self.batch_size = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+        self.compressor = os.getenv("RETENTION_ARCHIVE_COMPRESSOR", "zstd")
+
+    @track_job("retention_archive")
+    async def archive_expired(self) -> Dict[str, int]:
+        """Archive everything past its retention window (scheduled job)"""
+        archived = {"message_logs": 0, "alerts": 0}
+
+        try:
+            if self.message_log_retention_days > 0:
+                cutoff = datetime.utcnow() - timedelta(days=self.message_log_retention_days)
+                archived["message_logs"] = await self._archive(
+                    MessageLog.get_motor_collection(),
+                    {"sent_at": {"$lt": cutoff}}
+                )
+
+            if self.alert_retention_days > 0:
+                cutoff = datetime.utcnow() - timedelta(days=self.alert_retention_days)
+                archived["alerts"] = await self._archive(
+                    Alert.get_motor_collection(),
+                    {"resolved": True, "resolved_at": {"$lt": cutoff}}
+                )
+
+            SCHEDULER_ITEMS_PROCESSED.labels("retention_archive").inc(sum(archived.values()))
+            if any(archived.values()):
+                logger.info("Archived %d message logs and %d resolved alerts", archived["message_logs"], archived["alerts"])
+
+        except Exception as e:
+            logger.error("Error archiving expired records: %s", str(e))
+
+        return archived
+
+    async def _archive(self, collection, query: dict) -> int:
+        """Copy matching documents to the archive collection in batches, then delete them"""
+        archive = await self._get_archive_collection(collection)
+        total = 0
+
+        while True:
+            batch = await collection.find(query).limit(self.batch_size).to_list(length=self.batch_size)
+            if not batch:
+                break
+
+            archived_at = datetime.utcnow()
+            for doc in batch:
+                doc["archived_at"] = archived_at
+
+            try:
+                await archive.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # Duplicates are left over from an interrupted earlier run; anything else is fatal
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+
+            result = await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+            total += result.deleted_count
+
+            if len(batch) < self.batch_size:
+                break
+
+        return total
+
+    async def _get_archive_collection(self, collection):
+        """Get the archive collection, creating it with block compression on first use"""
+        database = collection.database
+        name = f"{collection.name}{self.ARCHIVE_SUFFIX}"
+
+        try:
+            await database.create_collection(
+                name,
+                storageEngine={"wiredTiger": {"configString": f"block_compressor={self.compressor}"}}
+            )
+        except CollectionInvalid:
+            pass  # Already exists
+
+        return database[name]
+
+
+# Singleton instance
+retention_service = RetentionService()
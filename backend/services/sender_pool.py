@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metrics import TWILIO_SENDER_MESSAGES
+
+
+logger = logging.getLogger(__name__)
+
+
+class SenderPool:
+    """
+    Outbound WhatsApp sender numbers, so throughput isn't capped by one
+    number's rate limit.
+
+    Each customer sticks to one sender (rendezvous hashing on the customer
+    number, so adding or removing a sender only moves the customers that
+    sender gains or loses), which keeps their conversation in one thread.
+    Sends are paced per sender with a token bucket of
+    TWILIO_SENDER_RATE_PER_SECOND; when a customer's sender is out of
+    tokens or was throttled by Twilio (429), the send spills over to the
+    customer's next-ranked sender. When every sender is busy, acquire()
+    waits for the first one to free up.
+
+    Not locked: all callers run on the event loop.
+    """
+
+    def __init__(self, senders: List[str], rate_per_second: float = 0.0, throttle_seconds: float = 1.0):
+        if not senders:
+            raise ValueError("Sender pool needs at least one number")
+        self.senders = senders
+        self.rate = rate_per_second
+        # Up to a second's worth of sends can go out back to back
+        self.burst = max(1.0, rate_per_second)
+        self.throttle_seconds = throttle_seconds
+
+        now = time.monotonic()
+        self._tokens: Dict[str, float] = {sender: self.burst for sender in senders}
+        self._updated: Dict[str, float] = {sender: now for sender in senders}
+        self._throttled_until: Dict[str, float] = {sender: 0.0 for sender in senders}
+
+    @classmethod
+    def from_env(cls) -> "SenderPool":
+        """TWILIO_WHATSAPP_NUMBERS (comma-separated), falling back to TWILIO_WHATSAPP_NUMBER"""
+        numbers = os.getenv("TWILIO_WHATSAPP_NUMBERS") or os.getenv("TWILIO_WHATSAPP_NUMBER") or ""
+        senders = []
+        for number in numbers.split(","):
+            number = number.strip()
+            if number and not number.startswith("whatsapp:"):
+                number = f"whatsapp:{number}"
+            if number and number not in senders:
+                senders.append(number)
+        return cls(
+            senders,
+            rate_per_second=float(os.getenv("TWILIO_SENDER_RATE_PER_SECOND", "0")),
+            throttle_seconds=float(os.getenv("TWILIO_SENDER_THROTTLE_SECONDS", "1"))
+        )
+
+    def ranked(self, to_number: str) -> List[str]:
+        """Senders in this customer's order of preference; the first is their sticky sender"""
+        if len(self.senders) == 1:
+            return self.senders
+        return sorted(
+            self.senders,
+            key=lambda sender: hashlib.sha1(f"{sender}|{to_number}".encode()).digest(),
+            reverse=True
+        )
+
+    def _ready_at(self, sender: str, now: float) -> float:
+        """Monotonic time at which `sender` may send next (<= now: right away)"""
+        if self.rate > 0:
+            self._tokens[sender] = min(self.burst, self._tokens[sender] + (now - self._updated[sender]) * self.rate)
+            self._updated[sender] = now
+            token_at = now if self._tokens[sender] >= 1 else now + (1 - self._tokens[sender]) / self.rate
+        else:
+            token_at = now
+        return max(token_at, self._throttled_until[sender])
+
+    def _pick(self, to_number: str, exclude: Iterable[str]) -> Tuple[Optional[str], Optional[float]]:
+        """(sender, None) if one is free now, else (None, seconds until the first frees up; None if all excluded)"""
+        now = time.monotonic()
+        wait = None
+        for rank, sender in enumerate(self.ranked(to_number)):
+            if sender in exclude:
+                continue
+            ready_at = self._ready_at(sender, now)
+            if ready_at <= now:
+                if self.rate > 0:
+                    self._tokens[sender] -= 1
+                TWILIO_SENDER_MESSAGES.labels(sender, "sticky" if rank == 0 else "spillover").inc()
+                return sender, None
+            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return None, wait
+
+    async def acquire(self, to_number: str) -> str:
+        """The sender to use for a message to `to_number`, waiting while every sender is busy"""
+        while True:
+            sender, wait = self._pick(to_number, ())
+            if sender is not None:
+                return sender
+            await asyncio.sleep(wait)
+
+    def spill_over(self, to_number: str, tried: Iterable[str]) -> Optional[str]:
+        """Another sender that is free right now, or None"""
+        sender, _ = self._pick(to_number, set(tried))
+        return sender
+
+    def throttled(self, sender: str, retry_after: Optional[float] = None) -> None:
+        """Twilio rate-limited `sender`: keep sends off it for Retry-After (or TWILIO_SENDER_THROTTLE_SECONDS)"""
+        if sender not in self._throttled_until:
+            return
+        pause = retry_after if retry_after is not None else self.throttle_seconds
+        self._throttled_until[sender] = max(self._throttled_until[sender], time.monotonic() + pause)
+        logger.info("Sender %s throttled by Twilio for %.1fs", sender, pause)
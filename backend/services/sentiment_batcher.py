@@ -0,0 +1,91 @@
+import os
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from services.ai_service import ai_service
+from metrics import LLM_BATCH_SIZE, LLM_BATCH_FALLBACKS, register_queue
+
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentBatcher:
+    """
+    Micro-batches sentiment classification. Replies arriving within
+    SENTIMENT_BATCH_WINDOW_MS of the first one (up to SENTIMENT_BATCH_MAX_SIZE)
+    are classified in a single LLM request, and each caller gets its own
+    result back. A batch whose answer can't be parsed is classified item by
+    item instead.
+
+    Trades up to one window of latency per reply for far fewer LLM requests
+    when replies come in bursts. A window of 0 disables batching.
+    """
+
+    def __init__(self):
+        self.window = float(os.getenv("SENTIMENT_BATCH_WINDOW_MS", "100")) / 1000
+        self.max_size = max(1, int(os.getenv("SENTIMENT_BATCH_MAX_SIZE", "20")))
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set = set()
+        register_queue("sentiment_batch", lambda: len(self._pending))
+
+    async def classify(self, customer_reply: str) -> str:
+        if self.window <= 0:
+            return await ai_service.classify_sentiment(customer_reply)
+        
+        # Common replies ("ok", "thanks") are usually cached; don't make them wait for a batch
+        cached = await ai_service.cached_sentiment(customer_reply)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((customer_reply, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Send everything collected so far as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Keep a reference so the task isn't garbage collected mid-flight
+        task = asyncio.ensure_future(self._classify_batch(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _classify_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        LLM_BATCH_SIZE.labels("classify_sentiment").observe(len(batch))
+        try:
+            # Every text here already missed the cache in classify()
+            if len(batch) == 1:
+                sentiments = [await ai_service.classify_sentiment(texts[0], skip_cache_lookup=True)]
+            else:
+                sentiments = await ai_service.classify_sentiment_batch(texts)
+                if sentiments is None:
+                    LLM_BATCH_FALLBACKS.labels("classify_sentiment").inc()
+                    sentiments = await asyncio.gather(*(
+                        ai_service.classify_sentiment(text, skip_cache_lookup=True) for text in texts
+                    ))
+        except Exception as e:
+            logger.error("Batch sentiment classification failed: %s", str(e))
+            sentiments = ["neutral"] * len(batch)
+
+        for (_, future), sentiment in zip(batch, sentiments):
+            # A caller that gave up (cancelled request) leaves a done future behind
+            if not future.done():
+                future.set_result(sentiment)
+
+
+# Singleton instance
+sentiment_batcher = SentimentBatcher()
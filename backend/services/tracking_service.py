@@ -1,36 +1,225 @@
-import random
-from typing import Dict, Optional
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from models.order import Order, OrderStatus
+from services.tracking_carriers import CARRIERS, CarrierProvider, ShipmentState
+from services.order_transitions import ALLOWED_FROM, STATUS_NOTIFICATIONS, bulk_transition
+from services.notification_queue import notification_queue
+from metrics import TRACKING_LOOKUPS, SCHEDULER_ITEMS_PROCESSED, track_job
+
+
+logger = logging.getLogger(__name__)
+
 
 class TrackingService:
     """
-    Service to fetch order tracking status from external providers.
-    Currently implements a MOCK provider for demonstration.
+    Service to fetch order tracking status from external carriers.
+
+    Lookups go through a per-tracking-ID TTL cache, and concurrent lookups of
+    the same shipment share a single upstream call. Orders are routed to the
+    carrier named in Order.carrier, or to TRACKING_DEFAULT_CARRIER (the
+    deterministic mock unless configured otherwise).
     """
-    
-    def get_tracking_info(self, tracking_id: str, carrier: Optional[str] = None) -> Dict[str, str]:
+
+    # Order status each shipment state moves an order to
+    STATE_TARGETS = {
+        ShipmentState.OUT_FOR_DELIVERY: OrderStatus.OUT_FOR_DELIVERY,
+        ShipmentState.DELIVERED: OrderStatus.DELIVERED,
+    }
+
+    def __init__(self):
+        self.default_carrier = os.getenv("TRACKING_DEFAULT_CARRIER", "mock").lower()
+        self.cache_ttl = float(os.getenv("TRACKING_CACHE_TTL_SECONDS", "300"))
+        self.cache_max_entries = int(os.getenv("TRACKING_CACHE_MAX_ENTRIES", "10000"))
+        self.timeout = float(os.getenv("TRACKING_TIMEOUT_SECONDS", "5"))
+        self.poll_batch_size = int(os.getenv("TRACKING_POLL_BATCH_SIZE", "500"))
+
+        self._carriers: Dict[str, CarrierProvider] = {}
+        # (carrier, tracking_id) -> (fetched at, info), least recently used first
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, str]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    def _carrier_for(self, carrier: Optional[str]) -> CarrierProvider:
+        name = (carrier or "").strip().lower()
+        if name not in CARRIERS:
+            name = self.default_carrier
+        if name not in self._carriers:
+            self._carriers[name] = CARRIERS[name]()
+        return self._carriers[name]
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[Dict[str, str]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        fetched_at, info = entry
+        if time.monotonic() - fetched_at > self.cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return info
+
+    def _cache_put(self, key: Tuple[str, str], info: Dict[str, str]) -> None:
+        self._cache[key] = (time.monotonic(), info)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+
+    async def get_tracking_info(self, tracking_id: str, carrier: Optional[str] = None) -> Dict[str, str]:
         """
         Fetch tracking info for a given tracking ID.
-        Returns a dictionary with status details.
+        Returns a dictionary with status details, or {} if unavailable.
         """
         if not tracking_id:
             return {}
-            
-        # MOCK IMPLEMENTATION
-        # Simulate different states based on random or hash of ID
-        
-        mock_locations = ["Mumbai Hub", "Delhi Gateway", "Bangalore Center", "Local Delivery Facility"]
-        mock_statuses = ["In Transit", "Out for Delivery", "Arrived at Facility", "Picked Up"]
-        
-        # Deterministic mock based on ID length to be consistent for same ID
-        idx = len(tracking_id) % 4
-        
-        return {
-            "tracking_id": tracking_id,
-            "carrier": carrier or "Standard Shipping",
-            "status": mock_statuses[idx],
-            "location": mock_locations[idx],
-            "eta": "2 days"
-        }
+
+        results = await self.get_tracking_batch([(tracking_id, carrier)])
+        return results.get(tracking_id, {})
+
+    async def get_tracking_batch(
+        self,
+        shipments: Iterable[Tuple[str, Optional[str]]],
+        refresh: bool = False
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Tracking info for many (tracking_id, carrier) pairs, one upstream
+        request per carrier batch. `refresh` skips the cache (the results are
+        still cached). Shipments the carrier doesn't know are left out.
+        """
+        results: Dict[str, Dict[str, str]] = {}
+        waiting: List[Tuple[str, asyncio.Future]] = []
+        to_fetch: Dict[str, Tuple[CarrierProvider, List[str]]] = {}
+
+        for tracking_id, carrier in shipments:
+            provider = self._carrier_for(carrier)
+            key = (provider.name, tracking_id)
+
+            if not refresh:
+                cached = self._cache_get(key)
+                if cached is not None:
+                    TRACKING_LOOKUPS.labels("hit").inc()
+                    results[tracking_id] = cached
+                    continue
+
+            if key in self._inflight:
+                # Someone is already asking the carrier about this shipment
+                TRACKING_LOOKUPS.labels("coalesced").inc()
+                waiting.append((tracking_id, self._inflight[key]))
+                continue
+
+            TRACKING_LOOKUPS.labels("miss").inc()
+            self._inflight[key] = asyncio.get_running_loop().create_future()
+            waiting.append((tracking_id, self._inflight[key]))
+            to_fetch.setdefault(provider.name, (provider, []))[1].append(tracking_id)
+
+        fetches = [
+            self._fetch_chunk(provider, tracking_ids[i:i + provider.max_batch_size])
+            for provider, tracking_ids in to_fetch.values()
+            for i in range(0, len(tracking_ids), provider.max_batch_size)
+        ]
+        if fetches:
+            await asyncio.gather(*fetches)
+
+        for tracking_id, future in waiting:
+            info = await future
+            if info:
+                results[tracking_id] = info
+        return results
+
+    async def _fetch_chunk(self, provider: CarrierProvider, tracking_ids: List[str]) -> None:
+        """One upstream call; resolves the in-flight futures of every ID in it"""
+        fetched: Dict[str, Dict[str, str]] = {}
+        try:
+            fetched = await asyncio.wait_for(provider.fetch_many(tracking_ids), timeout=self.timeout)
+        except Exception as e:
+            logger.warning("Tracking lookup failed (%s, %d shipments): %s", provider.name, len(tracking_ids), str(e) or type(e).__name__)
+        finally:
+            # Always release waiters, even if this fetch was cancelled
+            for tracking_id in tracking_ids:
+                key = (provider.name, tracking_id)
+                info = fetched.get(tracking_id, {})
+                if info:
+                    self._cache_put(key, info)
+                future = self._inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(info)
+
+    def remember(self, info: Dict[str, str], carrier: Optional[str] = None) -> None:
+        """Cache tracking info pushed by a carrier, so status replies see it without a lookup"""
+        self._cache_put((self._carrier_for(carrier).name, info["tracking_id"]), info)
+
+    async def advance_orders(self, order_states: Dict[PydanticObjectId, str]) -> Dict[str, List[PydanticObjectId]]:
+        """
+        Move orders forward for their carrier shipment states (one guarded
+        update_many per target status) and queue the customer notifications.
+        Returns the IDs that actually moved, by new status.
+        """
+        by_target: Dict[OrderStatus, List[PydanticObjectId]] = {}
+        for order_id, state in order_states.items():
+            target = self.STATE_TARGETS.get(state)
+            if target is not None:
+                by_target.setdefault(target, []).append(order_id)
+
+        advanced: Dict[str, List[PydanticObjectId]] = {}
+        for target, order_ids in by_target.items():
+            moved = await bulk_transition({"_id": {"$in": order_ids}}, target, ALLOWED_FROM[target])
+            if moved:
+                advanced[target.value] = moved
+                await notification_queue.enqueue_many(STATUS_NOTIFICATIONS[target], moved)
+        return advanced
+
+    @track_job("tracking_poll")
+    async def poll_active_shipments(self) -> int:
+        """
+        Poll carriers for every shipped order, a page at a time (one request per
+        carrier batch), and advance orders that went out for delivery or were delivered.
+        """
+        advanced = 0
+        polled = 0
+        last_id = None
+
+        try:
+            while True:
+                query = {
+                    "status": {"$in": [OrderStatus.SHIPPED.value, OrderStatus.OUT_FOR_DELIVERY.value]},
+                    "tracking_id": {"$ne": None},
+                }
+                if last_id is not None:
+                    query["_id"] = {"$gt": last_id}
+                cursor = Order.get_motor_collection().find(query, {"tracking_id": 1, "carrier": 1})
+                orders = await cursor.sort("_id", 1).limit(self.poll_batch_size).to_list(None)
+                if not orders:
+                    break
+                last_id = orders[-1]["_id"]
+                polled += len(orders)
+
+                infos = await self.get_tracking_batch(
+                    [(order["tracking_id"], order.get("carrier")) for order in orders],
+                    refresh=True
+                )
+                result = await self.advance_orders({
+                    order["_id"]: infos[order["tracking_id"]]["state"]
+                    for order in orders if order["tracking_id"] in infos
+                })
+                advanced += sum(len(order_ids) for order_ids in result.values())
+
+                if len(orders) < self.poll_batch_size:
+                    break
+
+            SCHEDULER_ITEMS_PROCESSED.labels("tracking_poll").inc(polled)
+            if advanced:
+                logger.info("Tracking poll: %d shipments checked, %d orders advanced", polled, advanced)
+
+        except Exception as e:
+            logger.error("Error polling shipments: %s", str(e))
+
+        return advanced
+
 
 # Singleton instance
 tracking_service = TrackingService()
@@ -1,7 +1,59 @@
 import os
-import httpx
+import re
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 from typing import Optional
-from datetime import datetime
+
+from logging_config import get_file_logger
+from metrics import TWILIO_SEND_LATENCY, TWILIO_SEND_TOTAL, TWILIO_RETRIES, mark_success
+from services.circuit_breaker import CircuitBreaker, RetryBudget
+from services.sender_pool import SenderPool
+
+
+logger = logging.getLogger(__name__)
+
+# Debug trace of Twilio traffic, written off the event loop.
+# Enable with WHATSAPP_DEBUG_LOG_LEVEL=DEBUG.
+debug_log = get_file_logger(
+    "whatsapp.debug",
+    os.getenv("WHATSAPP_DEBUG_LOG_FILE", "debug_whatsapp.log"),
+    level_env="WHATSAPP_DEBUG_LOG_LEVEL"
+)
+
+
+def _mask_number(number: Optional[str]) -> Optional[str]:
+    """Keep the prefix and last 4 digits of a phone number"""
+    if not number:
+        return number
+    return re.sub(r"\d(?=\d{4})", "*", number)
+
+
+def _redact_payload(payload: dict) -> dict:
+    """Copy of a Twilio request payload that is safe to write to disk"""
+    redacted = dict(payload)
+    redacted["To"] = _mask_number(redacted.get("To"))
+    if "Body" in redacted:
+        redacted["Body"] = f"<{len(redacted['Body'])} chars>"
+    if "ContentVariables" in redacted:
+        redacted["ContentVariables"] = "<redacted>"
+    return redacted
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
 
 class WhatsAppService:
@@ -14,11 +66,133 @@ class WhatsAppService:
         self.account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.whatsapp_number = os.getenv("TWILIO_WHATSAPP_NUMBER")  # Format: whatsapp:+14155238886
+        # A Messaging Service picks the sender on Twilio's side (its own sender pool and sticky sender)
+        self.messaging_service_sid = os.getenv("TWILIO_MESSAGING_SERVICE_SID")
         
-        if not all([self.account_sid, self.auth_token, self.whatsapp_number]):
+        if not all([self.account_sid, self.auth_token]) or not (
+            self.whatsapp_number or os.getenv("TWILIO_WHATSAPP_NUMBERS") or self.messaging_service_sid
+        ):
             raise ValueError("Missing Twilio credentials in environment variables")
         
-        self.api_url = f"https://api.twilio.com/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        # Otherwise sends are spread over TWILIO_WHATSAPP_NUMBERS (or the single TWILIO_WHATSAPP_NUMBER)
+        self.senders = None if self.messaging_service_sid else SenderPool.from_env()
+        
+        # Overridable so load tests can point sends at a local stand-in (benchmarks/loadtest)
+        api_base_url = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com").rstrip("/")
+        self.api_url = f"{api_base_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        # Public URL of /api/webhooks/whatsapp/status; unset: no delivery receipts
+        self.status_callback_url = os.getenv("TWILIO_STATUS_CALLBACK_URL")
+        
+        # Outage handling: fail fast while Twilio is down instead of waiting out timeouts
+        self.timeout = float(os.getenv("TWILIO_TIMEOUT_SECONDS", "10"))
+        self.connect_timeout = float(os.getenv("TWILIO_CONNECT_TIMEOUT_SECONDS", "3"))
+        self.max_retries = int(os.getenv("TWILIO_MAX_RETRIES", "2"))
+        self.retry_base_delay = float(os.getenv("TWILIO_RETRY_BASE_DELAY_SECONDS", "0.5"))
+        self.retry_max_delay = float(os.getenv("TWILIO_RETRY_MAX_DELAY_SECONDS", "8"))
+        self.breaker = CircuitBreaker(
+            "twilio",
+            failure_threshold=int(os.getenv("TWILIO_BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("TWILIO_BREAKER_RESET_SECONDS", "30"))
+        )
+        self.retry_budget = RetryBudget(ratio=float(os.getenv("TWILIO_RETRY_BUDGET_RATIO", "0.2")))
+    
+    def _retry_delay(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """Backoff before retry number `attempt` (1-based); None if the wait is too long to be worth it"""
+        if retry_after is not None:
+            # Twilio told us when to come back; a little jitter avoids a synchronized burst
+            delay = retry_after + random.uniform(0, self.retry_base_delay)
+        else:
+            # Full jitter exponential backoff
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        return delay if delay <= self.retry_max_delay else None
+    
+    async def _post(self, payload: dict, to_number: str):
+        """
+        POST a message with the circuit breaker and retry policy applied.
+        
+        Retried: 429 and 5xx responses, and connection failures (the request
+        never reached Twilio). Read timeouts are not retried, since the
+        message may already have been accepted and a retry could send it twice.
+        A 429 for a pooled sender is retried right away from another sender
+        when one is free; that is per-number throttling, not a Twilio outage.
+        
+        Returns the final httpx.Response, or None when the circuit is open or
+        the request failed in transport.
+        """
+        import httpx  # Deferred: keeps it off the cold-start import path
+        
+        self.retry_budget.record_request()
+        attempt = 0
+        tried_senders = []
+        async with httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)) as client:
+            while True:
+                if not self.breaker.allow():
+                    logger.warning("Twilio circuit open, not sending to %s", _mask_number(to_number))
+                    return None
+                
+                response = None
+                retry_after = None
+                try:
+                    with TWILIO_SEND_LATENCY.time():
+                        response = await client.post(
+                            self.api_url,
+                            data=payload,
+                            auth=(self.account_sid, self.auth_token)
+                        )
+                except asyncio.CancelledError:
+                    # No verdict on Twilio: just give back a half-open probe slot
+                    self.breaker.release()
+                    raise
+                except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                    TWILIO_SEND_TOTAL.labels("error").inc()
+                    self.breaker.record_failure()
+                    error = e
+                except Exception:
+                    TWILIO_SEND_TOTAL.labels("error").inc()
+                    self.breaker.record_failure()
+                    raise
+                else:
+                    TWILIO_SEND_TOTAL.labels(str(response.status_code)).inc()
+                    debug_log.debug("Response status %s for %s", response.status_code, _mask_number(to_number))
+                    if response.status_code != 429 and response.status_code < 500:
+                        # Includes 4xx for bad input: Twilio itself is healthy
+                        self.breaker.record_success()
+                        return response
+                    retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                    
+                    if response.status_code == 429 and self.senders is not None:
+                        sender = payload["From"]
+                        tried_senders.append(sender)
+                        self.senders.throttled(sender, retry_after)
+                        spill = self.senders.spill_over(to_number, tried_senders)
+                        if spill is not None:
+                            # Twilio answered, so it's up: settle this call (and any half-open probe) before the next
+                            self.breaker.record_success()
+                            TWILIO_RETRIES.labels("spillover").inc()
+                            logger.info("Sender %s throttled, sending to %s from %s", sender, _mask_number(to_number), spill)
+                            payload["From"] = spill
+                            continue
+                    self.breaker.record_failure()
+                
+                attempt += 1
+                delay = self._retry_delay(attempt, retry_after) if attempt <= self.max_retries else None
+                if delay is None:
+                    TWILIO_RETRIES.labels("exhausted").inc()
+                elif not self.retry_budget.try_spend():
+                    TWILIO_RETRIES.labels("budget_exceeded").inc()
+                    delay = None
+                
+                if delay is None:
+                    if response is None:
+                        raise error
+                    return response
+                
+                TWILIO_RETRIES.labels("retried").inc()
+                logger.info("Retrying Twilio send to %s in %.2fs (attempt %d)", _mask_number(to_number), delay, attempt)
+                await asyncio.sleep(delay)
+                if self.senders is not None and response is not None and response.status_code == 429:
+                    # Every sender was throttled: take whichever frees up first
+                    payload["From"] = await self.senders.acquire(to_number)
     
     async def send_message(self, to_number: str, message: str = None, content_sid: str = None, content_variables: dict = None) -> Optional[str]:
         """
@@ -38,10 +212,13 @@ class WhatsAppService:
             if not to_number.startswith("whatsapp:"):
                 to_number = f"whatsapp:{to_number}"
             
-            payload = {
-                "From": self.whatsapp_number,
-                "To": to_number,
-            }
+            payload = {"To": to_number}
+            if self.senders is not None:
+                payload["From"] = await self.senders.acquire(to_number)
+            else:
+                payload["MessagingServiceSid"] = self.messaging_service_sid
+            if self.status_callback_url:
+                payload["StatusCallback"] = self.status_callback_url
 
             if content_sid:
                 payload["ContentSid"] = content_sid
@@ -51,40 +228,28 @@ class WhatsAppService:
             elif message:
                 payload["Body"] = message
             else:
-                print("✗ Error: Must provide either message body or content_sid")
+                logger.error("Must provide either message body or content_sid")
                 return None
 
-            async with httpx.AsyncClient() as client:
-                # Log usage
-                with open("debug_whatsapp.log", "a", encoding="utf-8") as f:
-                    f.write(f"\n--- Sending Message at {datetime.now()} ---\n")
-                    f.write(f"To: {to_number}\n")
-                    f.write(f"Payload: {payload}\n")
-                    f.write(f"From Number (Configured): {self.whatsapp_number}\n")
-
-                response = await client.post(
-                    self.api_url,
-                    data=payload,
-                    auth=(self.account_sid, self.auth_token),
-                    timeout=30.0
-                )
-                
-                with open("debug_whatsapp.log", "a", encoding="utf-8") as f:
-                    f.write(f"Response Status: {response.status_code}\n")
-                    f.write(f"Response Body: {response.text}\n")
-                
-                if response.status_code == 201:
-                    data = response.json()
-                    print(f"✓ WhatsApp message sent to {to_number}: SID={data['sid']}")
-                    return data["sid"]
-                else:
-                    print(f"✗ Failed to send WhatsApp message: {response.status_code} - {response.text}")
-                    return None
+            if debug_log.isEnabledFor(logging.DEBUG):
+                debug_log.debug("Sending message: %s", _redact_payload(payload))
+
+            response = await self._post(payload, to_number)
+            if response is None:
+                return None
+            
+            if response.status_code == 201:
+                mark_success("twilio")
+                data = response.json()
+                logger.debug("WhatsApp message sent: SID=%s", data["sid"])
+                return data["sid"]
+            else:
+                logger.error("Failed to send WhatsApp message: %s - %s", response.status_code, response.text)
+                return None
                     
         except Exception as e:
-            with open("debug_whatsapp.log", "a", encoding="utf-8") as f:
-                f.write(f"EXCEPTION: {str(e)}\n")
-            print(f"✗ WhatsApp send error: {str(e)}")
+            debug_log.warning("Send to %s failed: %s", _mask_number(to_number), str(e))
+            logger.error("WhatsApp send error: %s", str(e))
             return None
             
     async def get_messages(self, limit: int = 50) -> list:
@@ -98,6 +263,7 @@ class WhatsAppService:
             List of message objects from Twilio
         """
         try:
+            import httpx
             async with httpx.AsyncClient() as client:
                 response = await client.get(
                     self.api_url,
@@ -110,11 +276,11 @@ class WhatsAppService:
                     data = response.json()
                     return data.get("messages", [])
                 else:
-                    print(f"✗ Failed to fetch Twilio logs: {response.status_code} - {response.text}")
+                    logger.error("Failed to fetch Twilio logs: %s - %s", response.status_code, response.text)
                     return []
                     
         except Exception as e:
-            print(f"✗ Error fetching Twilio logs: {str(e)}")
+            logger.error("Error fetching Twilio logs: %s", str(e))
             return []
     
     def verify_webhook_signature(self, signature: str, url: str, params: dict) -> bool:
@@ -0,0 +1,86 @@
+"""
+Background worker: runs the scheduled jobs and the in-process queues
+without serving HTTP, so API and background capacity scale separately.
+
+    python -m worker
+
+Run the API with RUN_SCHEDULER=false alongside it. Several workers may run
+at once: each scheduled job takes a MongoDB lease per run, so it still runs
+once per interval. Set WORKER_METRICS_PORT to expose /metrics for scraping.
+"""
+import os
+import signal
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables FIRST before any other imports
+load_dotenv()
+
+from logging_config import setup_logging, shutdown_logging
+setup_logging()
+
+from database import init_db, close_db
+from scheduler.reminder_scheduler import reminder_scheduler
+from services.notification_queue import notification_queue
+from services.message_log_writer import message_log_writer
+from services.delivery_status import delivery_status_writer
+
+
+logger = logging.getLogger(__name__)
+
+
+def start_background(run_scheduler: bool = True) -> None:
+    """Start the buffered writers, the notification queue and (optionally) the scheduler; needs init_db first"""
+    message_log_writer.start()
+    delivery_status_writer.start()
+    notification_queue.start()
+    if run_scheduler:
+        reminder_scheduler.start()
+
+
+async def stop_background() -> None:
+    """Stop everything start_background started, draining queues and buffers"""
+    reminder_scheduler.shutdown()
+    await notification_queue.stop()
+    # Status updates first: their flush writes out buffered logs they may refer to
+    await delivery_status_writer.stop()
+    # After the queue: notifications still draining write logs
+    await message_log_writer.stop()
+
+
+async def run() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C cancels run() instead
+            pass
+
+    metrics_port = int(os.getenv("WORKER_METRICS_PORT", "0"))
+    if metrics_port:
+        from prometheus_client import start_http_server
+        start_http_server(metrics_port)
+        logger.info("Worker metrics on port %d", metrics_port)
+
+    await init_db()
+    start_background(run_scheduler=True)
+    logger.info("Worker started")
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Worker shutting down...")
+        await stop_background()
+        await close_db()
+        logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_logging()